@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+
+from cachetools import TTLCache
+
+from tracing import Counter, Gauge
+
+# ⚙️ ADMISSION SETTINGS
+CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", "8"))  # /chat requests doing work at once
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "16"))  # Requests allowed to wait for a slot
+CHAT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("CHAT_QUEUE_TIMEOUT_SECONDS", "2"))
+SESSION_RATE_PER_MINUTE = float(os.getenv("SESSION_RATE_PER_MINUTE", "20"))  # 0 disables the limit
+SESSION_BURST = float(os.getenv("SESSION_BURST", "5"))
+IP_RATE_PER_MINUTE = float(os.getenv("IP_RATE_PER_MINUTE", "60"))  # Per client IP
+IP_BURST = float(os.getenv("IP_BURST", "20"))
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))  # Proxies in front of the app that set X-Forwarded-For
+RATE_LIMIT_MAX_KEYS = 10000
+
+IN_FLIGHT = Gauge("claybot_chat_in_flight", "/chat requests currently being processed.")
+QUEUED = Gauge("claybot_chat_queued", "/chat requests waiting for a slot.")
+REJECTED = Counter("claybot_chat_rejected_total", "/chat requests turned away before any work.", ["reason"])
+
+
+class AdmissionController:
+    """Bounded number of /chat requests in flight plus a short bounded wait queue.
+
+    Anything beyond that is shed right away instead of piling more OpenAI/Shopify
+    calls on top of a saturated worker.
+    """
+
+    def __init__(self, max_in_flight=CHAT_MAX_IN_FLIGHT, max_queue=CHAT_MAX_QUEUE,
+                 queue_timeout=CHAT_QUEUE_TIMEOUT_SECONDS):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Returns None when admitted, otherwise the reason ("queue_full" or "queue_timeout")."""
+        with self._cond:
+            if self.in_flight < self.max_in_flight:
+                self._admit()
+                return None
+            if self.waiting >= self.max_queue:
+                return "queue_full"
+
+            self.waiting += 1
+            QUEUED.set(self.waiting)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return "queue_timeout"
+                    self._cond.wait(remaining)
+                self._admit()
+                return None
+            finally:
+                self.waiting -= 1
+                QUEUED.set(self.waiting)
+
+    def _admit(self):
+        self.in_flight += 1
+        IN_FLIGHT.set(self.in_flight)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            IN_FLIGHT.set(self.in_flight)
+            self._cond.notify()
+
+    def status(self):
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+            }
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, capacity):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self):
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate else 60.0
+
+
+class RateLimiter:
+    """One token bucket per key (session id, client IP). Idle buckets expire with the TTL."""
+
+    def __init__(self, rate_per_minute, burst, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        # A bucket idle this long has refilled anyway, so dropping it changes nothing
+        ttl = max(burst / self.rate, 1) if self.rate else 3600
+        self._buckets = TTLCache(maxsize=max_keys, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Returns (allowed, retry_after_seconds)."""
+        if self.rate <= 0:
+            return True, 0.0  # Limit disabled
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+            allowed = bucket.take()
+            self._buckets[key] = bucket  # Re-insert refreshes the TTL
+            return allowed, (0.0 if allowed else bucket.retry_after())
@@ -0,0 +1,148 @@
+import os
+import hashlib
+import threading
+import time
+from datetime import datetime
+
+ARTIFACT_POLL_SECONDS = int(os.getenv("ARTIFACT_POLL_SECONDS", "30"))
+
+
+def file_md5(path):
+    hasher = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ArtifactManager:
+    """Loads generated files (model, catalog, articles, FAQ index) and hot-swaps new versions.
+
+    Readers call get() once per request and keep that reference, so a swap never
+    changes data under a request that is already running.
+    """
+
+    def __init__(self, poll_seconds=ARTIFACT_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._specs = {}
+        self._loaded = {}
+        self._load_lock = threading.Lock()  # Serializes loaders; readers never take it
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, paths, loader, validator=None, version=None, default=None):
+        if isinstance(paths, str):
+            paths = (paths,)
+        self._specs[name] = {
+            "paths": tuple(paths),
+            "loader": loader,
+            "validator": validator,
+            "version": version,
+        }
+        self._loaded[name] = {
+            "value": default,
+            "version": None,
+            "mtime": None,
+            "loaded_at": None,
+            "load_seconds": None,
+            "error": None,
+        }
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def get(self, name):
+        return self._loaded[name]["value"]
+
+    def version(self, name):
+        return self._loaded[name]["version"]
+
+    def versions(self):
+        return {name: entry["version"] for name, entry in self._loaded.items()}
+
+    def disk_bytes(self):
+        # Size of the loaded files: a cheap stand-in for what they take in memory
+        total = 0
+        for name, entry in self._loaded.items():
+            if entry["version"] is None:
+                continue
+            for path in self._specs[name]["paths"]:
+                try:
+                    total += os.path.getsize(path)
+                except OSError:
+                    pass
+        return total
+
+    def _mtime(self, spec):
+        try:
+            return max(os.path.getmtime(path) for path in spec["paths"])
+        except OSError:
+            return None
+
+    def _load(self, name, mtime):
+        spec = self._specs[name]
+        current = self._loaded[name]
+        start = time.perf_counter()
+        try:
+            value = spec["loader"](*spec["paths"])
+            if spec["validator"] and not spec["validator"](value):
+                raise ValueError("validation failed")
+            version = spec["version"](*spec["paths"]) if spec["version"] else file_md5(spec["paths"][0])
+        except Exception as e:
+            print(f"❌ Could not load artifact '{name}': {e}. Keeping version {current['version']}.")
+            # Remember the mtime so a broken file isn't reloaded on every poll
+            self._loaded[name] = {**current, "mtime": mtime, "error": str(e)}
+            return False
+
+        # Single reference replacement: in-flight requests keep the object they already hold
+        self._loaded[name] = {
+            "value": value,
+            "version": version,
+            "mtime": mtime,
+            "loaded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "load_seconds": round(time.perf_counter() - start, 4),
+            "error": None,
+        }
+        print(f"✅ Artifact '{name}' loaded (version {version}).")
+        return True
+
+    def refresh(self, names=None, force=False):
+        reloaded = []
+        with self._load_lock:
+            for name in names or list(self._specs):
+                mtime = self._mtime(self._specs[name])
+                if mtime is None:
+                    continue
+                if force or mtime != self._loaded[name]["mtime"]:
+                    if self._load(name, mtime):
+                        reloaded.append(name)
+        return reloaded
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ Artifact watcher error: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="artifact-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return {
+            name: {
+                "paths": list(self._specs[name]["paths"]),
+                "version": entry["version"],
+                "loaded_at": entry["loaded_at"],
+                "load_seconds": entry["load_seconds"],
+                "error": entry["error"],
+            }
+            for name, entry in self._loaded.items()
+        }
@@ -0,0 +1,148 @@
+"""Benchmark: products export, REST pagination vs a GraphQL bulk operation.
+
+Usage: python3 benchmarks/bench_bulk_export.py [products]
+
+FakeShopify is a local stand-in for the Admin API:
+- products.json pages 250 full REST payloads at a time (variants, images,
+  options, body_html), with Link headers
+- graphql.json accepts bulkOperationRunQuery, reports RUNNING for a few polls,
+  then COMPLETED with a URL
+- that URL serves the canned JSONL result, one product per line, as Shopify's
+  bulk files do
+export_collections_and_products.export_products() runs against it in both modes.
+The script reports bytes downloaded, time and peak Python memory (tracemalloc),
+and checks that both products.json files have the same titles and tags.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+POLLS_UNTIL_DONE = 3
+STYLES = ["talavera", "zellige", "terracotta", "cement", "saltillo", "moroccan"]
+
+
+def synthetic_products(count, seed=5):
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        style = STYLES[i % len(STYLES)]
+        status = "active" if i % 20 else "draft"
+        products.append({
+            "id": 7000000000 + i,
+            "handle": f"{style}-tile-{i}",
+            "title": f"{style.title()} Tile {i}",
+            "tags": ", ".join([style, rng.choice(["blue", "white", "green"]), rng.choice(["kitchen", "bathroom", "floor"])]),
+            "status": status,
+            "body_html": f"<p>Handmade {style} tile.</p>" * 8,
+            "options": [{"name": "Size", "values": ["4x4", "8x8"]}, {"name": "Finish", "values": ["Glazed", "Matte"]}],
+            "variants": [{"id": i * 10 + v, "title": f"Variant {v}", "price": "12.50", "sku": f"SKU-{i}-{v}",
+                          "inventory_quantity": rng.randrange(500), "weight": 1.2} for v in range(4)],
+            "images": [{"id": i * 10 + n, "src": f"https://cdn.shopify.com/s/files/{i}/{n}.jpg",
+                        "width": 2048, "height": 2048} for n in range(3)],
+        })
+    return products
+
+
+class FakeShopify:
+    def __init__(self, products):
+        self.products = products
+        self.bytes_sent = 0
+        self.polls = 0
+        self.bulk_lines = [json.dumps({"id": f"gid://shopify/Product/{p['id']}", "handle": p["handle"], "title": p["title"],
+                                       "tags": p["tags"].split(", "), "status": p["status"].upper()}).encode()
+                           for p in products if p["status"] == "active"]
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                fake.bytes_sent += len(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/bulk/products.jsonl":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/jsonl")
+                    self.send_header("Content-Length", str(sum(len(line) + 1 for line in fake.bulk_lines)))
+                    self.end_headers()
+                    for line in fake.bulk_lines:
+                        self.wfile.write(line + b"\n")
+                        fake.bytes_sent += len(line) + 1
+                    return
+                # REST products.json, cursor = offset
+                offset = int(parse_qs(parsed.query).get("page_info", ["0"])[0])
+                page = fake.products[offset:offset + 250]
+                headers = {}
+                if offset + 250 < len(fake.products):
+                    headers["Link"] = f'<{base_url}/admin/api/2024-01/products.json?limit=250&page_info={offset + 250}>; rel="next"'
+                self._reply({"products": page}, headers)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if "bulkOperationRunQuery" in body["query"]:
+                    fake.polls = 0
+                    self._reply({"data": {"bulkOperationRunQuery": {
+                        "bulkOperation": {"id": "gid://shopify/BulkOperation/1", "status": "CREATED"}, "userErrors": []}}})
+                    return
+                fake.polls += 1
+                done = fake.polls >= POLLS_UNTIL_DONE
+                self._reply({"data": {"currentBulkOperation": {
+                    "id": "gid://shopify/BulkOperation/1", "status": "COMPLETED" if done else "RUNNING", "errorCode": None,
+                    "objectCount": str(len(fake.bulk_lines) if done else len(fake.bulk_lines) * fake.polls // POLLS_UNTIL_DONE),
+                    "url": f"{base_url}/bulk/products.jsonl" if done else None}}})
+
+        http_server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        http_server.daemon_threads = True
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{http_server.server_port}"
+        return base_url
+
+
+def run(fake, export, mode, path):
+    fake.bytes_sent = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = export.export_products(path, mode=mode)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"📦 {mode:<4} {count:7d} products | {fake.bytes_sent / 1e6:7.1f} MB downloaded | {seconds:6.2f} s | "
+          f"peak Python memory {peak / 1e6:6.1f} MB")
+    with open(path, encoding="utf-8") as f:
+        return {(p["title"], p["tags"]) for p in json.load(f)}
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    fake = FakeShopify(synthetic_products(count))
+    os.environ["SHOPIFY_STORE_URL"] = fake.start()
+    os.environ["SHOPIFY_API_KEY"] = "shpat-bench"
+    os.environ["BULK_POLL_SECONDS"] = "0.05"
+
+    import export_collections_and_products as export
+
+    workdir = tempfile.mkdtemp(prefix="bulk_export_bench_")
+    rest = run(fake, export, "rest", os.path.join(workdir, "products_rest.json"))
+    bulk = run(fake, export, "bulk", os.path.join(workdir, "products_bulk.json"))
+    print(f"\n🔁 Same titles and tags in both files: {rest == bulk} ({len(bulk)} products, {fake.polls} status polls)")
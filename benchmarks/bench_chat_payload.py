@@ -0,0 +1,80 @@
+"""Benchmark: collection card rendering and /chat response compression.
+
+Usage: python3 benchmarks/bench_chat_payload.py [collections] [repeats]
+
+1. CPU time to build a 3-card carousel: rendering every card live (regex-stripping
+   body_html, a few KB of markup for half the collections) vs joining the fragments
+   pre-rendered in catalog.compact. Both must produce the same HTML.
+2. Bytes on the wire for that /chat JSON answer with identity, gzip and (if the
+   optional brotli package is installed) br, plus the CPU cost of compressing it.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_collection_search import synthetic_collections
+from collection_cards import render_card, render_carousel
+from compact_catalog import write_compact_catalog, load_compact_catalog
+from compression import compress_body, supported_encodings
+
+STORE_URL = "https://clayimports.myshopify.com"
+INTRO = "Here are some handmade tiles that would look beautiful in your kitchen!"
+# Shopify body_html is often a few KB of markup (spans, inline styles, spec tables)
+LONG_BODY = ("<div class=\"rte\"><p><span style=\"font-weight: 400;\">Handmade in Mexico by local artisans, "
+             "each tile is unique.</span></p>" + "<ul><li><strong>Size:</strong> 4x4</li><li><strong>Finish:</strong> "
+             "glazed</li></ul>" * 20 + "</div>")
+
+
+def cpu_us(fn, repeats):
+    start = time.process_time()
+    for _ in range(repeats):
+        fn()
+    return (time.process_time() - start) / repeats * 1e6
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    collections = synthetic_collections(count)
+    for coll in collections[::2]:
+        coll["body_html"] = LONG_BODY
+    path = os.path.join(tempfile.mkdtemp(prefix="payload_bench_"), "catalog.compact")
+    catalog = load_compact_catalog(write_compact_catalog(path, collections, store_url=STORE_URL), store_url=STORE_URL)
+
+    rng = random.Random(7)
+    picks = [rng.sample(range(count), 3) for _ in range(64)]
+    live_pages = [[collections[i] for i in rows] for rows in picks]
+    catalog_pages = [[catalog[i] for i in rows] for rows in picks]
+
+    def live():
+        for page in live_pages:
+            render_carousel(INTRO, [render_card(coll, STORE_URL) for coll in page])
+
+    def prerendered():
+        for page in catalog_pages:
+            render_carousel(INTRO, [coll.get("card_html") for coll in page])
+
+    identical = all(
+        render_carousel(INTRO, [render_card(coll, STORE_URL) for coll in a]) == render_carousel(INTRO, [c["card_html"] for c in b])
+        for a, b in zip(live_pages, catalog_pages)
+    )
+    live_us = cpu_us(live, repeats // 10) / len(picks)
+    join_us = cpu_us(prerendered, repeats // 10) / len(picks)
+    print(f"🃏 3-card carousel: live render {live_us:.1f} µs CPU, pre-rendered join {join_us:.1f} µs CPU "
+          f"({live_us / join_us:.1f}x) | identical HTML: {identical}")
+
+    answer = render_carousel(INTRO, [c["card_html"] for c in catalog_pages[0]])
+    body = json.dumps({"answer": answer, "intent": "search_collection"}).encode()
+    print(f"📦 /chat body: identity {len(body)} B")
+    for encoding in supported_encodings():
+        compressed = compress_body(body, encoding)
+        print(f"📦 {encoding:<8} {len(compressed):5d} B ({len(compressed) / len(body):.0%}) | "
+              f"{cpu_us(lambda: compress_body(body, encoding), repeats):.1f} µs CPU per response")
+    if "br" not in supported_encodings():
+        print("ℹ️ brotli not installed: only gzip is offered (pip install brotli to enable br)")
@@ -0,0 +1,533 @@
+"""Benchmark: replay a JSONL of chat requests against the /chat endpoint.
+
+Usage:
+    python3 benchmarks/bench_chat_replay.py [requests.jsonl] [--clients 1,4,16]
+        [--mode client|port] [--url http://host:5000] [--latency shopify=0.15,openai=0.8]
+        [--no-response-cache] [--save results.json] [--compare baseline.json]
+
+Each line is {"message": ..., "session_id": ...}. benchmarks/chat_requests.jsonl is a sample.
+Turns of one session stay in order on one client, so "show me more" follow-ups work.
+
+--mode client (default) drives app.test_client(); --mode port serves the app on a
+local port and sends real HTTP requests. In both, Shopify, OpenAI, Google Sheets,
+storefront scraping and the embedding model are replaced by deterministic local stubs
+that sleep for the configured latency, and the time spent in each one is reported per
+stage. --url sends the requests to an already running server instead (no stubs,
+no stage breakdown).
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+DEFAULT_REQUESTS = os.path.join(ROOT, "benchmarks", "chat_requests.jsonl")
+DEFAULT_LATENCY = {
+    "shopify": 0.15,  # Admin API call
+    "scrape": 0.2,  # Storefront page download
+    "openai": 0.8,  # Chat completion
+    "openai_embed": 0.1,
+    "sheets": 0.3,  # gspread append_row
+    "embed": 0.01,  # Local SentenceTransformer encode
+}
+REPLAY_HEADER = "X-Replay-Id"
+
+
+# --- STAGE ACCOUNTING ---
+current = threading.local()
+stage_times = {}  # replay id -> {stage: seconds}
+
+
+def record_stage(stage, seconds):
+    stages = getattr(current, "stages", None)
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+def simulate(stage, latency):
+    # Sleep stands in for the network call; the sleep is the stage time
+    start = time.perf_counter()
+    time.sleep(latency.get(stage, 0.0))
+    record_stage(stage, time.perf_counter() - start)
+
+
+def replay_middleware(wsgi_app):
+    def middleware(environ, start_response):
+        replay_id = environ.get("HTTP_" + REPLAY_HEADER.upper().replace("-", "_"))
+        current.stages = stage_times.setdefault(replay_id, {}) if replay_id else None
+        try:
+            return wsgi_app(environ, start_response)
+        finally:
+            current.stages = None
+    return middleware
+
+
+def timed(stage, fn):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record_stage(stage, time.perf_counter() - start)
+    return wrapper
+
+
+# --- DETERMINISTIC STUBS ---
+def fake_vector(text, size=384):
+    seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).standard_normal(size).astype(np.float32)
+
+
+PAGES = [
+    {"handle": handle, "title": handle.replace("-", " ").title(), "published_at": "2024-01-01",
+     "body_html": f"<p>{handle.replace('-', ' ')} details for Clay Imports customers.</p>"}
+    for handle in [
+        "contact-book", "clay-sma-info-contact", "book-design-consultation", "return-and-cancellation-policy",
+        "shipping-policy", "trade", "who-we-are", "care-and-maintenance", "installation-guide", "wishlist",
+    ]
+]
+
+STYLES = ["talavera", "zellige", "terracotta", "cement", "hand painted", "glazed", "saltillo", "moroccan"]
+COLORS = ["blue", "white", "green", "black", "terracotta", "cream", "pink", "yellow"]
+SPACES = ["kitchen", "bathroom", "shower", "backsplash", "floor", "patio", "pool", "fireplace"]
+
+
+def fake_collections():
+    collections = []
+    for i in range(240):
+        style, color, space = STYLES[i % 8], COLORS[(i // 8) % 8], SPACES[(i // 3) % 8]
+        collections.append({
+            "id": i,
+            "handle": f"{color}-{style.replace(' ', '-')}-{i}",
+            "title": f"{color.title()} {style.title()} Tile {i}",
+            "body_html": f"<p>Handmade {color} {style} tile, perfect for your {space}.</p>",
+            "tags": f"{style}, {color}, {space}",
+            "image": {"src": f"https://cdn.example.com/{i}.jpg"} if i % 10 else {},
+            "product_count": 0 if i % 17 == 0 else 12,
+            "product_titles": [f"{color} {style} {size}" for size in ("4x4", "6x6", "2x8")],
+        })
+    return collections
+
+
+def fake_articles():
+    topics = ["how to clean talavera", "zellige in the shower", "sealing terracotta", "backsplash ideas",
+              "outdoor tile care", "grout colors", "mixing patterns", "cement tile floors"]
+    return [
+        {"url": f"https://clayimports.com/blogs/news/{t.replace(' ', '-')}-{i}", "title": f"{t.title()} {i}",
+         "content": f"A guide about {t}. " * 20}
+        for i in range(6) for t in topics
+    ]
+
+
+def fake_faqs():
+    questions = ["Do you ship internationally?", "How long does shipping take?", "Can I return tiles?",
+                 "Do you offer samples?", "How do I seal terracotta?", "Is zellige waterproof?"]
+    return [
+        {"title": q, "subtitle": "Clay Imports FAQ", "answer": f"<p>Answer to: {q}</p>",
+         "url": f"https://clayimports.com/pages/faq#{i}"}
+        for i, q in enumerate(questions)
+    ]
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, text="", headers=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = text or json.dumps(self._payload)
+        self.headers = headers or {}
+
+    def json(self):
+        return self._payload
+
+
+class FakeChoice:
+    def __init__(self, content):
+        self.message = type("Message", (), {"content": content})()
+
+
+class FakeCompletions:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, model=None, messages=None, **kwargs):
+        simulate("openai", self.latency)
+        prompt = " ".join(m.get("content", "") for m in messages or [])
+        digest = hashlib.md5(prompt.encode()).hexdigest()[:8]
+        answer = f"Here's a friendly answer from our team ({digest}). We're happy to help with your tile project!"
+        return type("Completion", (), {
+            "choices": [FakeChoice(answer)],
+            "usage": type("Usage", (), {"prompt_tokens": len(prompt.split()), "completion_tokens": 16})(),
+        })()
+
+
+class FakeEmbeddings:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, model=None, input=None, **kwargs):
+        simulate("openai_embed", self.latency)
+        texts = input if isinstance(input, list) else [input]
+        data = [type("Embedding", (), {"embedding": fake_vector(t, 1536).tolist()})() for t in texts]
+        return type("EmbeddingResponse", (), {"data": data})()
+
+
+def install_offline_stubs(latency):
+    """Stubs for the model downloads (embeddings, tokenizer) and Google Sheets."""
+    import gspread
+    import sentence_transformers
+    import tiktoken
+    import torch
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    class FakeSentenceTransformer:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def encode(self, texts, convert_to_tensor=False, **kwargs):
+            simulate("embed", latency)
+            single = isinstance(texts, str)
+            vectors = np.stack([fake_vector(t) for t in ([texts] if single else texts)])
+            vectors = torch.from_numpy(vectors) if convert_to_tensor else vectors
+            return vectors[0] if single else vectors
+
+    class FakeEncoding:
+        def encode(self, text):
+            return text.split()
+
+    class FakeSheet:
+        def append_row(self, row):
+            simulate("sheets", latency)
+
+    class FakeSpreadsheet:
+        sheet1 = FakeSheet()
+
+        def get_worksheet(self, index):
+            return FakeSheet()
+
+    class FakeSheetsClient:
+        def set_timeout(self, timeout):
+            pass
+
+        def open(self, name):
+            return FakeSpreadsheet()
+
+    sentence_transformers.SentenceTransformer = FakeSentenceTransformer
+    tiktoken.encoding_for_model = lambda model: FakeEncoding()
+    gspread.authorize = lambda creds: FakeSheetsClient()
+    ServiceAccountCredentials.from_json_keyfile_name = classmethod(lambda cls, *args, **kwargs: None)
+
+
+def install_http_stubs(latency):
+    """Stubs for Shopify, storefront scraping and OpenAI."""
+    import openai
+    import requests
+
+    collections = fake_collections()
+
+    def fake_get(url, headers=None, timeout=None, **kwargs):
+        if "/admin/api/" in url:
+            simulate("shopify", latency)
+            if "shop.json" in url:
+                return FakeResponse(payload={"shop": {"name": "Clay Imports", "currency": "USD"}})
+            if "pages.json" in url:
+                return FakeResponse(payload={"pages": PAGES})
+            if "custom_collections" in url:
+                return FakeResponse(payload={"custom_collections": collections})
+            if "smart_collections" in url:
+                return FakeResponse(payload={"smart_collections": []})
+            if "blogs" in url:
+                return FakeResponse(payload={"blogs": [], "articles": []})
+            return FakeResponse(404)
+        simulate("scrape", latency)
+        handle = url.rstrip("/").rsplit("/", 1)[-1]
+        return FakeResponse(text=storefront_html(handle), headers={"ETag": f'"{handle}"'})
+
+    class FakeOpenAI:
+        def __init__(self, *args, **kwargs):
+            self.chat = type("Chat", (), {"completions": FakeCompletions(latency)})()
+            self.embeddings = FakeEmbeddings(latency)
+
+    requests.get = fake_get
+    openai.OpenAI = FakeOpenAI
+
+
+def install_stubs(latency):
+    """Swaps every external dependency for a local stub. Must run before server is imported."""
+    install_offline_stubs(latency)
+    install_http_stubs(latency)
+
+
+def storefront_html(handle):
+    return (f"<html><body><header>Menu</header><main><h1>{handle}</h1>"
+            + f"<p>Everything about {handle.replace('-', ' ')} at Clay Imports.</p>" * 30
+            + "</main><footer>Footer</footer></body></html>")
+
+
+def prepare_workspace():
+    """Temporary working dir with the artifacts server.py loads at startup."""
+    import joblib
+    import torch
+
+    import weekly_learning
+
+    workspace = tempfile.mkdtemp(prefix="chat_replay_")
+    shutil.copy(os.path.join(ROOT, "training_data.json"), workspace)
+    model = weekly_learning.build_intent_pipeline()
+    with open(os.path.join(ROOT, "training_data.json"), "r") as f:
+        pairs = weekly_learning.flatten_training_data(json.load(f))
+    model.fit([msg for msg, _ in pairs], [intent for _, intent in pairs])
+    joblib.dump(model, os.path.join(workspace, "intent_model.joblib"))
+    from sentence_transformers import SentenceTransformer
+    from collection_search import build_collection_index
+    from knowledge_index import knowledge_documents, build_knowledge_index
+
+    collections = fake_collections()
+    joblib.dump(collections, os.path.join(workspace, "cached_collections.joblib"))
+    index = build_collection_index(collections, SentenceTransformer("stub"))
+    joblib.dump(index, os.path.join(workspace, "collection_index.joblib"))
+    with open(os.path.join(workspace, "articles.json"), "w") as f:
+        json.dump(fake_articles(), f)
+
+    faqs = fake_faqs()
+    with open(os.path.join(workspace, "faqs.json"), "w") as f:
+        json.dump(faqs, f)
+    documents = knowledge_documents(PAGES, fake_articles(), faqs, collections, "https://clayimports.com")
+    joblib.dump(build_knowledge_index(documents, SentenceTransformer("stub")), os.path.join(workspace, "knowledge_index.joblib"))
+    embeddings = torch.from_numpy(np.stack([fake_vector(faq["title"].lower()) for faq in faqs]))
+    torch.save(embeddings, os.path.join(workspace, "faq_embeddings.pt"))
+    return workspace
+
+
+def use_workspace_faq(server, workspace):
+    from faq_support.faq_search import load_faq_index
+
+    server.artifacts.register(
+        "faq", (os.path.join(workspace, "faqs.json"), os.path.join(workspace, "faq_embeddings.pt")),
+        load_faq_index
+    )
+    server.artifacts.refresh(["faq"])
+
+
+def load_stubbed_app(latency, response_cache=True):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-replay")
+    # Every replayed request comes from one address; measure the pipeline, not the rate limits
+    os.environ.setdefault("IP_RATE_PER_MINUTE", "0")
+    os.environ.setdefault("SESSION_RATE_PER_MINUTE", "0")
+    os.environ.setdefault("SHOPIFY_STORE_URL", "https://replay.myshopify.com")
+    install_stubs(latency)
+    workspace = prepare_workspace()
+    atexit.register(shutil.rmtree, workspace, ignore_errors=True)
+    os.chdir(workspace)
+
+    import server
+
+    server.artifacts.stop()
+    use_workspace_faq(server, workspace)
+    server.response_cache.enabled = response_cache
+    server.classify_intent = timed("classify", server.classify_intent)
+    server.app.wsgi_app = replay_middleware(server.app.wsgi_app)
+    return server.app, workspace
+
+
+# --- REPLAY ---
+def load_requests(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def assign_clients(chat_requests, clients):
+    # Every turn of a session goes to the same client, in file order
+    queues = [[] for _ in range(clients)]
+    for item in chat_requests:
+        session = str(item.get("session_id", "default"))
+        queues[int(hashlib.md5(session.encode()).hexdigest(), 16) % clients].append(item)
+    return queues
+
+
+def make_sender(mode, app=None, url=None):
+    if mode == "client":
+        def send(payload, replay_id):
+            test_client = app.test_client()
+            response = test_client.post("/chat", json=payload, headers={REPLAY_HEADER: replay_id})
+            return response.status_code, response.get_json(silent=True) or {}
+        return send
+
+    import requests
+    http = threading.local()
+
+    def send(payload, replay_id):
+        if not hasattr(http, "session"):
+            http.session = requests.Session()
+        response = http.session.post(f"{url}/chat", json=payload, headers={REPLAY_HEADER: replay_id}, timeout=120)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, {}
+    return send
+
+
+def run_replay(chat_requests, clients, send, run_tag):
+    results = []
+    results_lock = threading.Lock()
+
+    def worker(queue):
+        for item in queue:
+            payload = dict(item)
+            payload["session_id"] = f"{run_tag}-{item.get('session_id', 'default')}"
+            replay_id = uuid.uuid4().hex
+            start = time.perf_counter()
+            try:
+                status, body = send(payload, replay_id)
+            except Exception as e:
+                status, body = 0, {"error": str(e)}
+            elapsed = time.perf_counter() - start
+            with results_lock:
+                results.append({
+                    "intent": body.get("intent", "error" if status != 200 else "unknown"),
+                    "status": status,
+                    "seconds": elapsed,
+                    "stages": stage_times.pop(replay_id, {}),
+                })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(worker, assign_clients(chat_requests, clients)))
+    wall = time.perf_counter() - start
+    return results, wall
+
+
+def percentiles(values):
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {"count": len(values), "p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1)}
+
+
+def summarize(results, wall, clients):
+    by_intent = defaultdict(list)
+    for r in results:
+        by_intent[r["intent"]].append(r["seconds"])
+
+    total_seconds = sum(r["seconds"] for r in results)
+    stage_totals = defaultdict(float)
+    for r in results:
+        for stage, seconds in r["stages"].items():
+            stage_totals[stage] += seconds
+    stages = {stage: round(seconds / len(results) * 1000, 1) for stage, seconds in sorted(stage_totals.items())}
+    if stage_totals:
+        stages["other"] = round((total_seconds - sum(stage_totals.values())) / len(results) * 1000, 1)
+
+    return {
+        "clients": clients,
+        "requests": len(results),
+        "errors": sum(1 for r in results if r["status"] != 200),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(results) / wall, 2),
+        "overall": percentiles([r["seconds"] for r in results]),
+        "per_intent": {intent: percentiles(values) for intent, values in sorted(by_intent.items())},
+        "stage_ms_per_request": stages,
+    }
+
+
+def print_summary(summary):
+    overall = summary["overall"]
+    print(f"\n👥 {summary['clients']} client(s): {summary['requests']} requests in {summary['wall_seconds']}s "
+          f"→ {summary['throughput_rps']} req/s, {summary['errors']} errors")
+    print(f"   overall          p50 {overall['p50_ms']:8.1f} ms | p95 {overall['p95_ms']:8.1f} ms | p99 {overall['p99_ms']:8.1f} ms")
+    for intent, stats in summary["per_intent"].items():
+        print(f"   {intent:<16} p50 {stats['p50_ms']:8.1f} ms | p95 {stats['p95_ms']:8.1f} ms | "
+              f"p99 {stats['p99_ms']:8.1f} ms | n={stats['count']}")
+    if summary["stage_ms_per_request"]:
+        stages = ", ".join(f"{stage} {ms} ms" for stage, ms in summary["stage_ms_per_request"].items())
+        print(f"   ⏱️ per request: {stages}")
+
+
+def compare(runs, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = {run["clients"]: run for run in json.load(f)["runs"]}
+    print(f"\n📊 Compared with {baseline_path}:")
+    for run in runs:
+        old = baseline.get(run["clients"])
+        if not old:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            before, after = old["overall"][metric], run["overall"][metric]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"   {run['clients']} client(s) {metric}: {before} → {after} ms ({change:+.1f}%)")
+        before, after = old["throughput_rps"], run["throughput_rps"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"   {run['clients']} client(s) throughput: {before} → {after} req/s ({change:+.1f}%)")
+
+
+def parse_latency(spec):
+    latency = dict(DEFAULT_LATENCY)
+    for part in filter(None, (spec or "").split(",")):
+        name, value = part.split("=")
+        latency[name.strip()] = float(value)
+    return latency
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay chat requests against /chat")
+    parser.add_argument("requests_file", nargs="?", default=DEFAULT_REQUESTS)
+    parser.add_argument("--clients", default="1,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--mode", choices=["client", "port"], default="client")
+    parser.add_argument("--url", help="Replay against a running server instead of the stubbed app")
+    parser.add_argument("--latency", help="Stub latencies in seconds, e.g. openai=0.5,shopify=0.1")
+    parser.add_argument("--no-response-cache", action="store_true")
+    parser.add_argument("--save", help="Write the results as JSON")
+    parser.add_argument("--compare", help="Results JSON from an earlier run")
+    args = parser.parse_args()
+
+    requests_file = os.path.abspath(args.requests_file)
+    save_path = os.path.abspath(args.save) if args.save else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    chat_requests = load_requests(requests_file)
+    latency = parse_latency(args.latency)
+
+    if args.url:
+        mode, send = "url", make_sender("url", url=args.url.rstrip("/"))
+    else:
+        app, workspace = load_stubbed_app(latency, response_cache=not args.no_response_cache)
+        mode = args.mode
+        if mode == "port":
+            from werkzeug.serving import make_server
+            http_server = make_server("127.0.0.1", 0, app, threaded=True)
+            threading.Thread(target=http_server.serve_forever, daemon=True).start()
+            send = make_sender("port", url=f"http://127.0.0.1:{http_server.server_port}")
+        else:
+            send = make_sender("client", app=app)
+
+    print(f"📨 Replaying {len(chat_requests)} requests from {requests_file} ({mode} mode)")
+    runs = []
+    for clients in [int(c) for c in args.clients.split(",")]:
+        results, wall = run_replay(chat_requests, clients, send, run_tag=f"c{clients}")
+        summary = summarize(results, wall, clients)
+        runs.append(summary)
+        print_summary(summary)
+
+    if compare_path:
+        compare(runs, compare_path)
+
+    if save_path:
+        with open(save_path, "w") as f:
+            json.dump({
+                "requests_file": requests_file,
+                "mode": mode,
+                "latency": latency if mode != "url" else None,
+                "response_cache": not args.no_response_cache,
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "runs": runs,
+            }, f, indent=2)
+        print(f"💾 Results saved to {save_path}")
@@ -0,0 +1,118 @@
+"""Benchmark: exact pairwise scan vs MinHash/LSH in check_duplicates.
+
+Usage: python3 benchmarks/bench_check_duplicates.py [sizes...] [--workers N]
+(default sizes 10000 100000). The exact scan is only run up to EXACT_MAX
+phrases; above that its time is extrapolated from a sample of rows and recall
+is measured against the exact conflicts of a random phrase sample.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import check_duplicates as cd
+
+EXACT_MAX = 10000
+RECALL_SAMPLE = 200
+INTENTS = ["studio", "search_collection", "contact", "faqs", "search_pages", "search_blog", "not_supported"]
+
+
+def mutate(phrase, rng):
+    chars = list(phrase)
+    for _ in range(rng.randint(0, 2)):
+        if not chars:
+            break
+        pos = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.4:
+            chars[pos] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif op < 0.7:
+            del chars[pos]
+        else:
+            chars.insert(pos, rng.choice("abcdefghijklmnopqrstuvwxyz "))
+    return "".join(chars)
+
+
+def synthetic_data(size, seed=7):
+    rng = random.Random(seed)
+    base = [p for _, p in ((e["intent"], p) for e in cd.load_training_data() for p in e["examples"])]
+    words = sorted({w for p in base for w in p.lower().split()})
+    grouped = {intent: [] for intent in INTENTS}
+
+    for n in range(size):
+        phrase = rng.choice(base).lower()
+        if rng.random() < 0.7:
+            # Mostly new phrases built from the training vocabulary
+            phrase = " ".join(rng.choice(words) for _ in range(rng.randint(3, 9)))
+        grouped[rng.choice(INTENTS)].append(mutate(phrase, rng))
+
+    return [{"intent": intent, "examples": examples} for intent, examples in grouped.items()]
+
+
+def pair_key(conflict):
+    p1, i1, p2, i2, _ = conflict
+    return tuple(sorted([(p1, i1), (p2, i2)]))
+
+
+def sampled_exact(all_phrases, sample_idx, threshold):
+    expected = set()
+    for i in sample_idx:
+        phrase1, intent1 = all_phrases[i]
+        for j, (phrase2, intent2) in enumerate(all_phrases):
+            if j == i or intent1 == intent2:
+                continue
+            # Exact length bound of SequenceMatcher.ratio(), just to keep the sample fast
+            if 2 * min(len(phrase1), len(phrase2)) < threshold * (len(phrase1) + len(phrase2)):
+                continue
+            if cd.similar_enough(phrase1, phrase2, threshold) is not None:
+                expected.add(tuple(sorted([(phrase1, intent1), (phrase2, intent2)])))
+    return expected
+
+
+def run(size, workers):
+    data = synthetic_data(size)
+    all_phrases = cd.collect_phrases(data)
+    threshold = cd.SIMILARITY_THRESHOLD
+    print(f"\n📏 {size} phrases (threshold {threshold})")
+
+    start = time.perf_counter()
+    lsh = cd.find_fuzzy_conflicts_lsh(all_phrases, threshold, workers=workers)
+    lsh_time = time.perf_counter() - start
+    found = {pair_key(c) for c in lsh}
+
+    if size <= EXACT_MAX:
+        start = time.perf_counter()
+        exact = cd.find_fuzzy_conflicts_exact(all_phrases, threshold)
+        exact_time = time.perf_counter() - start
+        expected = {pair_key(c) for c in exact}
+        recall = len(found & expected) / len(expected) if expected else 1.0
+        print(f"   exact: {exact_time:.2f}s, {len(expected)} conflicts")
+    else:
+        rng = random.Random(size)
+        sample_idx = rng.sample(range(len(all_phrases)), RECALL_SAMPLE)
+        start = time.perf_counter()
+        expected = sampled_exact(all_phrases, sample_idx, threshold)
+        sample_time = time.perf_counter() - start
+        # Each sampled row compares against all n phrases; the full scan does n²/2
+        exact_time = sample_time * (len(all_phrases) / 2) / RECALL_SAMPLE
+        sampled = {all_phrases[i] for i in sample_idx}
+        hits = {k for k in found if k[0] in sampled or k[1] in sampled}
+        recall = len(hits & expected) / len(expected) if expected else 1.0
+        print(f"   exact (extrapolated from {RECALL_SAMPLE} rows): ~{exact_time:.0f}s, {len(expected)} sampled conflicts")
+
+    print(f"   lsh:   {lsh_time:.2f}s, {len(found)} conflicts (workers={workers})")
+    print(f"   ⚡ speedup: {exact_time / lsh_time:.1f}x — recall: {recall:.4f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = 1
+    if "--workers" in args:
+        pos = args.index("--workers")
+        workers = int(args[pos + 1])
+        del args[pos:pos + 2]
+    sizes = [int(a) for a in args] or [10000, 100000]
+    for size in sizes:
+        run(size, workers)
@@ -0,0 +1,74 @@
+"""Benchmark: hybrid collection search (BM25 + dense embeddings + RRF) query cost.
+
+Usage: python3 benchmarks/bench_collection_search.py [sizes] [queries]
+sizes is a comma-separated list of catalog sizes (default 1000,5000). Collections
+and embeddings are synthetic; query encoding is not included (one MiniLM call,
+same as the FAQ search), only what collection_search.py does per request.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+
+from collection_search import CollectionIndex, search_tokens
+
+STYLES = ["talavera", "zellige", "terracotta", "cement", "saltillo", "moroccan", "glazed", "hand painted"]
+COLORS = ["blue", "white", "green", "black", "cream", "pink", "yellow", "rust"]
+SPACES = ["kitchen", "bathroom", "shower", "backsplash", "floor", "patio", "pool", "fireplace"]
+QUERIES = [
+    "terracotta floor for a patio",
+    "white zellige backsplash",
+    "blue talavera tiles for my kitchen",
+    "something green for a pool",
+    "8x8 cement tile",
+]
+DIMENSIONS = 384  # all-MiniLM-L6-v2
+
+
+def synthetic_collections(size):
+    collections = []
+    for i in range(size):
+        style, color, space = STYLES[i % 8], COLORS[(i // 8) % 8], SPACES[(i // 64) % 8]
+        collections.append({
+            "handle": f"{color}-{style.replace(' ', '-')}-{i}",
+            "title": f"{color.title()} {style.title()} Collection {i}",
+            "body_html": f"<p>Handmade {color} {style} tile for {space} projects.</p>",
+            "tags": f"{style}, {color}, {space}",
+            "image": {"src": f"https://cdn.example.com/{i}.jpg"} if i % 10 else {},
+            "product_count": 0 if i % 17 == 0 else 12,
+            "product_titles": [f"{color} {style} {size} tile" for size in ("4x4", "8x8", "2x8")],
+        })
+    return collections
+
+
+def time_per_query(fn, queries, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) / (repeats * len(queries)) * 1000
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 5000]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = np.random.default_rng(7)
+    query_vectors = {q: rng.standard_normal(DIMENSIONS).astype(np.float32) for q in QUERIES}
+
+    for size in sizes:
+        collections = synthetic_collections(size)
+        start = time.perf_counter()
+        index = CollectionIndex(collections, rng.standard_normal((size, DIMENSIONS)).astype(np.float32))
+        build_ms = (time.perf_counter() - start) * 1000
+
+        bm25_ms = time_per_query(lambda q: index.bm25.scores(search_tokens(q)), QUERIES, repeats)
+        dense_ms = time_per_query(lambda q: index.embeddings @ query_vectors[q], QUERIES, repeats)
+        hybrid_ms = time_per_query(lambda q: index.search(q, query_vectors[q]), QUERIES, repeats)
+        print(f"📊 {size:6d} collections | build {build_ms:7.1f} ms | per query: bm25 {bm25_ms:.3f} ms, "
+              f"dense {dense_ms:.3f} ms, hybrid+RRF {hybrid_ms:.3f} ms")
+
+    print(f"\n🔎 Top BM25-only results for “{QUERIES[0]}”: {index.search(QUERIES[0])[:3]}")
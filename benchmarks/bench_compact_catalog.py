@@ -0,0 +1,127 @@
+"""Benchmark: cached_collections.joblib vs the memory-mapped catalog.compact.
+
+Usage: python3 benchmarks/bench_compact_catalog.py [collections_file] [workers]
+
+Without a collections_described.jsonl a synthetic catalog is used (3,000 collections
+sharing 20,000 products, ~150 product titles each). Every format is loaded by
+`workers` fresh processes, like gunicorn workers. Each one reports:
+- load time;
+- private memory after loading and after one pass that reads every field (a keyword ranking),
+  plus the RSS growth, which also counts shared page-cache pages;
+- the time that pass took.
+Private memory is what each worker pays on its own. mmap'd pages are shared through
+the page cache, so they don't show up there. Both formats must return the same data.
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from compact_catalog import write_compact_catalog, load_compact_catalog, FIELDS
+from json_stream import load_records
+
+WORDS = ["talavera", "zellige", "terracotta", "cement", "saltillo", "glazed", "matte", "hexagon",
+         "blue", "white", "green", "cream", "handmade", "mexican", "moroccan", "encaustic"]
+
+
+def synthetic_collections(count=3000, products=20000, per_collection=150, seed=7):
+    rng = random.Random(seed)
+    titles = [f"{' '.join(rng.sample(WORDS, 3)).title()} Tile {rng.choice(['4x4', '8x8', '2x8'])} #{i}"
+              for i in range(products)]
+    collections = []
+    for i in range(count):
+        collections.append({
+            "id": 400000000 + i,
+            "handle": f"collection-{i}",
+            "title": f"{' '.join(rng.sample(WORDS, 2)).title()} Collection {i}",
+            "body_html": f"<p>{' '.join(rng.choices(WORDS, k=30))}.</p>",
+            "tags": ", ".join(rng.sample(WORDS, 4)),
+            "image": {"src": f"https://cdn.shopify.com/s/files/collections/{i}.jpg", "width": 800, "height": 800,
+                      "alt": None, "created_at": "2024-01-01T00:00:00-05:00"},
+            "updated_at": "2024-01-01T00:00:00-05:00",
+            "published_scope": "web",
+            "sort_order": "best-selling",
+            "product_count": per_collection,
+            "product_titles": rng.sample(titles, per_collection),
+        })
+    return collections
+
+
+def comparable(coll):
+    return {field: coll.get(field, [] if field == "product_titles" else "") for field in FIELDS
+            if field != "image"} | {"image": {"src": coll["image"]["src"]} if coll.get("image", {}).get("src") else {}}
+
+
+WORKER = r"""
+import sys, time
+sys.path.insert(0, {root!r})
+
+def memory_kb():
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if line[:1].isupper())  # Skip the address range line
+    kb = {{key: int(value.split()[0]) for key, value in fields.items()}}
+    return kb["Rss"], kb["Private_Clean"] + kb["Private_Dirty"]
+
+import joblib, compact_catalog
+rss_before, private_before = memory_kb()
+start = time.perf_counter()
+catalog = joblib.load({path!r}) if {fmt!r} == "joblib" else compact_catalog.load_compact_catalog({path!r})
+load_ms = (time.perf_counter() - start) * 1000
+private_loaded = memory_kb()[1] - private_before
+
+start = time.perf_counter()
+hits = 0
+for coll in catalog:
+    text = " ".join([coll.get("title", ""), coll.get("body_html", ""), coll.get("tags", "")] + coll.get("product_titles", []))
+    hits += ("zellige" in text) + bool(coll.get("image", {{}}).get("src")) + (coll.get("product_count", 0) > 0)
+pass_ms = (time.perf_counter() - start) * 1000
+rss_after, private_after = memory_kb()
+print(load_ms, private_loaded, private_after - private_before, rss_after - rss_before, pass_ms)
+"""
+
+
+def run_worker(fmt, path):
+    code = WORKER.format(root=ROOT, path=path, fmt=fmt)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return [float(value) for value in output.split()]
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else None
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if source:
+        collections = load_records(source)
+    else:
+        # Through JSON like the real pipeline, so equal titles are separate string objects
+        collections = json.loads(json.dumps(synthetic_collections()))
+
+    workdir = tempfile.mkdtemp(prefix="catalog_bench_")
+    joblib_path = os.path.join(workdir, "cached_collections.joblib")
+    catalog_path = os.path.join(workdir, "catalog.compact")
+
+    start = time.perf_counter()
+    joblib.dump(collections, joblib_path)
+    joblib_write_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    write_compact_catalog(catalog_path, collections)
+    catalog_write_ms = (time.perf_counter() - start) * 1000
+
+    catalog = load_compact_catalog(catalog_path)
+    mismatches = sum(comparable(a) != dict(b) for a, b in zip(collections, catalog))
+    print(f"📦 {len(collections)} collections, {catalog.header['products']} distinct products, "
+          f"{catalog.header['strings']} interned strings | mismatches: {mismatches}")
+
+    for fmt, path, write_ms in [("joblib", joblib_path, joblib_write_ms), ("compact", catalog_path, catalog_write_ms)]:
+        runs = [run_worker(fmt, path) for _ in range(workers)]
+        load_ms, load_kb, pass_kb, rss_kb, pass_ms = [sum(r[i] for r in runs) / len(runs) for i in range(5)]
+        print(f"📊 {fmt:<8} file {os.path.getsize(path) / 1e6:5.1f} MB | write {write_ms:5.0f} ms | "
+              f"load {load_ms:6.1f} ms | private/worker {load_kb / 1024:5.1f} MB loaded, "
+              f"{pass_kb / 1024:5.1f} MB after a full pass (RSS +{rss_kb / 1024:.1f} MB) | full pass {pass_ms:4.0f} ms")
@@ -0,0 +1,136 @@
+"""Benchmark: peak RSS of the collection enrichment stage, json.load vs streaming.
+
+Usage: python3 benchmarks/bench_enrichment_memory.py [products] [collections]
+
+Writes a synthetic catalog (default 200,000 REST-shaped products with variants,
+images and body_html, indent=2 like the REST export, and 60 collections, two thirds
+with tag rules) and runs each enrichment in a fresh process:
+- legacy: the previous generate_collection_descriptions.py logic (json.load of
+  products.json, tag index of full product dicts, indent=2 json.dump)
+- streaming: generate_collection_descriptions.py as it is now
+Every collection already has body_html, so no OpenAI call is made. The script
+reports peak RSS and time for each and checks that both find the same products.
+"""
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+STYLES = ["talavera", "zellige", "terracotta", "cement", "saltillo", "moroccan", "glazed", "encaustic"]
+COLORS = ["blue", "white", "green", "black", "cream", "pink", "yellow", "rust"]
+
+
+def write_catalog(workdir, product_count, collection_count):
+    rng = random.Random(9)
+    with open(os.path.join(workdir, "products.json"), "w", encoding="utf-8") as f:
+        f.write("[")
+        for i in range(product_count):
+            style, color = STYLES[i % 8], COLORS[(i // 8) % 8]
+            product = {
+                "id": 8000000000 + i,
+                "title": f"{color.title()} {style.title()} Tile {i}",
+                "handle": f"{color}-{style}-tile-{i}",
+                "status": "active",
+                "tags": ", ".join([style, color, rng.choice(["kitchen", "bathroom", "floor", "pool"])]),
+                "body_html": f"<p>Handmade {color} {style} tile, glazed by hand in Mexico.</p>" * 4,
+                "variants": [{"id": i * 10 + v, "title": f"{4 * (v + 1)}x{4 * (v + 1)}", "price": "12.50",
+                              "sku": f"SKU-{i}-{v}", "inventory_quantity": rng.randrange(500)} for v in range(2)],
+                "images": [{"id": i, "src": f"https://cdn.shopify.com/s/files/{i}.jpg", "width": 2048, "height": 2048}],
+            }
+            f.write(",\n" if i else "\n")
+            f.write(json.dumps(product, indent=2))
+        f.write("\n]\n")
+
+    collections = []
+    for i in range(collection_count):
+        style, color = STYLES[i % 8], COLORS[(i // 8) % 8]
+        collection = {"id": i, "handle": f"collection-{i}", "title": f"{color.title()} {style.title()} Collection",
+                      "body_html": f"<p>Our {color} {style} tiles.</p>"}
+        if i % 3:
+            collection["rules"] = [{"column": "tag", "relation": "equals", "condition": style}]
+        collections.append(collection)
+    with open(os.path.join(workdir, "collections.json"), "w", encoding="utf-8") as f:
+        json.dump(collections, f, indent=2)
+
+
+def legacy_enrichment():
+    # generate_collection_descriptions.py before streaming (description generation left out)
+    with open("collections.json", "r", encoding="utf-8") as f:
+        collections = json.load(f)
+    with open("products.json", "r", encoding="utf-8") as f:
+        products = json.load(f)
+
+    tag_to_products = {}
+    for product in products:
+        for tag in product.get("tags", "").split(", "):
+            tag_to_products.setdefault(tag.strip().lower(), []).append(product)
+
+    for collection in collections:
+        matched_products = []
+        for rule in collection.get("rules", []):
+            if rule["column"] == "tag":
+                matched_products.extend(tag_to_products.get(rule["condition"].strip().lower(), []))
+        if not matched_products:
+            title_keywords = collection.get("title", "").lower().split()
+            for product in products:
+                product_title = product.get("title", "").lower()
+                if all(word in product_title for word in title_keywords if len(word) > 3):
+                    matched_products.append(product)
+        collection["product_count"] = len(matched_products)
+        collection["product_titles"] = [p["title"] for p in matched_products]
+
+    with open("collections_described.json", "w", encoding="utf-8") as f:
+        json.dump(collections, f, indent=2, ensure_ascii=False)
+
+
+def streaming_enrichment():
+    import generate_collection_descriptions as enrichment
+    from json_stream import iter_json_records, write_jsonl
+
+    products = enrichment.load_product_index()
+    stats = {"updated": 0}
+    write_jsonl(enrichment.DESCRIBED_COLLECTIONS_FILE,
+                enrichment.enrich_collections(iter_json_records(enrichment.COLLECTIONS_FILE), products, stats))
+
+
+def run_child(mode, workdir):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode],
+                            cwd=workdir, capture_output=True, text=True, check=True,
+                            env={**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-bench")})
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        import generate_collection_descriptions  # noqa: F401 (same imports in both runs: openai, tqdm)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        legacy_enrichment() if sys.argv[2] == "legacy" else streaming_enrichment()
+        print(json.dumps({"seconds": time.perf_counter() - start, "baseline_kb": before,
+                          "peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+        sys.exit(0)
+
+    product_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    collection_count = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    workdir = tempfile.mkdtemp(prefix="enrichment_bench_")
+    write_catalog(workdir, product_count, collection_count)
+    print(f"🧱 {product_count} products ({os.path.getsize(os.path.join(workdir, 'products.json')) / 1e6:.0f} MB products.json), "
+          f"{collection_count} collections")
+
+    for mode in ("legacy", "streaming"):
+        result = run_child(mode, workdir)
+        print(f"📈 {mode:<9} peak RSS {result['peak_kb'] / 1024:7.1f} MB (interpreter + imports "
+              f"{result['baseline_kb'] / 1024:.0f} MB) | {result['seconds']:6.1f} s")
+
+    from json_stream import load_records
+    with open(os.path.join(workdir, "collections_described.json"), encoding="utf-8") as f:
+        legacy = [(c["product_count"], c["product_titles"]) for c in json.load(f)]
+    streamed = [(c["product_count"], c["product_titles"]) for c in load_records(os.path.join(workdir, "collections_described.jsonl"))]
+    print(f"\n🔁 Same products matched for every collection: {legacy == streamed}")
@@ -0,0 +1,55 @@
+"""Benchmark: per-message routing time of IntentRouter vs the sklearn model alone.
+
+Usage: python3 benchmarks/bench_intent_router.py [repeats]
+Uses intent_model.joblib when present, otherwise trains one from training_data.json.
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import joblib
+
+import intent_router
+import weekly_learning
+
+
+def load_model():
+    try:
+        return joblib.load(weekly_learning.MODEL_FILE)
+    except Exception:
+        model = weekly_learning.build_intent_pipeline()
+        pairs = weekly_learning.flatten_training_data(weekly_learning.load_existing_examples())
+        model.fit([msg for msg, _ in pairs], [intent for _, intent in pairs])
+        return model
+
+
+def per_message_us(fn, messages, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - start) / (repeats * len(messages)) * 1e6
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    model = load_model()
+    router = intent_router.load_intent_router()
+    pairs = weekly_learning.flatten_training_data(weekly_learning.load_existing_examples())
+    # Training phrases plus unseen variants so the exact lookup isn't the only path exercised
+    messages = [msg.lower() for msg, _ in pairs] + [f"hi, {msg.lower()} please" for msg, _ in pairs]
+
+    fast = [m for m in messages if (r := router.match(m)) and r[1] > router.min_confidence]
+    slow = [m for m in messages if m not in set(fast)]
+
+    print(f"📨 {len(messages)} messages, {len(fast)} resolved by rules ({len(fast) / len(messages):.0%})")
+    print(f"   model.predict only:      {per_message_us(lambda m: model.predict([m]), messages, repeats):8.1f} µs/msg")
+    print(f"   router (all messages):   {per_message_us(lambda m: router.route(m, model), messages, repeats):8.1f} µs/msg")
+    if fast:
+        print(f"   router fast path:        {per_message_us(lambda m: router.route(m, model), fast, repeats):8.1f} µs/msg")
+    if slow:
+        print(f"   router model fallback:   {per_message_us(lambda m: router.route(m, model), slow, repeats):8.1f} µs/msg")
@@ -0,0 +1,117 @@
+"""Benchmark: weekly_learning log loading, full get_all_records() vs incremental ingestion.
+
+Usage: python3 benchmarks/bench_log_ingestion.py [existing_rows] [new_rows_per_week]
+
+FakeSheet stands in for the "Chatbot logs" worksheet: it keeps the rows in
+memory and answers row_values/get/get_all_records like gspread, counting the
+API calls and the cells each one returns. Each week appends new_rows_per_week
+rows, then both modes look for new training examples:
+- full: get_all_records() of the whole sheet, then a Python scan of every row
+- incremental: ranged reads of the rows after log_ingest_state.json, into
+  conversations.db, then one set-difference query
+Both must find the same examples. Last, a row above the saved position is
+deleted, to check that the incremental mode notices and re-ingests.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gspread.utils import a1_range_to_grid_range
+
+import conversation_store
+import weekly_learning
+
+HEADER = ["Timestamp", "User Message", "Intent", "Bot Response"]
+INTENTS = ["search_collection", "shipping_info", "order_status", "faq", "unknown"]
+
+
+class FakeSheet:
+    def __init__(self, rows=()):
+        self.rows = [list(HEADER)] + [list(row) for row in rows]
+        self.calls = 0
+        self.cells = 0
+
+    def _served(self, rows):
+        self.calls += 1
+        self.cells += sum(len(row) for row in rows)
+        return rows
+
+    def row_values(self, row):
+        return self._served([self.rows[row - 1]] if row <= len(self.rows) else [[]])[0]
+
+    def get(self, range_name):
+        grid = a1_range_to_grid_range(range_name)
+        rows = [row[grid["startColumnIndex"]:grid["endColumnIndex"]]
+                for row in self.rows[grid["startRowIndex"]:grid["endRowIndex"]]]
+        return self._served(rows)
+
+    def get_all_records(self):
+        rows = self._served(self.rows)
+        return [dict(zip(rows[0], row)) for row in rows[1:]]
+
+    def append_row(self, row):
+        self.rows.append(list(row))
+
+
+def synthetic_rows(count, start, rng):
+    rows = []
+    for i in range(start, start + count):
+        # Most questions repeat; a few are new wordings worth learning
+        message = f"do you have blue tiles for a kitchen {rng.randrange(300)}" if rng.random() < 0.9 else f"new question {i}"
+        rows.append([f"2026-01-01 00:00:{i:06d}", message, rng.choice(INTENTS), "<p>answer</p>" * 10])
+    return rows
+
+
+def measure(sheet, fn):
+    sheet.calls = sheet.cells = 0
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start, sheet.calls, sheet.cells
+
+
+if __name__ == "__main__":
+    existing_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    weekly_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(3)
+    workdir = tempfile.mkdtemp(prefix="log_ingest_bench_")
+    state_path = os.path.join(workdir, "log_ingest_state.json")
+    store = conversation_store.ConversationStore(os.path.join(workdir, "conversations.db"))
+
+    known = [{"intent": intent, "examples": [f"do you have blue tiles for a kitchen {n}" for n in range(0, 300, 2)]}
+             for intent in INTENTS[:1]]
+    known_phrases = weekly_learning.known_phrases_of(known)
+    sheet = FakeSheet(synthetic_rows(existing_rows, 0, rng))
+
+    def incremental():
+        conversation_store.ingest_new_rows(sheet, store, state_path=state_path)
+        return store.new_training_examples(known_phrases)
+
+    def full():
+        return weekly_learning.extract_new_training_examples(sheet.get_all_records(), known)
+
+    _, seconds, calls, cells = measure(sheet, incremental)
+    print(f"🆕 First incremental run (whole sheet, {existing_rows} rows): {seconds * 1000:.0f} ms, {calls} calls, {cells} cells\n")
+
+    for week in range(1, 4):
+        for row in synthetic_rows(weekly_rows, len(sheet.rows), rng):
+            sheet.append_row(row)
+        full_examples, full_s, full_calls, full_cells = measure(sheet, full)
+        inc_examples, inc_s, inc_calls, inc_cells = measure(sheet, incremental)
+        same = set(full_examples) == set(map(tuple, inc_examples))
+        print(f"📅 Week {week} (+{weekly_rows} rows, {len(sheet.rows) - 1} total)")
+        print(f"   full        {full_s * 1000:7.1f} ms | {full_calls:3d} calls | {full_cells:8d} cells")
+        print(f"   incremental {inc_s * 1000:7.1f} ms | {inc_calls:3d} calls | {inc_cells:8d} cells "
+              f"| same examples: {same} ({len(inc_examples)})")
+
+    with open(state_path) as f:
+        print(f"\n📍 State: {json.load(f)}")
+    del sheet.rows[10]
+    sheet.append_row(synthetic_rows(1, len(sheet.rows), rng)[0])
+    _, seconds, calls, cells = measure(sheet, incremental)
+    print(f"✂️ After deleting a row above the saved position: {len(store)} rows in the store, "
+          f"sheet has {len(sheet.rows) - 1} ({calls} calls, {cells} cells)")
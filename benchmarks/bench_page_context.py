@@ -0,0 +1,101 @@
+"""Benchmark: page text sent to summarize_page_content, old concatenation vs chunk selection.
+
+Usage: python3 benchmarks/bench_page_context.py [repeats]
+
+The old path sent raw body_html + the scraped storefront text, cut at 3000 characters.
+The new path de-HTMLs the page, drops the sentences the storefront repeats from
+body_html, chunks it and keeps only the chunks closest to the question, within
+PAGE_CONTEXT_TOKENS. The synthetic policy page puts each answer in its own section,
+some of them past the 3000-character cut.
+
+Offline stand-ins: the scrape returns a saved storefront page, and a bag-of-words
+hashing embedder replaces MiniLM. Its relevance is cruder than the real model's.
+Tokens are counted with tiktoken when it can load, otherwise estimated as characters / 4.
+"""
+import hashlib
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+class HashingEmbedder:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), 512), dtype=np.float32)
+        for row, text in enumerate([texts] if single else texts):
+            for word in re.findall(r"[a-z]{4,}", text.lower()):
+                vectors[row, int(hashlib.md5(word[:4].encode()).hexdigest(), 16) % 512] += 1
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors[0] if single else vectors
+
+
+import sentence_transformers
+sentence_transformers.SentenceTransformer = HashingEmbedder
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+import page_scraper
+
+SECTIONS = {
+    "Processing time": "Orders ship from our Austin warehouse within 3 to 5 business days after payment clears.",
+    "Shipping rates": "Freight for tile orders is quoted by weight and calculated at checkout for every address.",
+    "Damaged tiles": "Report breakage within 48 hours of delivery with photos so we can send replacements at no cost.",
+    "Returns": "Unused boxes can be returned within 30 days and refunds are issued within 10 business days.",
+    "Samples": "Sample orders ship by ground and their cost is credited toward your first full tile order.",
+    "International orders": "We ship to Canada and Mexico by freight and customs duties are paid by the customer.",
+}
+FILLER = [  # Boilerplate around each answer; {topic} keeps sentences distinct between sections
+    "Every piece is handmade by artisans in Mexico, so colors vary slightly from tile to tile ({topic}).",
+    "That variation is part of the charm of a handmade surface and is not considered a defect under {topic}.",
+    "Our team checks each box by hand before it leaves the warehouse, as described in {topic}.",
+    "Please keep your order confirmation email, it lists the lot number of your tiles for {topic}.",
+    "Questions about {topic} can be sent to our customer care team at any time.",
+]
+QUESTIONS = {
+    "how long until my order ships": "Processing time",
+    "what if my tiles arrive broken": "Damaged tiles",
+    "how do refunds work for returned boxes": "Returns",
+    "do you ship to canada": "International orders",
+}
+
+
+def policy_page():
+    body = "".join(f"<h3>{title}</h3><p><span style=\"font-weight: 400;\">{title} policy. "
+                   f"{' '.join(line.format(topic=title.lower()) for line in FILLER)} {text}</span></p>"
+                   for title, text in SECTIONS.items())
+    storefront = (f"<html><body><header class='site-header'><nav><a>Shop</a><a>Trade</a></nav></header>"
+                  f"<main><h1>Shipping Policy</h1>{body}</main><div class='newsletter'>Join our list</div>"
+                  f"<footer class='site-footer'>© Clay Imports</footer></body></html>")
+    return {"handle": "shipping-policy", "title": "Shipping Policy", "body_html": body}, storefront
+
+
+def old_page_text(page, scraped):
+    return f"{page['body_html'].strip()}\n\n{scraped}".strip()[:3000]
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    page, storefront = policy_page()
+    scraped = page_scraper.extract_visible_text(storefront)
+    page_scraper.scrape_shopify_page = lambda url: scraped
+
+    for question, section in QUESTIONS.items():
+        old = old_page_text(page, scraped)
+        new = page_scraper.get_page_context(page, question)
+        answer = SECTIONS[section]
+        print(f"❓ {question:<40} old {page_scraper.count_tokens(old):4d} tokens (answer kept: {answer in old!s:5}) | "
+              f"new {page_scraper.count_tokens(new):4d} tokens (answer kept: {answer in new})")
+
+    page_scraper.get_page_context(page, "warm up")
+    start = time.perf_counter()
+    for _ in range(repeats):
+        page_scraper.get_page_context(page, "how long until my order ships")
+    print(f"\n⏱️ Preprocess + select per request (chunk embeddings cached): "
+          f"{(time.perf_counter() - start) / repeats * 1000:.2f} ms")
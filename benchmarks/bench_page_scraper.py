@@ -0,0 +1,91 @@
+"""Benchmark: page_scraper text extraction, BeautifulSoup/html.parser vs lxml with early pruning.
+
+Usage: python3 benchmarks/bench_page_scraper.py [fixtures_dir] [repeats]
+fixtures_dir holds saved storefront pages (*.html). Without it a synthetic Shopify-like
+page is used. Both extractors must produce the same text for every fixture.
+"""
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+
+import page_scraper
+
+
+def synthetic_page(sections=60):
+    blocks = []
+    for i in range(sections):
+        blocks.append(f"""
+        <div class="product-block section-{i}">
+          <h2>Handmade Talavera Pot &amp; Saucer {i}</h2>
+          <p>Glazed by hand in Puebla. Size: {i % 20 + 4}" x {i % 12 + 3}". <b>Frost</b> resistant?
+             <a href="/pages/care">Read our care guide</a>.</p>
+          <!-- product {i} analytics -->
+          <div class="Social-Share-Buttons"><a>Share</a> <a>Pin it</a></div>
+          <div class="wishlist-toggle"><button>Add to wishlist</button></div>
+          <ul class="specs"><li>Clay</li><li>Lead free glaze</li></ul>
+          <script>window.dataLayer.push({{"id": {i}}});</script>
+        </div>""")
+    return f"""<!DOCTYPE html>
+<html><head><title>Clay Imports</title><style>.x {{ color: red; }}</style></head>
+<body>
+  <header class="site-header"><nav class="main-menu"><a>Shop</a><a>Trade</a></nav></header>
+  <div class="breadcrumb"><a>Home</a> / <a>Pages</a></div>
+  <main>{''.join(blocks)}</main>
+  <form class="newsletter"><input name="email"><button>Subscribe</button></form>
+  <svg><path d="M0 0"/></svg>
+  <footer class="site-footer"><p>© Clay Imports</p></footer>
+</body></html>"""
+
+
+def load_fixtures(path):
+    if path:
+        fixtures = {}
+        for file_path in sorted(glob.glob(os.path.join(path, "*.html"))):
+            with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                fixtures[os.path.basename(file_path)] = f.read()
+        return fixtures
+    return {"synthetic": synthetic_page()}
+
+
+def per_page_ms(fn, html, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(html)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+if __name__ == "__main__":
+    fixtures_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    if page_scraper.PARSER_BACKEND != "lxml":
+        sys.exit("❌ lxml is not installed; nothing to compare against.")
+
+    fixtures = load_fixtures(fixtures_dir)
+    if not fixtures:
+        sys.exit(f"❌ No *.html files in {fixtures_dir}")
+
+    mismatches = 0
+    total_old = total_new = 0.0
+    for name, html in fixtures.items():
+        old_text = page_scraper.extract_visible_text_bs4(html)
+        new_text = page_scraper.extract_visible_text_lxml(html)
+        same = old_text == new_text
+        mismatches += not same
+
+        old_ms = per_page_ms(page_scraper.extract_visible_text_bs4, html, repeats)
+        new_ms = per_page_ms(page_scraper.extract_visible_text_lxml, html, repeats)
+        total_old += old_ms
+        total_new += new_ms
+        print(f"📄 {name} ({len(html) / 1024:.0f} KB): html.parser {old_ms:7.2f} ms | lxml {new_ms:7.2f} ms "
+              f"| {old_ms / new_ms:4.1f}x | {'same text' if same else '⚠️ TEXT DIFFERS'}")
+        if not same:
+            print(f"   html.parser: {old_text[:200]!r}")
+            print(f"   lxml:        {new_text[:200]!r}")
+
+    print(f"\n⏱️ Total: html.parser {total_old:.2f} ms vs lxml {total_new:.2f} ms ({total_old / total_new:.1f}x)")
+    print(f"{'✅' if not mismatches else '❌'} {len(fixtures) - mismatches}/{len(fixtures)} fixtures produce identical text")
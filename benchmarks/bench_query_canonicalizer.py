@@ -0,0 +1,102 @@
+"""Benchmark: query canonicalization (spelling correction + dimension normalization).
+
+Usage: python3 benchmarks/bench_query_canonicalizer.py [collections] [extra_words]
+
+The vocabulary comes from synthetic collections run through knowledge_documents()
+(as build_knowledge_index.py does) plus training_data.json. extra_words random
+pseudo-words pad it to the size of a real store with blogs and FAQs.
+Reports:
+1. Time to build the deletion index from the vocabulary
+2. Corrections for typical typos and dimension spellings, and messages that must
+   stay as typed (emails, real words the store doesn't use, times)
+3. Cost per message, first time and memoized
+4. Distinct response-cache keys for a stream of misspelled queries, raw vs canonical
+"""
+import json
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_collection_search import synthetic_collections
+from knowledge_index import knowledge_documents
+from query_canonicalizer import QueryCanonicalizer, vocabulary_counts
+from response_cache import normalize_message
+
+TYPOS = [
+    "terracota floor for a patio",
+    "white zellij backsplash",
+    "blue talavara tiles for my kitchn",
+    "do you have 4\" x 4\" cement tiles",
+    "8 by 8 saltilo tile",
+    "what is your retrun policy",
+    "how long does shiping take",
+    "hand painted tiels for a bathrom",
+]
+UNCHANGED = [
+    "my email is maria.lopez@gmail.com",
+    "what is my tracking number",
+    "is the glaze food safe",
+    "i ordered 3 by 5pm",
+    "order #1042 and www.clayimports.com/pages/faq",
+]
+
+
+def misspell(query, rng):
+    words = query.split()
+    i = rng.randrange(len(words))
+    word = words[i]
+    if len(word) > 4:
+        j = rng.randrange(1, len(word) - 1)
+        word = rng.choice([word[:j] + word[j + 1:], word[:j] + word[j] + word[j:], word[:j - 1] + word[j] + word[j - 1] + word[j + 1:]])
+    words[i] = word
+    return " ".join(words)
+
+
+def cpu_us(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    extra_words = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    rng = random.Random(11)
+
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    with open(os.path.join(root, "training_data.json")) as f:
+        examples = [example for group in json.load(f) for example in group["examples"]]
+    documents = knowledge_documents(collections=synthetic_collections(count), store_url="https://example.com")
+    counts = vocabulary_counts([doc["title"] for doc in documents] + [doc["text"] for doc in documents] + examples
+                               + ["shipping policy return refund"])
+    for _ in range(extra_words):
+        counts["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 11)))] += 1
+
+    start = time.perf_counter()
+    canonicalizer = QueryCanonicalizer(counts)
+    print(f"🏗️ Built in {(time.perf_counter() - start) * 1000:.0f} ms: {len(canonicalizer)} words, "
+          f"{len(canonicalizer.delete_index)} delete keys\n")
+
+    for query in TYPOS:
+        print(f"🔤 {query:<40} → {canonicalizer.canonicalize(query)}")
+    for query in UNCHANGED:
+        canonical = canonicalizer.canonicalize(query)
+        print(f"{'✅' if canonical == query else '❌'} {query:<40} → {canonical}")
+
+    stream = [misspell(rng.choice(TYPOS), rng) for _ in range(5000)]
+    canonicalizer.correct_word.cache_clear()
+    canonicalizer.canonicalize.cache_clear()
+    cold = cpu_us(canonicalizer.canonicalize, list(dict.fromkeys(stream)))
+    warm = cpu_us(canonicalizer.canonicalize, stream)
+    print(f"\n⏱️ Per message: {cold:.1f} µs first time, {warm:.2f} µs memoized")
+
+    raw_keys = {normalize_message(query) for query in stream}
+    canonical_keys = {normalize_message(canonicalizer.canonicalize(query)) for query in stream}
+    print(f"🗝️ {len(stream)} misspelled queries → {len(raw_keys)} distinct cache keys raw, {len(canonical_keys)} canonical "
+          f"(best-case hit rate {1 - len(raw_keys) / len(stream):.0%} → {1 - len(canonical_keys) / len(stream):.0%})")
@@ -0,0 +1,61 @@
+"""Benchmark: read/write latency per chat turn for each session backend.
+
+Usage: python3 benchmarks/bench_session_store.py [turns] [sessions]
+One turn = load the session, add three shown handles, save it back, which is
+what /chat does. The redis backend is skipped when redis isn't reachable.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import session_store
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(name, store, turns, session_count):
+    rng = random.Random(1)
+    loads, saves = [], []
+    for turn in range(turns):
+        session_id = f"session-{rng.randrange(session_count)}"
+
+        start = time.perf_counter()
+        session = store.load(session_id)
+        loads.append(time.perf_counter() - start)
+
+        session["last_intent"] = "search_collection"
+        session["last_collection_query"] = "blue zellige tiles for a kitchen"
+        session.setdefault("shown_collections", set()).update(f"collection-handle-{turn}-{i}" for i in range(3))
+
+        start = time.perf_counter()
+        store.save(session_id, session)
+        saves.append(time.perf_counter() - start)
+
+    turn_times = [l + s for l, s in zip(loads, saves)]
+    print(f"{name:>7}: load p50 {percentile(loads, 50) * 1e6:7.1f} µs  p99 {percentile(loads, 99) * 1e6:7.1f} µs | "
+          f"save p50 {percentile(saves, 50) * 1e6:7.1f} µs  p99 {percentile(saves, 99) * 1e6:7.1f} µs | "
+          f"turn p50 {percentile(turn_times, 50) * 1e6:7.1f} µs")
+
+
+if __name__ == "__main__":
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    session_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    run("memory", session_store.MemorySessionStore(), turns, session_count)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run("sqlite", session_store.SQLiteSessionStore(path=os.path.join(tmp, "sessions.db")), turns, session_count)
+
+    try:
+        store = session_store.RedisSessionStore()
+        store.load("ping")
+        run("redis", store, turns, session_count)
+    except Exception as e:
+        print(f"  redis: skipped ({e})")
@@ -0,0 +1,122 @@
+"""Benchmark: several stores served by one process (tenants.json).
+
+Usage: python3 benchmarks/bench_tenants.py [stores] [rounds]
+
+Uses the stubbed app of bench_chat_replay.py (no network, no real models) with
+stub latencies set to zero, and a tenants.json with the default store plus
+`stores` - 1 more, each with its own stores/<id>/ copy of the artifacts and its
+own store_url. The last store is keyed and needs X-Store-Key. The script reports:
+- what a store's first request costs (lazy load) against the following ones
+- evictions when the requests rotate over more stores than the memory budget holds
+- that the intent and embedding models are the same objects for every store
+  while catalogs and response caches are not
+- that collection links point at the store that was asked
+"""
+import atexit
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_chat_replay as replay
+
+STORE_FILES = ["cached_collections.joblib", "collection_index.joblib", "knowledge_index.joblib", "articles.json"]
+
+
+def write_stores(workspace, count):
+    tenants = {"default": {"store_url": "https://default.myshopify.com"}}
+    for n in range(1, count):
+        store_id = f"store{n}"
+        store_dir = os.path.join(workspace, "stores", store_id)
+        os.makedirs(store_dir)
+        for name in STORE_FILES:
+            shutil.copy(os.path.join(workspace, name), store_dir)
+        shutil.copy(os.path.join(workspace, "faqs.json"), os.path.join(store_dir, "faqs_claybot.json"))
+        shutil.copy(os.path.join(workspace, "faq_embeddings.pt"), store_dir)
+        tenants[store_id] = {"store_url": f"https://{store_id}.myshopify.com"}
+    tenants[f"store{count - 1}"]["keys"] = ["bench-key"]
+    with open(os.path.join(workspace, "tenants.json"), "w") as f:
+        json.dump(tenants, f, indent=2)
+    return list(tenants)
+
+
+def load_app(store_count):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-tenants")
+    os.environ.setdefault("IP_RATE_PER_MINUTE", "0")
+    os.environ.setdefault("SESSION_RATE_PER_MINUTE", "0")
+    os.environ["SHOPIFY_STORE_URL"] = "https://default.myshopify.com"
+    replay.install_stubs({stage: 0.0 for stage in replay.DEFAULT_LATENCY})
+    workspace = replay.prepare_workspace()
+    atexit.register(shutil.rmtree, workspace, ignore_errors=True)
+    store_ids = write_stores(workspace, store_count)
+    os.chdir(workspace)
+
+    import server
+
+    # Also for reloads of the default store after an eviction
+    server.FAQ_PATH = os.path.join(workspace, "faqs.json")
+    server.EMBEDDINGS_PATH = os.path.join(workspace, "faq_embeddings.pt")
+    replay.use_workspace_faq(server, workspace)
+    return server, store_ids
+
+
+def ask(client, store_id, message, session_id="bench"):
+    headers = {"X-Store-Key": "bench-key"} if store_id == store_ids[-1] else {"X-Store-Id": store_id}
+    start = time.perf_counter()
+    response = client.post("/chat", json={"message": message, "session_id": session_id}, headers=headers)
+    return time.perf_counter() - start, response
+
+
+if __name__ == "__main__":
+    store_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    server, store_ids = load_app(store_count)
+    client = server.app.test_client()
+    registry = server.tenant_registry
+    footprint = registry.loaded()[0].footprint_bytes()
+    print(f"\n🏬 {len(store_ids)} stores configured, loaded at startup: {[s.tenant.id for s in registry.loaded()]} "
+          f"({footprint / 1e6:.2f} MB of artifacts each)")
+
+    # 1. Lazy load: first request of a store vs the next ones
+    registry.budget_bytes = footprint * len(store_ids) * 2
+    first, _ = ask(client, store_ids[1], "do you have talavera tiles")
+    warm = [ask(client, store_ids[1], "do you have talavera tiles", session_id=f"warm{i}")[0] for i in range(rounds)]
+    print(f"⏱️ {store_ids[1]}: first request {first * 1000:.0f} ms (loads the store), "
+          f"then median {statistics.median(warm) * 1000:.0f} ms")
+
+    # 2. Budget: rotating over every store with room for two of them, then for all
+    for budget_stores in (2, len(store_ids)):
+        registry.budget_bytes = int(footprint * (budget_stores + 0.5))
+        evictions = registry.evictions
+        times = []
+        for i in range(rounds):
+            for store_id in store_ids:
+                times.append(ask(client, store_id, "what is your return policy", session_id=f"rot{i}")[0])
+        print(f"🧹 Budget for {budget_stores} store(s): {registry.evictions - evictions} evictions in "
+              f"{rounds * len(store_ids)} requests, median {statistics.median(times) * 1000:.0f} ms, "
+              f"max {max(times) * 1000:.0f} ms, loaded now: {[s.tenant.id for s in registry.loaded()]}")
+
+    # 3. Shared models, separate catalogs and caches
+    registry.budget_bytes = footprint * len(store_ids) * 2
+    states = [registry.activate(registry.tenants[store_id]) for store_id in store_ids]
+    from faq_support import faq_search
+    print(f"🤝 Intent model/router only in the shared artifacts: "
+          f"{all(name not in s.artifacts for s in states for name in ('intent_model', 'intent_router'))}, "
+          f"one embedding model for every store's indexes: {server.embedding_model is faq_search.model}")
+    print(f"🗂️ Separate catalogs: {len({id(s.artifacts.get('collections')) for s in states}) == len(states)}, "
+          f"separate response caches: {len({id(s.response_cache) for s in states}) == len(states)}")
+
+    # 4. Routing: links follow the store, unknown stores and missing keys are refused
+    links = {}
+    for store_id in store_ids:
+        _, response = ask(client, store_id, "show me talavera tiles", session_id="links")
+        answer = (response.get_json() or {}).get("answer", "")
+        links[store_id] = f"https://{store_id}.myshopify.com" in answer
+    unknown = client.post("/chat", json={"message": "hi"}, headers={"X-Store-Id": "nope"}).status_code
+    no_key = client.post("/chat", json={"message": "hi"}, headers={"X-Store-Id": store_ids[-1]}).status_code
+    print(f"🔗 Collection links use the asked store's URL: {links}")
+    print(f"🚫 Unknown store → {unknown}, keyed store without its key → {no_key}")
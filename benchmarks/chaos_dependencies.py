@@ -0,0 +1,165 @@
+"""Chaos test: /chat against local Shopify/storefront/OpenAI stub servers that turn slow or fail.
+
+Usage: python3 benchmarks/chaos_dependencies.py [requests_per_phase] [clients]
+
+Runs the stubbed app (see bench_chat_replay.py) but sends Shopify, storefront and
+OpenAI traffic over real HTTP to a local server whose latency and error rate change
+per phase. With short timeouts and deadline, it shows that latency stays bounded
+while a dependency is down (calls time out, then the breaker fails fast to the
+fallback answers) and that the breakers close again once it recovers.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_chat_replay as replay
+
+OPEN_SECONDS = 3
+
+# Tight budgets so the phases stay short; the defaults in resilience.py are larger
+os.environ.setdefault("REQUEST_DEADLINE_SECONDS", "5")
+os.environ.setdefault("OPENAI_TIMEOUT_SECONDS", "2")
+os.environ.setdefault("SHOPIFY_TIMEOUT_SECONDS", "1")
+os.environ.setdefault("STOREFRONT_TIMEOUT_SECONDS", "1")
+os.environ.setdefault("BREAKER_OPEN_SECONDS", str(OPEN_SECONDS))
+
+HEALTHY = {"latency": 0.05, "error_rate": 0.0}
+PHASES = [
+    ("healthy", {"openai": HEALTHY, "shopify": HEALTHY, "storefront": HEALTHY}),
+    ("openai slow (8s)", {"openai": {"latency": 8.0, "error_rate": 0.0}, "shopify": HEALTHY, "storefront": HEALTHY}),
+    ("openai 500s", {"openai": {"latency": 0.05, "error_rate": 1.0}, "shopify": HEALTHY, "storefront": HEALTHY}),
+    ("shopify 50% errors", {"openai": HEALTHY, "shopify": {"latency": 0.05, "error_rate": 0.5}, "storefront": HEALTHY}),
+    ("recovered", {"openai": HEALTHY, "shopify": HEALTHY, "storefront": HEALTHY}),
+]
+MESSAGES = ["what is your shipping policy", "what is your return policy", "hello, can you help me pick a grout color"]
+
+behavior = dict(PHASES[0][1])
+rng = random.Random(7)
+
+
+class ChaosHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _service(self):
+        if self.path.startswith("/v1/"):
+            return "openai"
+        if self.path.startswith("/admin/api/"):
+            return "shopify"
+        return "storefront"
+
+    def _reply(self, status, payload=None, text=None, content_type="application/json"):
+        body = (text if text is not None else json.dumps(payload or {})).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client already gave up (timeout)
+
+    def _chaos(self):
+        settings = behavior[self._service()]
+        time.sleep(settings["latency"])
+        if rng.random() < settings["error_rate"]:
+            self._reply(500, {"error": "injected failure"})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._chaos():
+            return
+        if "shop.json" in self.path:
+            self._reply(200, {"shop": {"name": "Clay Imports", "currency": "USD"}})
+        elif "pages.json" in self.path:
+            self._reply(200, {"pages": replay.PAGES})
+        elif self.path.startswith("/admin/api/"):
+            self._reply(404, {})
+        else:
+            handle = self.path.rstrip("/").rsplit("/", 1)[-1]
+            self._reply(200, text=replay.storefront_html(handle), content_type="text/html")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self._chaos():
+            return
+        self._reply(200, {
+            "id": "chatcmpl-chaos", "object": "chat.completion", "created": int(time.time()), "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Happy to help with your tile project! 😊"}}],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 10, "total_tokens": 60},
+        })
+
+
+def start_chaos_server():
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), ChaosHandler)
+    http_server.daemon_threads = True
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{http_server.server_port}"
+
+
+def load_app(base_url):
+    os.environ["OPENAI_API_KEY"] = "sk-chaos"
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    os.environ["SHOPIFY_STORE_URL"] = base_url
+    replay.install_offline_stubs({name: 0.0 for name in replay.DEFAULT_LATENCY})
+    workspace = replay.prepare_workspace()
+    os.chdir(workspace)
+
+    import page_scraper
+    import server
+
+    server.artifacts.stop()
+    replay.use_workspace_faq(server, workspace)
+    server.response_cache.enabled = False
+    page_scraper.shopify_store_url = base_url  # Scrape the stub storefront
+    page_scraper.SCRAPE_CACHE_TTL = 0  # Revalidate every time so the storefront stays on the hot path
+    return server
+
+
+def run_phase(server, name, settings, count, clients):
+    behavior.update(settings)
+    test_client = server.app.test_client()
+    fallbacks = set(server.UNCACHEABLE_ANSWERS)
+
+    def one(i):
+        start = time.perf_counter()
+        response = test_client.post("/chat", json={"message": MESSAGES[i % len(MESSAGES)], "session_id": f"chaos-{i}"})
+        answer = (response.get_json(silent=True) or {}).get("answer", "")
+        degraded = response.status_code != 200 or any(marker in answer for marker in fallbacks)
+        return time.perf_counter() - start, degraded
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(one, range(count)))
+
+    seconds = np.array([r[0] for r in results]) * 1000
+    breakers = {dep: status["state"] for dep, status in server.breaker_status().items() if dep != "google_sheets"}
+    print(f"🌩️ {name:<20} p50 {np.percentile(seconds, 50):7.0f} ms | p95 {np.percentile(seconds, 95):7.0f} ms | "
+          f"max {seconds.max():7.0f} ms | degraded {sum(r[1] for r in results)}/{count} | breakers {breakers}")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    base_url = start_chaos_server()
+    server = load_app(base_url)
+    print(f"🧪 Chaos server at {base_url}; {count} requests per phase, {clients} clients")
+
+    for name, settings in PHASES:
+        if name == "recovered":
+            time.sleep(OPEN_SECONDS + 0.5)  # Let open breakers reach half-open
+        run_phase(server, name, settings, count, clients)
+
+    print("\n" + "\n".join(line for line in server.render_prometheus().splitlines()
+                            if line.startswith(("claybot_circuit", "claybot_deadline"))))
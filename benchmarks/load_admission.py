@@ -0,0 +1,127 @@
+"""Overload test for /chat admission control and rate limiting.
+
+Usage: python3 benchmarks/load_admission.py [--clients 4,16,48] [--seconds 8] [--upstream-slots 4]
+
+Runs the stubbed app (see bench_chat_replay.py) behind a real threaded HTTP server.
+The OpenAI stub only serves --upstream-slots calls at once, like a rate-limited
+account, so extra concurrency just queues inside the worker. Each load level runs
+twice: with admission control (bounded in-flight + short queue, excess shed with
+503) and with unbounded limits. Latency of the answered requests should stay flat
+with admission on and grow with the client count when it is off.
+A last phase shows one looping session getting 429s while another session is unaffected.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_chat_replay as replay
+
+# Small limits so a laptop can overload them; production defaults live in admission.py
+os.environ.setdefault("CHAT_MAX_IN_FLIGHT", "8")
+os.environ.setdefault("CHAT_MAX_QUEUE", "8")
+os.environ.setdefault("CHAT_QUEUE_TIMEOUT_SECONDS", "0.5")
+
+MESSAGES = [
+    "hello, can you help me pick a grout color",
+    "do you think zellige works in a steam shower",
+    "how do I seal terracotta before grouting",
+    "can I mix two tile finishes in one bathroom",
+]
+UNBOUNDED = 10 ** 6
+SHED_BACKOFF_SECONDS = 0.25  # Clients pause after a 503 instead of hammering
+
+
+def limit_upstream(slots):
+    """Let only `slots` stubbed OpenAI completions run at once; the rest wait their turn."""
+    semaphore = threading.BoundedSemaphore(slots)
+    create = replay.FakeCompletions.create
+
+    def limited_create(self, *args, **kwargs):
+        with semaphore:
+            return create(self, *args, **kwargs)
+    replay.FakeCompletions.create = limited_create
+
+
+def start_http(app):
+    from werkzeug.serving import make_server
+    http_server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{http_server.server_port}"
+
+
+def run_load(send, clients, seconds):
+    """Closed loop: every client sends its next request when the previous one returns (after a short pause if shed)."""
+    stop_at = time.monotonic() + seconds
+    results = []
+    lock = threading.Lock()
+
+    def client(n):
+        i = 0
+        while time.monotonic() < stop_at:
+            payload = {"message": f"{MESSAGES[i % len(MESSAGES)]} (#{n}-{i})", "session_id": f"load-{n}"}
+            start = time.perf_counter()
+            status, _ = send(payload, f"load-{n}-{i}")
+            with lock:
+                results.append((status, time.perf_counter() - start))
+            if status != 200:
+                time.sleep(SHED_BACKOFF_SECONDS)
+            i += 1
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    return results
+
+
+def report(label, clients, seconds, results):
+    statuses = Counter(status for status, _ in results)
+    answered = np.array([elapsed for status, elapsed in results if status == 200]) * 1000
+    shed = np.array([elapsed for status, elapsed in results if status == 503]) * 1000
+    if len(answered):
+        p50, p95, p99 = np.percentile(answered, [50, 95, 99])
+        latency = f"p50 {p50:6.0f} ms | p95 {p95:6.0f} ms | p99 {p99:6.0f} ms"
+    else:
+        latency = "no answered requests"
+    shed_latency = f" (p95 {np.percentile(shed, 95):.0f} ms)" if len(shed) else ""
+    print(f"🚦 {label:<10} c={clients:<3} answered {statuses[200]:4d} ({statuses[200] / seconds:5.1f}/s) | "
+          f"{latency} | shed {statuses[503]}{shed_latency}")
+
+
+def rate_limit_demo(server, send):
+    server.session_limiter = server.RateLimiter(20, 5)  # The production defaults
+    abusive = Counter(send({"message": MESSAGES[0], "session_id": "looping-bot"}, f"bot-{i}")[0] for i in range(30))
+    normal = Counter(send({"message": MESSAGES[1], "session_id": "customer"}, f"customer-{i}")[0] for i in range(3))
+    print(f"\n🤖 Looping session: {dict(abusive)} | normal session meanwhile: {dict(normal)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overload /chat with and without admission control")
+    parser.add_argument("--clients", default="4,16,48", help="Comma-separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=8)
+    parser.add_argument("--upstream-slots", type=int, default=4, help="Concurrent calls the OpenAI stub serves")
+    parser.add_argument("--latency", default="openai=0.2", help="Stub latencies, e.g. openai=0.2,shopify=0.05")
+    args = parser.parse_args()
+
+    limit_upstream(args.upstream_slots)
+    app, _ = replay.load_stubbed_app(replay.parse_latency(args.latency), response_cache=False)
+    server = sys.modules["server"]
+    send = replay.make_sender("port", url=start_http(app))
+    limits = (server.admission.max_in_flight, server.admission.max_queue)
+    print(f"🧪 OpenAI stub: {args.upstream_slots} slots | admission: {limits[0]} in flight + {limits[1]} queued, "
+          f"{server.admission.queue_timeout}s queue timeout | {args.seconds:.0f}s per run")
+
+    for clients in [int(c) for c in args.clients.split(",")]:
+        for label, (max_in_flight, max_queue) in [("admission", limits), ("unbounded", (UNBOUNDED, UNBOUNDED))]:
+            server.admission.max_in_flight, server.admission.max_queue = max_in_flight, max_queue
+            report(label, clients, args.seconds, run_load(send, clients, args.seconds))
+
+    server.admission.max_in_flight, server.admission.max_queue = limits
+    rate_limit_demo(server, send)
+    print("\n" + "\n".join(line for line in server.render_prometheus().splitlines()
+                            if line.startswith("claybot_chat_rejected_total")))
@@ -0,0 +1,216 @@
+"""Microbenchmarks for the hot functions, with stored baselines and a regression gate.
+
+Usage:
+    python3 benchmarks/microbench.py [--size 2000] [--only classify_intent,rank_blogs]
+        [--baseline benchmarks/microbench_baselines.json] [--update-baseline] [--threshold 25]
+        [--allow-mismatch]
+
+Every component runs on synthetic data of --size items (collections, articles,
+pages, FAQs, training phrases) with Shopify, OpenAI, Sheets and the embedding
+model replaced by the local stubs from bench_chat_replay.py. Each is timed for
+--rounds rounds of at least --min-round-ms, and the median time per call is kept.
+
+The first run (or --update-baseline) writes the baseline file. Later runs compare
+against it and exit with status 1 when a component's median is more than
+--threshold percent slower. Baselines are only comparable on the same machine
+and --size, so the file records both. A mismatch exits with status 2 unless
+--allow-mismatch is given, which skips the comparison instead.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "microbench_baselines.json")
+QUERIES = [
+    "blue talavera tiles for my kitchen",
+    "white zellige backsplash",
+    "terracotta floor for a patio",
+    "how do i seal terracotta",
+    "what is your return policy",
+    "do you ship to canada",
+    "8x8 cement tile for a bathroom",
+    "grout colors for zellige",
+]
+
+
+def synthetic_articles(size):
+    from bench_chat_replay import fake_articles
+    articles = fake_articles()
+    return [{**articles[i % len(articles)], "url": f"https://clayimports.com/blogs/news/article-{i}",
+             "title": f"{articles[i % len(articles)]['title']} part {i}"} for i in range(size)]
+
+
+def synthetic_pages(size):
+    from bench_chat_replay import PAGES
+    return [{**PAGES[i % len(PAGES)], "handle": f"{PAGES[i % len(PAGES)]['handle']}-{i}",
+             "body_html": PAGES[i % len(PAGES)]["body_html"] * 20} for i in range(size)]
+
+
+def synthetic_faq_index(size):
+    import numpy as np
+    import torch
+    from bench_chat_replay import fake_faqs, fake_vector
+    faqs = fake_faqs()
+    faqs = [{**faqs[i % len(faqs)], "title": f"{faqs[i % len(faqs)]['title']} ({i})"} for i in range(size)]
+    embeddings = torch.from_numpy(np.stack([fake_vector(faq["title"].lower()) for faq in faqs]))
+    return {"faqs": faqs, "embeddings": embeddings}
+
+
+def build_components(size):
+    """name -> zero-argument callable doing one call on the next query."""
+    from bench_chat_replay import load_stubbed_app
+    from bench_check_duplicates import synthetic_data
+    from bench_collection_search import synthetic_collections
+    from bench_page_scraper import synthetic_page
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_stubbed_app({})  # Zero latency: stubs return at once
+        import server
+        import check_duplicates
+        import page_scraper
+        import smart_page_router
+        from collection_search import build_collection_index
+        from compact_catalog import write_compact_catalog, load_compact_catalog
+        from faq_support.faq_search import search_faq_semantic
+        from sentence_transformers import SentenceTransformer
+
+        collections = synthetic_collections(size)
+        catalog_path = os.path.join(tempfile.mkdtemp(prefix="microbench_"), "catalog.compact")
+        catalog = load_compact_catalog(write_compact_catalog(catalog_path, collections))
+        collection_index = build_collection_index(collections, SentenceTransformer("stub"))
+        # Registered once here: rank_collections reads it through the artifact manager
+        server.artifacts.register("collection_index", os.devnull, None, default=collection_index)
+        articles = synthetic_articles(size)
+        pages = synthetic_pages(min(size, 250))  # One pages.json call returns at most 250
+        faq_index = synthetic_faq_index(size)
+        phrases = synthetic_data(size)
+        html = synthetic_page()
+
+    def cycle(fn):
+        position = [0]
+
+        def call():
+            query = QUERIES[position[0] % len(QUERIES)]
+            position[0] += 1
+            return fn(query)
+        return call
+
+    return {
+        "classify_intent": cycle(server.classify_intent),
+        "rank_collections_hybrid": cycle(lambda q: server.rank_collections(q, catalog, set())),
+        "rank_collections_keywords": cycle(lambda q: server.rank_collections_by_keywords(q, catalog, set())),
+        "rank_blogs": cycle(lambda q: server.rank_blogs(q, articles, set())),
+        "rank_pages": cycle(lambda q: smart_page_router.rank_pages(q, pages)),
+        "search_faq_semantic": cycle(lambda q: search_faq_semantic(q, index=faq_index)),
+        "extract_visible_text": lambda: page_scraper.extract_visible_text(html),
+        "find_fuzzy_conflicts": lambda: check_duplicates.find_fuzzy_conflicts(phrases),
+    }
+
+
+def measure(fn, rounds, min_round_seconds):
+    """Median and best seconds per call, over rounds sized to last at least min_round_seconds."""
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_seconds or calls >= 1 << 20:
+            break
+        calls *= 2
+    per_call = [elapsed / calls]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        per_call.append((time.perf_counter() - start) / calls)
+    return statistics.median(per_call), min(per_call), calls
+
+
+def machine_id():
+    return f"{platform.node()} {platform.machine()} {platform.python_implementation()} {platform.python_version()}"
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, size, results):
+    with open(path, "w") as f:
+        json.dump({"machine": machine_id(), "size": size, "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                   "results": results}, f, indent=2)
+    print(f"💾 Baseline saved to {path}")
+
+
+def compare(results, baseline, threshold):
+    """Returns the names of the components that regressed."""
+    regressed = []
+    print(f"\n📊 Compared with the baseline from {baseline['created_at']} (threshold +{threshold:.0f}%):")
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if not old:
+            print(f"   {name:<26} new, no baseline")
+            continue
+        change = (result["median_us"] - old["median_us"]) / old["median_us"] * 100
+        status = "❌ REGRESSION" if change > threshold else ("🚀 faster" if change < -threshold else "✅")
+        print(f"   {name:<26} {old['median_us']:10.1f} → {result['median_us']:10.1f} µs ({change:+6.1f}%) {status}")
+        if change > threshold:
+            regressed.append(name)
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks with a regression gate")
+    parser.add_argument("--size", type=int, default=2000, help="Synthetic items per dataset")
+    parser.add_argument("--only", help="Comma-separated component names")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-round-ms", type=float, default=50)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--allow-mismatch", action="store_true",
+                        help="Skip the comparison instead of failing when the baseline is from another size/machine")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("MICROBENCH_THRESHOLD_PERCENT", "25")),
+                        help="Allowed slowdown in percent before a component fails")
+    args = parser.parse_args()
+    baseline_path = os.path.abspath(args.baseline)
+
+    print(f"🧪 Building components on {args.size} synthetic items...")
+    components = build_components(args.size)
+    if args.only:
+        components = {name: components[name] for name in args.only.split(",")}
+
+    results = {}
+    for name, fn in components.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            median, best, calls = measure(fn, args.rounds, args.min_round_ms / 1000)
+        results[name] = {"median_us": round(median * 1e6, 2), "min_us": round(best * 1e6, 2), "calls_per_round": calls}
+        print(f"⏱️ {name:<26} median {median * 1e6:10.1f} µs | min {best * 1e6:10.1f} µs | {calls} calls/round")
+
+    baseline = load_baseline(baseline_path)
+    if args.update_baseline or baseline is None:
+        save_baseline(baseline_path, args.size, {**((baseline or {}).get("results", {}) if args.only else {}), **results})
+        sys.exit(0)
+    if baseline["size"] != args.size or baseline["machine"] != machine_id():
+        print(f"\n⚠️ Baseline was recorded with --size {baseline['size']} on {baseline['machine']}; "
+              f"not comparable. Run with --update-baseline to replace it.")
+        sys.exit(0 if args.allow_mismatch else 2)
+    regressed = compare(results, baseline, args.threshold)
+    if regressed:
+        print(f"\n❌ {len(regressed)} component(s) regressed: {', '.join(regressed)}")
+        sys.exit(1)
+    print("\n✅ No regressions.")
@@ -2,8 +2,13 @@ import os
 import requests
 import json
 
-SHOPIFY_API_KEY = os.getenv("SHOPIFY_API_KEY")
-SHOPIFY_STORE_URL = os.getenv("SHOPIFY_STORE_URL")
+from tenants import script_tenant
+
+STORE = script_tenant()  # --store <id> or STORE_ID; default: SHOPIFY_* env vars and the project root
+SHOPIFY_API_KEY = STORE.access_token
+SHOPIFY_STORE_URL = STORE.store_url
+STOREFRONT_URL = STORE.storefront_url or SHOPIFY_STORE_URL  # Public article links
+ARTICLES_FILE = STORE.path("articles.json")
 
 HEADERS = {
     "X-Shopify-Access-Token": SHOPIFY_API_KEY,
@@ -38,7 +43,7 @@ def get_blog_articles(blog_id, blog_handle):
                     "content": art.get("body_html"),
                     "tags": art.get("tags"),
                     "author": art.get("author"),
-                    "url": f"{SHOPIFY_STORE_URL}/blogs/{blog_handle}/{art.get('handle')}"
+                    "url": f"{STOREFRONT_URL}/blogs/{blog_handle}/{art.get('handle')}"
                 })
 
         link_header = response.headers.get("Link", "")
@@ -52,9 +57,10 @@ def get_blog_articles(blog_id, blog_handle):
     return all_articles
 
 def save_articles(data):
-    with open("articles.json", "w") as f:
+    with open(ARTICLES_FILE + ".tmp", "w") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
-    print(f"✅ Saved articles: {len(data)} in articles.json")
+    os.replace(ARTICLES_FILE + ".tmp", ARTICLES_FILE)
+    print(f"✅ Saved articles: {len(data)} in {ARTICLES_FILE}")
 
 if __name__ == "__main__":
     all_articles = []
@@ -0,0 +1,48 @@
+import os
+import joblib
+from sentence_transformers import SentenceTransformer
+
+from collection_search import EMBEDDING_MODEL
+from knowledge_index import knowledge_documents, build_knowledge_index, KNOWLEDGE_INDEX_FILE
+from faq_support.faq_search import FAQ_PATH
+from query_canonicalizer import vocabulary_counts, write_vocabulary, QUERY_VOCABULARY_FILE
+from utils import get_shopify_pages
+from json_stream import load_records
+from tenants import script_tenant, DEFAULT_TENANT_ID
+
+STORE = script_tenant()  # --store <id> or STORE_ID; pages come from its Shopify, files live in its data_dir
+SHOPIFY_STORE_URL = STORE.storefront_url or STORE.store_url
+STORE_FAQ_PATH = FAQ_PATH if STORE.id == DEFAULT_TENANT_ID else STORE.path(os.path.basename(FAQ_PATH))
+TRAINING_FILE = "training_data.json"  # Shared by every store, like the intent model
+
+
+def load_json(path):
+    if not os.path.exists(path):
+        print(f"⚠️ {path} not found, skipping it.")
+        return []
+    return load_records(path)
+
+
+if __name__ == "__main__":
+    documents = knowledge_documents(
+        pages=get_shopify_pages(),
+        articles=load_json(STORE.path("articles.json")),
+        faqs=load_json(STORE_FAQ_PATH),
+        collections=load_json(STORE.path("collections_described.jsonl")),
+        store_url=SHOPIFY_STORE_URL,
+    )
+    # Same sources (plus logged customer wording) give the spelling vocabulary for query canonicalization
+    examples = [example for group in load_json(TRAINING_FILE) for example in group["examples"]]
+    counts = vocabulary_counts([doc["title"] for doc in documents] + [doc["text"] for doc in documents] + examples)
+    vocabulary_file = STORE.path(QUERY_VOCABULARY_FILE)
+    write_vocabulary(vocabulary_file, counts)
+    print(f"✅ Query vocabulary saved in {vocabulary_file}: {len(counts)} words")
+
+    print(f"Calculating embeddings for {len(documents)} documents... 🚀")
+    index = build_knowledge_index(documents, SentenceTransformer(EMBEDDING_MODEL))
+
+    # Write then rename, so the server's artifact watcher never sees a half-written index
+    index_file = STORE.path(KNOWLEDGE_INDEX_FILE)
+    joblib.dump(index, index_file + ".tmp")
+    os.replace(index_file + ".tmp", index_file)
+    print(f"✅ Knowledge index saved in {index_file}: {len(index)} chunks {index.sources()}")
@@ -1,10 +1,23 @@
 import json
+import zlib
 from collections import defaultdict
 from difflib import SequenceMatcher
+from multiprocessing import Pool
+
+import numpy as np
 
 TRAINING_FILE = "training_data.json"
 SIMILARITY_THRESHOLD = 0.85  # Adjust between 0.7 and 0.95 depending on how strict you want it
 
+# MinHash / LSH settings for large training sets
+LSH_MIN_PHRASES = 2000  # Below this the exact pairwise scan is fast enough
+SHINGLE_SIZE = 2
+LSH_BANDS = 32
+LSH_ROWS = 2  # 64 hash functions in total
+LSH_MAX_BUCKET = 2000  # Huge buckets are generic shingles, not near-duplicates
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
 def load_training_data():
     with open(TRAINING_FILE, "r") as f:
         return json.load(f)
@@ -20,7 +33,7 @@ def find_exact_duplicates(data):
 
     return {p: i for p, i in phrase_to_intents.items() if len(i) > 1}
 
-def find_fuzzy_conflicts(data, threshold=SIMILARITY_THRESHOLD):
+def collect_phrases(data):
     all_phrases = []
 
     for entry in data:
@@ -29,16 +42,148 @@ def find_fuzzy_conflicts(data, threshold=SIMILARITY_THRESHOLD):
             clean = phrase.strip().lower()
             all_phrases.append((clean, intent))
 
+    return all_phrases
+
+def similar_enough(phrase1, phrase2, threshold=SIMILARITY_THRESHOLD):
+    # Cheap upper bounds first, SequenceMatcher.ratio() only when they pass
+    matcher = SequenceMatcher(None, phrase1, phrase2)
+    if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+        return None
+    ratio = matcher.ratio()
+    return ratio if ratio >= threshold else None
+
+def find_fuzzy_conflicts_exact(all_phrases, threshold=SIMILARITY_THRESHOLD):
     fuzzy_conflicts = []
     for i, (phrase1, intent1) in enumerate(all_phrases):
         for phrase2, intent2 in all_phrases[i+1:]:
             if intent1 != intent2:
-                ratio = SequenceMatcher(None, phrase1, phrase2).ratio()
-                if ratio >= threshold:
+                ratio = similar_enough(phrase1, phrase2, threshold)
+                if ratio is not None:
                     fuzzy_conflicts.append((phrase1, intent1, phrase2, intent2, round(ratio, 2)))
 
     return fuzzy_conflicts
 
+# 🔢 MINHASH SIGNATURES
+def _shingle_hashes(phrase, size=SHINGLE_SIZE):
+    padded = f" {phrase} "
+    if len(padded) <= size:
+        shingles = {padded}
+    else:
+        shingles = {padded[i:i + size] for i in range(len(padded) - size + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+def minhash_signatures(phrases, bands=LSH_BANDS, rows=LSH_ROWS, seed=42):
+    num_perm = bands * rows
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    signatures = np.empty((len(phrases), num_perm), dtype=np.uint64)
+    for i, phrase in enumerate(phrases):
+        hashes = _shingle_hashes(phrase)
+        # (a*x + b) mod p for every permutation at once; values stay below 2**64
+        permuted = (np.outer(a, hashes) + b[:, None]) % _MERSENNE_PRIME
+        signatures[i] = (permuted & _MAX_HASH).min(axis=1)
+    return signatures
+
+def _char_histograms(phrases):
+    # a-z, digits, space and everything else; merging characters into one bin only loosens the bound
+    histograms = np.zeros((len(phrases), 38), dtype=np.uint16)
+    for i, phrase in enumerate(phrases):
+        for ch in phrase:
+            if "a" <= ch <= "z":
+                histograms[i, ord(ch) - 97] += 1
+            elif "0" <= ch <= "9":
+                histograms[i, 26 + ord(ch) - 48] += 1
+            else:
+                histograms[i, 36 if ch == " " else 37] += 1
+    return histograms
+
+def _band_pairs(band_keys, max_bucket):
+    order = np.argsort(band_keys, kind="stable")
+    sorted_keys = band_keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    sizes = np.diff(np.r_[starts, len(sorted_keys)])
+
+    left, right = [], []
+    for size in np.unique(sizes):
+        if size < 2 or size > max_bucket:
+            continue
+        group_starts = starts[sizes == size]
+        tri_i, tri_j = np.triu_indices(size, 1)
+        left.append(order[(group_starts[:, None] + tri_i).ravel()])
+        right.append(order[(group_starts[:, None] + tri_j).ravel()])
+
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+def lsh_candidate_pairs(all_phrases, threshold=SIMILARITY_THRESHOLD, bands=LSH_BANDS, rows=LSH_ROWS):
+    phrases = [p for p, _ in all_phrases]
+    n = len(phrases)
+    signatures = minhash_signatures(phrases, bands=bands, rows=rows)
+    intent_codes = {}
+    intents = np.array([intent_codes.setdefault(intent, len(intent_codes)) for _, intent in all_phrases])
+    lengths = np.array([len(p) for p in phrases], dtype=np.int64)
+    histograms = _char_histograms(phrases)
+
+    candidates = np.empty(0, dtype=np.int64)
+    for band in range(bands):
+        band_keys = signatures[:, band * rows]
+        for col in range(band * rows + 1, (band + 1) * rows):
+            band_keys = band_keys * np.uint64(0x100000001B3) ^ signatures[:, col]
+
+        i, j = _band_pairs(band_keys, LSH_MAX_BUCKET)
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        keep = intents[i] != intents[j]
+
+        # SequenceMatcher.ratio() <= 2*min(len)/(len1+len2): drop pairs that can't reach the threshold
+        total = lengths[i] + lengths[j]
+        keep &= 2 * np.minimum(lengths[i], lengths[j]) >= threshold * total
+        i, j, total = i[keep], j[keep], total[keep]
+
+        # Character-count bound, same idea as SequenceMatcher.quick_ratio()
+        common = np.minimum(histograms[i], histograms[j]).sum(axis=1)
+        keep = 2 * common >= threshold * total
+        candidates = np.union1d(candidates, i[keep] * n + j[keep])
+
+    return [(int(key // n), int(key % n)) for key in candidates]
+
+def _verify_chunk(args):
+    all_phrases, pairs, threshold = args
+    conflicts = []
+    for i, j in pairs:
+        phrase1, intent1 = all_phrases[i]
+        phrase2, intent2 = all_phrases[j]
+        ratio = similar_enough(phrase1, phrase2, threshold)
+        if ratio is not None:
+            conflicts.append((phrase1, intent1, phrase2, intent2, round(ratio, 2)))
+    return conflicts
+
+def find_fuzzy_conflicts_lsh(all_phrases, threshold=SIMILARITY_THRESHOLD, workers=1):
+    pairs = lsh_candidate_pairs(all_phrases, threshold)
+    print(f"🧮 LSH candidate pairs to verify: {len(pairs)}")
+
+    if workers <= 1 or len(pairs) < 10000:
+        return _verify_chunk((all_phrases, pairs, threshold))
+
+    chunk_size = (len(pairs) + workers - 1) // workers
+    chunks = [(all_phrases, pairs[i:i + chunk_size], threshold) for i in range(0, len(pairs), chunk_size)]
+    with Pool(workers) as pool:
+        results = pool.map(_verify_chunk, chunks)
+    return [conflict for chunk in results for conflict in chunk]
+
+def find_fuzzy_conflicts(data, threshold=SIMILARITY_THRESHOLD, method="auto", workers=1):
+    """method: "exact" (all pairs), "lsh" (MinHash candidates) or "auto" (by dataset size)."""
+    all_phrases = collect_phrases(data)
+
+    if method == "auto":
+        method = "lsh" if len(all_phrases) >= LSH_MIN_PHRASES else "exact"
+
+    if method == "lsh":
+        return find_fuzzy_conflicts_lsh(all_phrases, threshold, workers=workers)
+    return find_fuzzy_conflicts_exact(all_phrases, threshold)
+
 def main():
     data = load_training_data()
 
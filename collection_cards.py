@@ -0,0 +1,35 @@
+import re
+
+# 🃏 Collection card HTML. regenerate_cache.py pre-renders one fragment per collection
+# into the catalog, so a request only joins three strings; render_card() is the
+# fallback for catalogs built without a store URL.
+PLACEHOLDER_IMAGE = "https://via.placeholder.com/240x240.png?text=No+Image"
+CAROUSEL_OPEN = "<br><div class='product-carousel' style='display: flex; gap: 20px; overflow-x: auto; scroll-snap-type: x mandatory; padding: 10px 0;'>"
+CAROUSEL_CLOSE = "</div>"
+
+
+def card_description(body_html):
+    description = re.sub('<[^<]+?>', '', body_html or "")  # Limpia etiquetas HTML
+    description = description.strip()[:100] + "..." if description else "Explore this collection."
+    return description
+
+
+def render_card(coll, store_url):
+    title = coll.get("title", "Untitled Collection")
+    handle = coll.get("handle", "#")
+    description = card_description(coll.get("body_html", ""))
+    image_url = coll.get("image", {}).get("src", "") or PLACEHOLDER_IMAGE
+    collection_url = f"{store_url}/collections/{handle}"
+
+    return f"""
+        <div class="product-card" style="flex: 0 0 240px; scroll-snap-align: start; border: 1px solid #ccc; border-radius: 12px; padding: 12px; text-align: center; background: #fff;">
+            <img src="{image_url}" alt="{title}" style="max-width: 100%; height: auto; border-radius: 8px; margin-bottom: 10px;" />
+            <h4 style="margin: 10px 0 4px; font-size: 1rem; color: #222;">{title}</h4>
+            <p style="font-size: 0.85rem; color: #555; height: 48px; overflow: hidden;">{description}</p>
+            <a href="{collection_url}" target="_blank" style="display: inline-block; margin-top: 10px; padding: 6px 12px; background-color: #007bff; color: #fff; border-radius: 6px; text-decoration: none; font-weight: bold;">View Collection</a>
+        </div>
+        """
+
+
+def render_carousel(intro_text, fragments):
+    return "".join([intro_text, CAROUSEL_OPEN, *fragments, CAROUSEL_CLOSE])
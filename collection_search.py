@@ -0,0 +1,168 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from intent_router import tokenize, STOPWORDS
+
+# ⚙️ COLLECTION SEARCH SETTINGS
+COLLECTION_INDEX_FILE = "collection_index.joblib"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Same model as the FAQ search, so the server loads it once
+BM25_K1 = 1.5
+BM25_B = 0.75
+TITLE_WEIGHT = 3  # Title tokens are repeated so a title hit outweighs a product title hit
+MAX_PRODUCT_TITLES = 20  # Per collection, in the embedded text (the model truncates long inputs anyway)
+RRF_K = 60  # Reciprocal rank fusion constant: 1 / (RRF_K + rank)
+HYBRID_CANDIDATES = 50  # Taken from each ranking before fusing
+
+
+def search_tokens(text):
+    # "Floors" and "floor" should match; "glass" must stay "glass"
+    tokens = []
+    for token in tokenize(text):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def strip_html(text):
+    return re.sub(r"<[^<]+?>", " ", text or "")
+
+
+def collection_tags(coll):
+    tags = coll.get("tags", "")
+    if isinstance(tags, list):
+        return [str(tag).strip() for tag in tags if str(tag).strip()]
+    return [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+
+def sparse_document(coll):
+    title = coll.get("title", "")
+    fields = [title] * TITLE_WEIGHT + [strip_html(coll.get("body_html", ""))]
+    fields += collection_tags(coll) + list(coll.get("product_titles", []))
+    return search_tokens(" ".join(fields))
+
+
+def dense_document(coll):
+    parts = [coll.get("title", ""), strip_html(coll.get("body_html", "")).strip()]
+    tags = collection_tags(coll)
+    if tags:
+        parts.append("Tags: " + ", ".join(tags))
+    products = coll.get("product_titles", [])[:MAX_PRODUCT_TITLES]
+    if products:
+        parts.append("Products: " + ", ".join(products))
+    return ". ".join(part for part in parts if part)
+
+
+def is_displayable(coll):
+    # Same filters as the keyword ranking: cards need an image and a non-empty collection
+    return bool(coll.get("image", {}).get("src")) and coll.get("product_count", 0) > 0
+
+
+def top_positions(scores, limit):
+    """Indices of the `limit` highest finite scores, best first."""
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if len(candidates) > limit:
+        candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class BM25Index:
+    """BM25 with the per-document weights precomputed into CSR postings.
+
+    A query only sums the posting slices of its terms into one score array.
+    """
+
+    def __init__(self, documents, k1=BM25_K1, b=BM25_B):
+        self.size = len(documents)
+        lengths = np.array([len(doc) for doc in documents], dtype=np.float32)
+        average_length = float(lengths.mean()) if self.size and lengths.mean() > 0 else 1.0
+
+        postings = defaultdict(list)
+        for doc_id, tokens in enumerate(documents):
+            for term, frequency in Counter(tokens).items():
+                postings[term].append((doc_id, frequency))
+
+        self.vocabulary = {}
+        offsets, doc_ids, weights = [0], [], []
+        for term_id, (term, entries) in enumerate(postings.items()):
+            self.vocabulary[term] = term_id
+            ids = np.array([doc_id for doc_id, _ in entries], dtype=np.int32)
+            frequencies = np.array([frequency for _, frequency in entries], dtype=np.float32)
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = k1 * (1 - b + b * lengths[ids] / average_length)
+            doc_ids.append(ids)
+            weights.append(idf * frequencies * (k1 + 1) / (frequencies + norm))
+            offsets.append(offsets[-1] + len(ids))
+
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.doc_ids = np.concatenate(doc_ids) if doc_ids else np.zeros(0, dtype=np.int32)
+        self.weights = np.concatenate(weights).astype(np.float32) if weights else np.zeros(0, dtype=np.float32)
+
+    def scores(self, tokens):
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokens):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            scores[self.doc_ids[start:end]] += self.weights[start:end]  # A term lists each doc once
+        return scores
+
+
+class CollectionIndex:
+    """Hybrid retrieval over the enriched collections: BM25 + embeddings, fused with RRF.
+
+    Built offline by regenerate_cache.py; the server only encodes the query.
+    """
+
+    def __init__(self, collections, embeddings, model_name=EMBEDDING_MODEL):
+        self.handles = [coll["handle"] for coll in collections]
+        self.positions = {handle: pos for pos, handle in enumerate(self.handles)}
+        self.displayable = np.array([is_displayable(coll) for coll in collections], dtype=bool)
+        self.bm25 = BM25Index([sparse_document(coll) for coll in collections])
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(collections), -1)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.embeddings = embeddings / np.maximum(norms, 1e-12)
+        self.model_name = model_name
+
+    def __len__(self):
+        return len(self.handles)
+
+    def search(self, query, query_embedding=None, exclude=(), limit=HYBRID_CANDIDATES):
+        """Returns collection handles, best first. query_embedding=None ranks with BM25 only."""
+        allowed = self.displayable.copy()
+        excluded = [self.positions[handle] for handle in exclude if handle in self.positions]
+        allowed[excluded] = False
+
+        sparse = self.bm25.scores(search_tokens(query))
+        sparse[~allowed | (sparse <= 0)] = -np.inf  # Only documents sharing a term are sparse candidates
+        rankings = [top_positions(sparse, limit)]
+
+        if query_embedding is not None:
+            query_vector = np.asarray(query_embedding, dtype=np.float32).ravel()
+            query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+            dense = self.embeddings @ query_vector
+            dense[~allowed] = -np.inf
+            rankings.append(top_positions(dense, limit))
+
+        fused = defaultdict(float)
+        for ranking in rankings:
+            for rank, pos in enumerate(ranking, start=1):
+                fused[pos] += 1 / (RRF_K + rank)
+        return [self.handles[pos] for pos in sorted(fused, key=lambda pos: -fused[pos])]
+
+
+def build_collection_index(collections, model):
+    """Embeds every collection with `model` (a SentenceTransformer) and builds the index."""
+    texts = [dense_document(coll) for coll in collections]
+    embeddings = model.encode(texts, batch_size=64, normalize_embeddings=True, show_progress_bar=False)
+    return CollectionIndex(collections, embeddings)
+
+
+def is_valid_collection_index(index):
+    return isinstance(index, CollectionIndex) and len(index) == index.embeddings.shape[0]
@@ -0,0 +1,215 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Mapping
+
+import numpy as np
+
+from collection_cards import render_card
+
+# ⚙️ CATALOG SETTINGS
+CATALOG_FILE = "catalog.compact"
+CATALOG_MAGIC = b"CLAYCAT1"
+CATALOG_ALIGNMENT = 64  # Every column starts on a cache-line boundary
+
+# Only what the bot reads from a collection; everything else in the Shopify dicts is dropped
+STRING_FIELDS = ("handle", "title", "body_html", "tags")
+FIELDS = STRING_FIELDS + ("image", "product_count", "product_titles", "card_html")
+
+# 🗂️ Layout: MAGIC | header length (uint64) | JSON header | aligned little-endian columns.
+# Strings are interned once into a UTF-8 blob (+ offsets); collections point at a shared
+# product table through CSR offsets, so a product title is stored once however many
+# collections list it.
+
+
+def _align(offset):
+    return -(-offset // CATALOG_ALIGNMENT) * CATALOG_ALIGNMENT
+
+
+class StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.blob = bytearray()
+        self.offsets = [0]
+
+    def intern(self, text):
+        text = text or ""
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.offsets) - 1
+            self.blob += text.encode("utf-8")
+            self.offsets.append(len(self.blob))
+        return string_id
+
+
+def _tags_text(tags):
+    return ", ".join(str(tag) for tag in tags) if isinstance(tags, list) else (tags or "")
+
+
+def build_columns(collections, store_url=None):
+    strings = StringTable()
+    product_ids = {}  # title string id -> product row
+    product_titles = []
+    columns = {f"collection_{field}": [] for field in STRING_FIELDS + ("image_src", "product_count")}
+    if store_url:
+        columns["collection_card_html"] = []
+    product_offsets, product_refs = [0], []
+
+    for coll in collections:
+        columns["collection_handle"].append(strings.intern(coll["handle"]))
+        columns["collection_title"].append(strings.intern(coll.get("title", "")))
+        columns["collection_body_html"].append(strings.intern(coll.get("body_html", "")))
+        columns["collection_tags"].append(strings.intern(_tags_text(coll.get("tags", ""))))
+        columns["collection_image_src"].append(strings.intern((coll.get("image") or {}).get("src", "")))
+        columns["collection_product_count"].append(coll.get("product_count", 0) or 0)
+        if store_url:
+            columns["collection_card_html"].append(strings.intern(render_card(coll, store_url)))
+        for title in coll.get("product_titles", []):
+            title_id = strings.intern(title)
+            row = product_ids.get(title_id)
+            if row is None:
+                row = product_ids[title_id] = len(product_titles)
+                product_titles.append(title_id)
+            product_refs.append(row)
+        product_offsets.append(len(product_refs))
+
+    arrays = {name: np.array(values, dtype="<i4") for name, values in columns.items()}
+    arrays["product_title"] = np.array(product_titles, dtype="<i4")
+    arrays["product_offsets"] = np.array(product_offsets, dtype="<i8")
+    arrays["product_refs"] = np.array(product_refs, dtype="<i4")
+    arrays["string_offsets"] = np.array(strings.offsets, dtype="<i8")
+    arrays["strings"] = np.frombuffer(bytes(strings.blob), dtype=np.uint8)
+    return arrays
+
+
+def write_compact_catalog(path, collections, store_url=None):
+    """Writes the catalog next to `path` and renames it into place (readers keep the old mmap).
+
+    With a store_url, each collection's card HTML is pre-rendered into the catalog.
+    """
+    arrays = build_columns(collections, store_url)
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = [array.dtype.str, len(array), offset]
+        offset += array.nbytes
+
+    header = json.dumps({
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "collections": len(collections),
+        "products": len(arrays["product_title"]),
+        "strings": len(arrays["string_offsets"]) - 1,
+        "store_url": store_url,
+        "arrays": layout,
+    }).encode("utf-8")
+    data_start = _align(len(CATALOG_MAGIC) + 8 + len(header))
+
+    # Unique temp file: several workers may build the same missing catalog at startup
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(CATALOG_MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, array in arrays.items():
+                f.write(b"\0" * (data_start + layout[name][2] - f.tell()))
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+class CatalogCollection(Mapping):
+    """Read-only dict-like view of one collection; fields are decoded on access."""
+
+    __slots__ = ("_catalog", "_row")
+
+    def __init__(self, catalog, row):
+        self._catalog = catalog
+        self._row = row
+
+    def __getitem__(self, key):
+        catalog, row = self._catalog, self._row
+        if key in STRING_FIELDS:
+            return catalog.string(int(catalog.columns[f"collection_{key}"][row]))
+        if key == "image":
+            src = catalog.string(int(catalog.columns["collection_image_src"][row]))
+            return {"src": src} if src else {}
+        if key == "product_count":
+            return int(catalog.columns["collection_product_count"][row])
+        if key == "product_titles":
+            return catalog.product_titles(row)
+        if key == "card_html":
+            cards = catalog.card_column
+            return catalog.string(int(cards[row])) if cards is not None else ""
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f"<CatalogCollection {self['handle']}>"
+
+
+class CompactCatalog:
+    """Memory-mapped catalog. Columns are numpy views over the file, so every worker
+    that opens it shares the same page-cache pages instead of a private copy."""
+
+    def __init__(self, path, store_url=None):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(CATALOG_MAGIC)] != CATALOG_MAGIC:
+            raise ValueError(f"{path} is not a compact catalog")
+        header_start = len(CATALOG_MAGIC) + 8
+        (header_length,) = struct.unpack("<Q", self._mm[len(CATALOG_MAGIC):header_start])
+        self.header = json.loads(self._mm[header_start:header_start + header_length])
+        data_start = _align(header_start + header_length)
+
+        self.columns = {
+            name: np.frombuffer(self._mm, dtype=np.dtype(dtype), count=length, offset=data_start + offset)
+            for name, (dtype, length, offset) in self.header["arrays"].items()
+        }
+        self._strings_start = data_start + self.header["arrays"]["strings"][2]
+        self._string_offsets = self.columns["string_offsets"]
+
+        # Pre-rendered cards link to the store they were built for; ignore them for another store
+        self.card_column = self.columns.get("collection_card_html")
+        if self.card_column is not None and store_url and self.header.get("store_url") != store_url:
+            print(f"⚠️ {path} cards were rendered for {self.header.get('store_url')}, rendering live instead.")
+            self.card_column = None
+
+    def string(self, string_id):
+        start, end = self._string_offsets[string_id:string_id + 2].tolist()
+        return self._mm[self._strings_start + start:self._strings_start + end].decode("utf-8")
+
+    def strings(self, string_ids):
+        # One vectorized offset lookup, then plain slicing of the mapped blob
+        starts = (self._string_offsets[string_ids] + self._strings_start).tolist()
+        ends = (self._string_offsets[string_ids + 1] + self._strings_start).tolist()
+        mm = self._mm
+        return [mm[start:end].decode("utf-8") for start, end in zip(starts, ends)]
+
+    def product_titles(self, row):
+        start, end = self.columns["product_offsets"][row:row + 2].tolist()
+        return self.strings(self.columns["product_title"][self.columns["product_refs"][start:end]])
+
+    def __len__(self):
+        return self.header["collections"]
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return CatalogCollection(self, row)
+
+    def __iter__(self):
+        return (CatalogCollection(self, row) for row in range(len(self)))
+
+
+def load_compact_catalog(path=CATALOG_FILE, store_url=None):
+    return CompactCatalog(path, store_url)
@@ -0,0 +1,81 @@
+import gzip
+import os
+
+from tracing import Counter, span
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# ⚙️ COMPRESSION SETTINGS
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "500"))  # Smaller bodies aren't worth the CPU
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))  # 11 is the library default and far too slow per request
+COMPRESSIBLE_TYPES = {"application/json", "text/html", "text/plain"}
+
+RESPONSE_BYTES = Counter("claybot_response_bytes_total", "Response body bytes before and after compression.",
+                         ["encoding", "kind"])
+
+
+def supported_encodings():
+    # Preferred first when the client weighs them equally
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def parse_accept_encoding(header):
+    weights = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def negotiate_encoding(header):
+    """Best encoding both sides support, or None for identity."""
+    weights = parse_accept_encoding(header)
+    best, best_weight = None, 0.0
+    for coding in supported_encodings():
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response, accept_encoding):
+    """Compresses a Flask response in place when the client accepts it and it's worth it."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(accept_encoding)
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        RESPONSE_BYTES.inc(len(body), encoding="identity", kind="raw")
+        RESPONSE_BYTES.inc(len(body), encoding="identity", kind="sent")
+        return response
+
+    with span(f"compress_{encoding}"):
+        compressed = compress_body(body, encoding)
+    response.set_data(compressed)  # Also updates Content-Length
+    response.headers["Content-Encoding"] = encoding
+    RESPONSE_BYTES.inc(len(body), encoding=encoding, kind="raw")
+    RESPONSE_BYTES.inc(len(compressed), encoding=encoding, kind="sent")
+    return response
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+from gspread.utils import rowcol_to_a1
+
+# ⚙️ CONVERSATION STORE SETTINGS
+CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH", "conversations.db")
+LOG_INGEST_STATE_FILE = os.getenv("LOG_INGEST_STATE_FILE", "log_ingest_state.json")
+LOG_BATCH_ROWS = int(os.getenv("LOG_BATCH_ROWS", "1000"))  # Rows per ranged read of the "Chatbot logs" sheet
+LOG_COLUMNS = {"User Message": "user_message", "Intent": "intent", "Bot Response": "bot_response"}
+
+
+class ConversationStore:
+    """Local SQLite copy of the "Chatbot logs" sheet, one row per sheet row."""
+
+    def __init__(self, path=CONVERSATION_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "sheet_row INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, user_message TEXT NOT NULL, "
+            "intent TEXT NOT NULL, bot_response TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_intent ON conversations (intent)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations (timestamp)")
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def add_rows(self, rows):
+        """rows: [(sheet_row, timestamp, user_message, intent, bot_response)]. Re-adding a row replaces it."""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?)", rows)
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM conversations")
+
+    def new_training_examples(self, known_phrases):
+        """Distinct (message, intent) pairs whose message isn't a known example yet, oldest first."""
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS known_phrases (phrase TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM known_phrases")
+            self.conn.executemany("INSERT OR IGNORE INTO known_phrases VALUES (?)", ((p,) for p in known_phrases))
+        return self.conn.execute(
+            "SELECT user_message, intent FROM conversations "
+            "WHERE intent != '' AND user_message != '' "
+            "AND user_message NOT IN (SELECT phrase FROM known_phrases) "
+            "GROUP BY user_message, intent ORDER BY MIN(sheet_row)"
+        ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+# 📍 INGESTION STATE
+def load_ingest_state(path=LOG_INGEST_STATE_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"last_row": 1, "last_timestamp": "", "last_row_hash": ""}  # Row 1 is the header
+
+def save_ingest_state(state, path=LOG_INGEST_STATE_FILE):
+    # Written after the rows are committed; a crash in between only re-reads rows, which replace themselves
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def row_hash(values):
+    return hashlib.md5("\x1f".join(str(v) for v in values).encode("utf-8")).hexdigest()
+
+
+# 📥 INCREMENTAL INGESTION
+def column_positions(header):
+    """Sheet column index of the timestamp (first column) and of each LOG_COLUMNS field."""
+    positions = {"timestamp": 0}
+    for name, field in LOG_COLUMNS.items():
+        if name in header:
+            positions[field] = header.index(name)
+    return positions
+
+def to_store_row(sheet_row, values, positions):
+    def cell(field):
+        index = positions.get(field)
+        return str(values[index]).strip() if index is not None and index < len(values) else ""
+    return (sheet_row, cell("timestamp"), cell("user_message"), cell("intent"), cell("bot_response"))
+
+def read_rows(sheet, first_row, width, batch_rows=LOG_BATCH_ROWS):
+    """Yields (sheet_row, values) from first_row on, one ranged read per batch, until a short batch."""
+    start = first_row
+    while True:
+        end = start + batch_rows - 1
+        batch = sheet.get(f"{rowcol_to_a1(start, 1)}:{rowcol_to_a1(end, width)}")
+        for offset, values in enumerate(batch):
+            yield start + offset, values
+        if len(batch) < batch_rows:
+            return
+        start = end + 1
+
+def ingest_new_rows(sheet, store, state_path=LOG_INGEST_STATE_FILE, batch_rows=LOG_BATCH_ROWS):
+    """Copies the sheet rows added since the last run into the store. Returns how many were added."""
+    state = load_ingest_state(state_path)
+    header = sheet.row_values(1)
+    positions = column_positions(header)
+    width = max(len(header), 1)
+
+    # The last ingested row must still be where we left it, otherwise the sheet was edited: start over
+    if state["last_row"] > 1:
+        previous = sheet.get(f"{rowcol_to_a1(state['last_row'], 1)}:{rowcol_to_a1(state['last_row'], width)}")
+        if not previous or row_hash(previous[0]) != state["last_row_hash"]:
+            print("⚠️ Chatbot logs changed above the last ingested row. Re-ingesting the whole sheet.")
+            store.clear()
+            state = load_ingest_state(os.devnull)
+
+    added, batch = 0, []
+    for sheet_row, values in read_rows(sheet, state["last_row"] + 1, width, batch_rows):
+        if not any(str(v).strip() for v in values):
+            continue
+        batch.append(to_store_row(sheet_row, values, positions))
+        state = {"last_row": sheet_row, "last_timestamp": batch[-1][1], "last_row_hash": row_hash(values)}
+        if len(batch) >= batch_rows:
+            store.add_rows(batch)
+            added += len(batch)
+            batch = []
+    if batch:
+        store.add_rows(batch)
+        added += len(batch)
+
+    save_ingest_state(state, state_path)
+    print(f"📥 Ingested {added} new log rows (through sheet row {state['last_row']}, {state['last_timestamp'] or 'no timestamp'}).")
+    return added
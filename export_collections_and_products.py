@@ -1,14 +1,41 @@
 
 import os
+import time
 import requests
 import json
 
-# 🔑 API Credentials
-SHOPIFY_ACCESS_TOKEN = os.getenv("SHOPIFY_API_KEY")
-SHOPIFY_STORE_URL = os.getenv("SHOPIFY_STORE_URL")
+from tenants import script_tenant
+
+# 🔑 API Credentials (--store <id> or STORE_ID picks the store in tenants.json; default: SHOPIFY_* env vars)
+STORE = script_tenant()
+SHOPIFY_ACCESS_TOKEN = STORE.access_token
+SHOPIFY_STORE_URL = STORE.store_url
 
 HEADERS = {"X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN}
 
+# ⚙️ EXPORT SETTINGS
+PRODUCT_EXPORT_MODE = os.getenv("PRODUCT_EXPORT_MODE", "bulk")  # "bulk" (GraphQL bulk operation) or "rest"
+BULK_POLL_SECONDS = float(os.getenv("BULK_POLL_SECONDS", "2"))
+BULK_TIMEOUT_SECONDS = float(os.getenv("BULK_TIMEOUT_SECONDS", "900"))
+GRAPHQL_TIMEOUT_SECONDS = 30
+
+# Only the fields generate_collection_descriptions.py uses; REST sends variants, images and options too
+BULK_PRODUCTS_QUERY = """
+{
+  products(query: "status:active") {
+    edges {
+      node {
+        id
+        handle
+        title
+        tags
+        status
+      }
+    }
+  }
+}
+"""
+
 # 📦 Fetch collections from Shopify
 def get_all_collections():
     collections = []
@@ -64,15 +91,103 @@ def get_all_products():
     print(f"✅ Total products fetched: {len(products)}")
     return products
 
+# ⚡ Bulk export: Shopify runs the query in the background and hands back one JSONL file
+def graphql(query, variables=None):
+    url = f"{SHOPIFY_STORE_URL}/admin/api/2024-01/graphql.json"
+    response = requests.post(url, headers=HEADERS, json={"query": query, "variables": variables or {}},
+                             timeout=GRAPHQL_TIMEOUT_SECONDS)
+    if response.status_code != 200:
+        raise RuntimeError(f"GraphQL request failed: {response.status_code}")
+    payload = response.json()
+    if payload.get("errors"):
+        raise RuntimeError(f"GraphQL errors: {payload['errors']}")
+    return payload["data"]
+
+def start_bulk_export(query=BULK_PRODUCTS_QUERY):
+    data = graphql(
+        "mutation run($query: String!) { bulkOperationRunQuery(query: $query) "
+        "{ bulkOperation { id status } userErrors { field message } } }",
+        {"query": query}
+    )
+    result = data["bulkOperationRunQuery"]
+    if result["userErrors"]:
+        raise RuntimeError(f"Bulk operation rejected: {result['userErrors']}")
+    return result["bulkOperation"]["id"]
+
+def wait_for_bulk_operation(operation_id):
+    """Polls until the operation finishes. Returns the result URL (None when nothing matched)."""
+    deadline = time.time() + BULK_TIMEOUT_SECONDS
+    while time.time() < deadline:
+        operation = graphql(
+            "{ currentBulkOperation { id status errorCode objectCount url } }"
+        )["currentBulkOperation"]
+        if not operation or operation["id"] != operation_id:
+            raise RuntimeError(f"Bulk operation {operation_id} is no longer the current one")
+        if operation["status"] == "COMPLETED":
+            print(f"✅ Bulk operation finished: {operation['objectCount']} objects")
+            return operation["url"]
+        if operation["status"] in ("FAILED", "CANCELED", "EXPIRED"):
+            raise RuntimeError(f"Bulk operation {operation['status']}: {operation.get('errorCode')}")
+        print(f"⏳ Bulk operation {operation['status'].lower()} ({operation['objectCount']} objects so far)...")
+        time.sleep(BULK_POLL_SECONDS)
+    raise RuntimeError(f"Bulk operation didn't finish in {BULK_TIMEOUT_SECONDS:.0f}s")
+
+def bulk_product(node):
+    # Same shape as the REST payload the rest of the pipeline reads
+    return {
+        "id": int(node["id"].rsplit("/", 1)[-1]),
+        "handle": node.get("handle", ""),
+        "title": node.get("title", ""),
+        "tags": ", ".join(node.get("tags", [])),
+        "status": node.get("status", "").lower(),
+    }
+
+def iter_bulk_products(url):
+    """Streams the JSONL result one product at a time; the file is never held in memory."""
+    with requests.get(url, stream=True, timeout=GRAPHQL_TIMEOUT_SECONDS) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                product = bulk_product(json.loads(line))
+                if product["status"] == "active":
+                    yield product
+
+def write_json_array(path, items):
+    """Writes items to a JSON array file as they arrive. Returns how many were written."""
+    count = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for item in items:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(item, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n")
+    os.replace(tmp_path, path)
+    return count
+
+def export_products(path=STORE.path("products.json"), mode=PRODUCT_EXPORT_MODE):
+    if mode == "bulk":
+        try:
+            url = wait_for_bulk_operation(start_bulk_export())
+            count = write_json_array(path, iter_bulk_products(url) if url else [])
+            print(f"✅ Total products fetched (bulk): {count}")
+            return count
+        except Exception as e:
+            print(f"⚠️ Bulk export failed ({e}). Falling back to the REST products endpoint.")
+
+    products = get_all_products()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(products, f, indent=2, ensure_ascii=False)
+    return len(products)
+
 if __name__ == "__main__":
     print("🚀 Exporting Shopify collections and products...")
     collections = get_all_collections()
-    products = get_all_products()
 
-    with open("collections.json", "w", encoding="utf-8") as f:
+    with open(STORE.path("collections.json"), "w", encoding="utf-8") as f:
         json.dump(collections, f, indent=2, ensure_ascii=False)
 
-    with open("products.json", "w", encoding="utf-8") as f:
-        json.dump(products, f, indent=2, ensure_ascii=False)
+    export_products(STORE.path("products.json"))
 
-    print("📦 collections.json and products.json exported successfully!")
+    print(f"📦 {STORE.path('collections.json')} and {STORE.path('products.json')} exported successfully!")
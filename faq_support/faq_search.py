@@ -7,6 +7,8 @@ import traceback
 import tiktoken
 import re
 from bs4 import BeautifulSoup
+from tracing import span, count_external, record_llm_usage
+from resilience import guarded, OPENAI_MAX_RETRIES
 
 model = SentenceTransformer('all-MiniLM-L6-v2')
 
@@ -20,18 +22,36 @@ def clean_faq_answer(answer, max_lines=5):
     return "<br>".join(limited_lines)
 
 FAQ_PATH = os.path.join(os.path.dirname(__file__), 'faqs_claybot.json')
-with open(FAQ_PATH, 'r', encoding='utf-8') as f:
-    faqs = json.load(f)
-
 EMBEDDINGS_PATH = os.path.join(os.path.dirname(__file__), 'faq_embeddings.pt')
-faq_embeddings = torch.load(EMBEDDINGS_PATH)
 
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def load_faq_index(faq_path=FAQ_PATH, embeddings_path=EMBEDDINGS_PATH):
+    with open(faq_path, 'r', encoding='utf-8') as f:
+        faqs = json.load(f)
+    faq_embeddings = torch.load(embeddings_path)
+    if len(faqs) != len(faq_embeddings):
+        raise ValueError(f"{len(faqs)} FAQs but {len(faq_embeddings)} embeddings")
+    return {"faqs": faqs, "embeddings": faq_embeddings}
+
+# Loaded on first use; server.py passes its own hot-reloaded index instead
+faq_index = None
+
+def get_faq_index(index=None):
+    global faq_index
+    if index is not None:
+        return index
+    if faq_index is None:
+        faq_index = load_faq_index()
+    return faq_index
 
+client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=OPENAI_MAX_RETRIES)
 
-def search_faq_semantic(user_message, top_k=1):
-    query_embedding = model.encode(user_message, convert_to_tensor=True)
-    hits = util.semantic_search(query_embedding, faq_embeddings, top_k=top_k)[0]
+
+def search_faq_semantic(user_message, top_k=1, index=None):
+    index = get_faq_index(index)
+    faqs = index["faqs"]
+    with span("faq_semantic_search"):
+        query_embedding = model.encode(user_message, convert_to_tensor=True)
+        hits = util.semantic_search(query_embedding, index["embeddings"], top_k=top_k)[0]
 
     if hits and hits[0]['score'] > 0.5:
         match = faqs[hits[0]['corpus_id']]
@@ -44,9 +64,12 @@ def search_faq_semantic(user_message, top_k=1):
         }
     return None
 
-def fallback_faq_ai(user_message):
-    query_embedding = model.encode(user_message, convert_to_tensor=True)
-    hits = util.semantic_search(query_embedding, faq_embeddings, top_k=5)[0]
+def fallback_faq_ai(user_message, index=None, customer_message=None):
+    index = get_faq_index(index)
+    faqs = index["faqs"]
+    with span("faq_semantic_search"):
+        query_embedding = model.encode(user_message, convert_to_tensor=True)
+        hits = util.semantic_search(query_embedding, index["embeddings"], top_k=5)[0]
 
     encoder = tiktoken.encoding_for_model("gpt-3.5-turbo")
     max_tokens = 3000
@@ -70,18 +93,22 @@ def fallback_faq_ai(user_message):
         "You are a support assistant for Clay Imports. Only answer based on the following FAQs.\n"
         "If the user's question is unrelated, reply with 'Sorry, I can't help with that.'\n"
         f"FAQs:\n{faqs_text}\n"
-        f"User: {user_message}\nAssistant:"
+        f"User: {customer_message or user_message}\nAssistant:"
     )
 
     print("🧾 Prompt length (tokens):", len(encoder.encode(prompt)))
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=250
-        )
+        count_external("openai")
+        with span("openai_faq"), guarded("openai") as timeout:
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.2,
+                max_tokens=250,
+                timeout=timeout
+            )
+        record_llm_usage(response, "gpt-3.5-turbo")
         content = response.choices[0].message.content.strip()
         if content and "Sorry" not in content:
             return content
@@ -98,8 +125,9 @@ def fallback_faq_ai(user_message):
         print(f"❌ OpenAI fallback failed: {e}")
         return "Sorry, I couldn't find a relevant answer."
 
-def get_best_faq_answer(user_message):
-    result = search_faq_semantic(user_message)
+def get_best_faq_answer(user_message, index=None, customer_message=None):
+    # user_message is searched; customer_message (as typed, when given) is what the LLM is shown
+    result = search_faq_semantic(user_message, index=index)
     if result:
         return {
             "source": "semantic",
@@ -110,7 +138,7 @@ def get_best_faq_answer(user_message):
             )
         }
     else:
-        ai_answer = fallback_faq_ai(user_message)
+        ai_answer = fallback_faq_ai(user_message, index=index, customer_message=customer_message)
         return {
             "source": "ai",
             "answer": ai_answer
@@ -21,5 +21,6 @@ faq_embeddings = model.encode(faq_texts, convert_to_tensor=True)
 
 # Save embeddings in .pt file
 output_path = os.path.join(os.path.dirname(__file__), 'faq_embeddings.pt')
-torch.save(faq_embeddings, output_path)
+torch.save(faq_embeddings, output_path + ".tmp")
+os.replace(output_path + ".tmp", output_path)
 print(f"✅ Embeddings saved in {output_path}")
\ No newline at end of file
@@ -1,27 +1,48 @@
-
-import json
 import os
 from openai import OpenAI
 from tqdm import tqdm
 
+from json_stream import iter_json_records, write_jsonl
+from tenants import script_tenant
+
+# 📁 DATA FILES (in the data_dir of the store picked with --store <id> or STORE_ID)
+STORE = script_tenant()
+COLLECTIONS_FILE = STORE.path("collections.json")
+PRODUCTS_FILE = STORE.path("products.json")
+DESCRIBED_COLLECTIONS_FILE = STORE.path("collections_described.jsonl")
+
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-# Load collections and products
-with open("collections.json", "r", encoding="utf-8") as f:
-    collections = json.load(f)
 
-with open("products.json", "r", encoding="utf-8") as f:
-    products = json.load(f)
+# Products are streamed once; only their id, title and tags are kept, never the full payload
+class ProductIndex:
+    def __init__(self):
+        self.ids = []
+        self.titles = []
+        self.lower_titles = []
+        self.tag_to_products = {}  # tag -> positions in the lists above
+
+    def add(self, product):
+        position = len(self.ids)
+        self.ids.append(product.get("id"))
+        self.titles.append(product.get("title", ""))
+        self.lower_titles.append(product.get("title", "").lower())
+        for tag in product.get("tags", "").split(", "):
+            self.tag_to_products.setdefault(tag.strip().lower(), []).append(position)
 
-# Index products by tag
-tag_to_products = {}
-for product in products:
-    product_tags = product.get("tags", "").split(", ")
-    for tag in product_tags:
-        tag_to_products.setdefault(tag.strip().lower(), []).append(product)
+    def __len__(self):
+        return len(self.ids)
 
-def generate_description(title, product_list):
-    product_titles = [p["title"] for p in product_list[:10]]
+
+def load_product_index(path=PRODUCTS_FILE):
+    index = ProductIndex()
+    for product in iter_json_records(path):
+        index.add(product)
+    return index
+
+
+def generate_description(title, product_titles):
+    product_titles = product_titles[:10]
     prompt = f"""
 You're a tile branding expert for Clay Imports. Write a 1–2 sentence product collection description for a Shopify collection titled "{title}".
 These are some of the products in this collection: {", ".join(product_titles)}.
@@ -39,10 +60,9 @@ Highlight the overall feel, style, or applications without naming individual pro
         print(f"❌ Error generating description: {e}")
         return ""
 
-# Generate descriptions
-updated = 0
-for collection in tqdm(collections, desc="🔄 Generando descripciones"):
-    matched_products = []
+
+def match_products(collection, products):
+    matched = []
     rules = collection.get("rules", [])
 
     # 1. Search for products by tag rules (automatic collections)
@@ -50,28 +70,40 @@ for collection in tqdm(collections, desc="🔄 Generando descripciones"):
         for rule in rules:
             if rule["column"] == "tag":
                 tag = rule["condition"].strip().lower()
-                matched_products.extend(tag_to_products.get(tag, []))
+                matched.extend(products.tag_to_products.get(tag, []))
 
     # 2. If there are no rules search by title match (manual collections)
-    if not matched_products:
-        title_keywords = collection.get("title", "").lower().split()
-        for product in products:
-            product_title = product.get("title", "").lower()
-            if all(word in product_title for word in title_keywords if len(word) > 3):
-                matched_products.append(product)
-
-    # 3. Save
-    collection["product_count"] = len(matched_products)
-    collection["product_titles"] = [p["title"] for p in matched_products]
-
-    if not collection.get("body_html") and matched_products:
-        desc = generate_description(collection["title"], matched_products)
-        if desc:
-            collection["body_html"] = desc
-            updated += 1
-
-# Save enriched collection
-with open("collections_described.json", "w", encoding="utf-8") as f:
-    json.dump(collections, f, indent=2, ensure_ascii=False)
-
-print(f"✅ Descriptions generated for {updated} collections.")
+    if not matched:
+        title_keywords = [word for word in collection.get("title", "").lower().split() if len(word) > 3]
+        matched = [position for position, product_title in enumerate(products.lower_titles)
+                   if all(word in product_title for word in title_keywords)]
+    return matched
+
+
+def enrich_collections(collections, products, stats):
+    """Yields each collection with product_count/product_titles (and a description if it had none)."""
+    for collection in collections:
+        matched = match_products(collection, products)
+
+        # 3. Save
+        collection["product_count"] = len(matched)
+        collection["product_titles"] = [products.titles[position] for position in matched]
+
+        if not collection.get("body_html") and matched:
+            desc = generate_description(collection["title"], collection["product_titles"])
+            if desc:
+                collection["body_html"] = desc
+                stats["updated"] += 1
+        yield collection
+
+
+if __name__ == "__main__":
+    products = load_product_index()
+    print(f"📦 Indexed {len(products)} products")
+
+    # Enriched collections are written one per line as they are produced
+    stats = {"updated": 0}
+    collections = tqdm(iter_json_records(COLLECTIONS_FILE), desc="🔄 Generando descripciones")
+    written = write_jsonl(DESCRIBED_COLLECTIONS_FILE, enrich_collections(collections, products, stats))
+
+    print(f"✅ Descriptions generated for {stats['updated']} collections ({written} saved in {DESCRIBED_COLLECTIONS_FILE}).")
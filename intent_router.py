@@ -0,0 +1,169 @@
+import json
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from smart_page_router import PAGE_INTENT_KEYWORDS
+
+TRAINING_FILE = "training_data.json"
+
+# ⚙️ ROUTER SETTINGS
+ROUTER_MIN_CONFIDENCE = 0.8  # Rules must beat this (strictly) or the sklearn model decides
+DEFAULT_INTENT_THRESHOLD = 0.4  # Used when weekly_learning.py hasn't tuned one for an intent
+KEYWORD_MIN_SUPPORT = 4  # A learned keyword must appear in at least this many examples
+KEYWORD_MIN_PURITY = 0.95  # ...and almost only in one intent
+RULE_CONFIDENCE = 0.95  # Hand-written page keywords
+
+IRRELEVANT_KEYWORDS = [
+    "capital", "president", "weather", "history", "who is", "define", "translate",
+    "joke", "fun fact", "news", "sports", "movie", "music", "random fact", "science",
+    "adopt", "dragon", "dog", "pet", "spaceship", "crypto", "rent", "flight", "food", "pizza"
+]
+
+STOPWORDS = {
+    "a", "an", "and", "are", "be", "can", "do", "does", "for", "from", "have", "here", "how", "i",
+    "if", "in", "is", "it", "me", "my", "of", "on", "or", "should", "the", "there", "this", "to",
+    "what", "when", "where", "which", "will", "with", "you", "your",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def compile_keyword_pattern(keywords):
+    # Longest keywords first so "return policy" wins over "return" at the same position
+    ordered = sorted(keywords, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(re.escape(k) for k in ordered) + r")\b")
+
+
+# Word boundaries: "rent" must not match "current", nor "pet" match "competitor"
+IRRELEVANT_PATTERN = compile_keyword_pattern(IRRELEVANT_KEYWORDS)
+
+
+def is_irrelevant_question(query):
+    return IRRELEVANT_PATTERN.search((query or "").lower()) is not None
+
+
+def learn_keywords(training_data, min_support=KEYWORD_MIN_SUPPORT, min_purity=KEYWORD_MIN_PURITY):
+    """Unigrams/bigrams that almost always point at a single intent in training_data.json."""
+    counts = defaultdict(Counter)
+    for entry in training_data:
+        for example in entry["examples"]:
+            words = tokenize(example)
+            grams = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+            for gram in grams:
+                counts[gram][entry["intent"]] += 1
+
+    keywords = {}
+    for gram, by_intent in counts.items():
+        if all(word in STOPWORDS for word in gram.split()):
+            continue
+        intent, support = by_intent.most_common(1)[0]
+        total = sum(by_intent.values())
+        if support >= min_support and support / total >= min_purity:
+            # Laplace-smoothed purity, so rare keywords count for less
+            keywords[gram] = (intent, support / (total + 1))
+    return keywords
+
+
+class IntentRouter:
+    def __init__(self, training_data, min_confidence=ROUTER_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+
+        self.exact = {}
+        conflicting = set()
+        for entry in training_data:
+            for example in entry["examples"]:
+                key = " ".join(tokenize(example))
+                if self.exact.get(key, entry["intent"]) != entry["intent"]:
+                    conflicting.add(key)
+                self.exact[key] = entry["intent"]
+        for key in conflicting:
+            del self.exact[key]
+
+        self.keywords = learn_keywords(training_data)
+        for intent, phrases in PAGE_INTENT_KEYWORDS.items():
+            for phrase in phrases:
+                self.keywords[phrase] = (intent, RULE_CONFIDENCE)
+        self.pattern = compile_keyword_pattern(self.keywords) if self.keywords else None
+
+    def match(self, message):
+        """Returns (intent, confidence, source) from rules alone, or None."""
+        text = (message or "").lower()
+        if IRRELEVANT_PATTERN.search(text):
+            return "not_supported", 1.0, "irrelevant"
+
+        intent = self.exact.get(" ".join(tokenize(text)))
+        if intent:
+            return intent, 1.0, "exact"
+
+        if self.pattern is None:
+            return None
+
+        hits = defaultdict(list)
+        for found in self.pattern.finditer(text):
+            keyword_intent, confidence = self.keywords[found.group(0)]
+            hits[keyword_intent].append(confidence)
+
+        if len(hits) != 1:
+            return None  # No keyword, or keywords disagree
+
+        intent, confidences = next(iter(hits.items()))
+        miss = 1.0
+        for confidence in confidences:
+            miss *= 1.0 - confidence
+        return intent, 1.0 - miss, "keywords"
+
+    def predict_proba(self, message, model, temperature=1.0):
+        routed = self.match(message)
+        if routed and routed[1] > self.min_confidence:
+            return {routed[0]: routed[1]}
+        return model_proba(message, model, temperature)
+
+    def route(self, message, model, calibration=None):
+        """Returns intent, calibrated confidence, top-2 intents and whether the
+        confidence clears that intent's threshold (tuned offline on held-out data)."""
+        calibration = calibration or {}
+        routed = self.match(message)
+        if routed and routed[1] > self.min_confidence:
+            intent, confidence, source = routed
+            return {
+                "intent": intent,
+                "confidence": confidence,
+                "top2": [(intent, confidence)],
+                "source": source,
+                "confident": True,
+            }
+
+        probabilities = model_proba(message, model, calibration.get("temperature", 1.0))
+        top2 = sorted(probabilities.items(), key=lambda item: -item[1])[:2]
+        intent, confidence = top2[0]
+        threshold = calibration.get("thresholds", {}).get(intent, DEFAULT_INTENT_THRESHOLD)
+        return {
+            "intent": intent,
+            "confidence": confidence,
+            "top2": top2,
+            "source": "model",
+            "confident": confidence >= threshold,
+        }
+
+
+def apply_temperature(log_proba, temperature):
+    scaled = np.asarray(log_proba) / temperature
+    scaled = scaled - scaled.max(axis=-1, keepdims=True)
+    exp = np.exp(scaled)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def model_proba(message, model, temperature=1.0):
+    probabilities = apply_temperature(model.predict_log_proba([message])[0], temperature)
+    return {str(intent): float(p) for intent, p in zip(model.classes_, probabilities)}
+
+
+def load_intent_router(path=TRAINING_FILE):
+    with open(path, "r") as f:
+        return IntentRouter(json.load(f))
@@ -0,0 +1,60 @@
+import json
+import os
+import re
+
+# 📜 Record-at-a-time JSON I/O for the pipeline files, so memory doesn't grow with the catalog
+READ_CHUNK_CHARS = 1 << 16
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def iter_json_records(path, chunk_chars=READ_CHUNK_CHARS):
+    """Yields the objects of a JSON array file or of a JSONL file, one at a time.
+
+    Only a read chunk plus the object being decoded are in memory, whatever the file size.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, pos, in_array = f.read(chunk_chars), 0, None
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos >= len(buffer):
+                more = f.read(chunk_chars)
+                if not more:
+                    return
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            if in_array is None:
+                in_array = buffer[pos] == "["
+                pos += in_array
+                continue
+            if in_array and buffer[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                more = f.read(chunk_chars)  # Object cut by the chunk boundary
+                if not more:
+                    raise
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield record
+            pos = end
+            if pos > chunk_chars:
+                buffer, pos = buffer[pos:], 0
+
+
+def write_jsonl(path, records):
+    """Writes records as they arrive, one JSON object per line. Returns how many were written."""
+    count = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    os.replace(tmp_path, path)  # Readers never see half a file
+    return count
+
+
+def load_records(path):
+    return list(iter_json_records(path))
@@ -0,0 +1,137 @@
+import numpy as np
+from bs4 import BeautifulSoup
+
+from collection_search import top_positions, EMBEDDING_MODEL
+
+# ⚙️ KNOWLEDGE INDEX SETTINGS
+KNOWLEDGE_INDEX_FILE = "knowledge_index.joblib"
+CHUNK_WORDS = 120  # all-MiniLM-L6-v2 reads ~250 word pieces, so a chunk is embedded whole
+CHUNK_OVERLAP_WORDS = 30
+KNOWLEDGE_TOP_K = 4
+KNOWLEDGE_MIN_SCORE = 0.35  # Below this a chunk is more likely noise than help
+KNOWLEDGE_MAX_PER_URL = 2  # Keep room for other sources
+KNOWLEDGE_CONTEXT_WORDS = 400  # Prompt budget for retrieved text
+MAX_PRODUCT_TITLES = 20
+
+
+def html_to_text(html):
+    return " ".join(BeautifulSoup(html or "", "html.parser").get_text(" ").split())
+
+
+def chunk_text(text, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP_WORDS):
+    words = text.split()
+    if not words:
+        return []
+    step = max(size - overlap, 1)
+    return [" ".join(words[start:start + size]) for start in range(0, max(len(words) - overlap, 1), step)]
+
+
+def knowledge_documents(pages=(), articles=(), faqs=(), collections=(), store_url=""):
+    """Normalizes every source to {"source", "title", "url", "text"}."""
+    documents = []
+    for page in pages:
+        documents.append({
+            "source": "page",
+            "title": page.get("title", ""),
+            "url": f"{store_url}/pages/{page.get('handle', '')}",
+            "text": html_to_text(page.get("body_html", "")),
+        })
+    for article in articles:
+        documents.append({
+            "source": "blog",
+            "title": article.get("title", ""),
+            "url": article.get("url", ""),
+            "text": html_to_text(article.get("content", "")),
+        })
+    for faq in faqs:
+        documents.append({
+            "source": "faq",
+            "title": faq.get("title", ""),
+            "url": faq.get("url", ""),
+            "text": " ".join(filter(None, [faq.get("subtitle", ""), html_to_text(faq.get("answer", ""))])),
+        })
+    for coll in collections:
+        products = list(coll.get("product_titles", []))[:MAX_PRODUCT_TITLES]
+        text = html_to_text(coll.get("body_html", ""))
+        if products:
+            text += " Products include: " + ", ".join(products) + "."
+        documents.append({
+            "source": "collection",
+            "title": coll.get("title", ""),
+            "url": f"{store_url}/collections/{coll.get('handle', '')}",
+            "text": text,
+        })
+    return [doc for doc in documents if doc["text"].strip()]
+
+
+class KnowledgeIndex:
+    """Chunks of every store source with one embedding matrix; a query is one matrix-vector product."""
+
+    def __init__(self, chunks, embeddings, model_name=EMBEDDING_MODEL):
+        self.chunks = chunks
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings = embeddings.reshape(len(chunks), -1) if chunks else embeddings.reshape(0, 0)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.embeddings = embeddings / np.maximum(norms, 1e-12)
+        self.model_name = model_name
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def sources(self):
+        counts = {}
+        for chunk in self.chunks:
+            counts[chunk["source"]] = counts.get(chunk["source"], 0) + 1
+        return counts
+
+    def search(self, query_embedding, top_k=KNOWLEDGE_TOP_K, min_score=KNOWLEDGE_MIN_SCORE,
+               max_per_url=KNOWLEDGE_MAX_PER_URL):
+        """Returns [(chunk, score)], best first."""
+        if not self.chunks:
+            return []
+        query_vector = np.asarray(query_embedding, dtype=np.float32).ravel()
+        query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+        scores = self.embeddings @ query_vector
+        scores[scores < min_score] = -np.inf
+
+        hits, per_url = [], {}
+        for pos in top_positions(scores, top_k * max_per_url):
+            chunk = self.chunks[pos]
+            if per_url.get(chunk["url"], 0) >= max_per_url:
+                continue
+            per_url[chunk["url"]] = per_url.get(chunk["url"], 0) + 1
+            hits.append((chunk, float(scores[pos])))
+            if len(hits) == top_k:
+                break
+        return hits
+
+
+def build_knowledge_index(documents, model):
+    """Chunks the documents and embeds every chunk with `model` (a SentenceTransformer)."""
+    chunks = []
+    for doc in documents:
+        for text in chunk_text(doc["text"]):
+            chunks.append({"source": doc["source"], "title": doc["title"], "url": doc["url"], "text": text})
+    texts = [f"{chunk['title']}: {chunk['text']}" for chunk in chunks]
+    embeddings = model.encode(texts, batch_size=64, normalize_embeddings=True, show_progress_bar=False) if texts else []
+    return KnowledgeIndex(chunks, embeddings)
+
+
+def is_valid_knowledge_index(index):
+    return isinstance(index, KnowledgeIndex) and len(index) == index.embeddings.shape[0]
+
+
+def format_context(hits, max_words=KNOWLEDGE_CONTEXT_WORDS):
+    """Retrieved chunks as prompt text, cut at the word budget. Empty when nothing matched."""
+    lines, used = [], 0
+    for chunk, _ in hits:
+        words = chunk["text"].split()
+        if used + len(words) > max_words:
+            words = words[:max_words - used]
+        if not words:
+            break
+        lines.append(f"- [{chunk['source']}] {chunk['title']} ({chunk['url']}): {' '.join(words)}")
+        used += len(words)
+    if not lines:
+        return ""
+    return "Store information (answer from it when it is relevant, and include the link):\n" + "\n".join(lines)
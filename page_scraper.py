@@ -1,4 +1,3 @@
-import requests
 from bs4 import BeautifulSoup
 from difflib import SequenceMatcher
 from openai import OpenAI
@@ -7,8 +6,15 @@ import os
 import json
 import numpy as np
 import re
-
-# Shopify store URL
+import tempfile
+import threading
+import time
+from cachetools import LRUCache
+from tracing import span, count_external, count_cache, record_llm_usage
+from resilience import guarded, guarded_get, OPENAI_MAX_RETRIES
+from tenants import current_tenant
+
+# Shopify store URL of the default store (every other store has its own storefront_url)
 shopify_store_url = "https://clayimports.com"
 
 # --- EMBEDDING SETUP ---
@@ -27,14 +33,18 @@ def get_embedding(text):
     text = text.strip().replace("\n", " ")[:2000]
     text_hash = hashlib.md5(text.encode()).hexdigest()
 
+    count_cache("embedding", text_hash in embedding_cache)
     if text_hash in embedding_cache:
         return embedding_cache[text_hash]
 
-    client = OpenAI()
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
+    client = OpenAI(max_retries=OPENAI_MAX_RETRIES)
+    count_external("openai")
+    with span("openai_embedding"), guarded("openai") as timeout:
+        response = client.embeddings.create(
+            model="text-embedding-3-small",
+            input=text,
+            timeout=timeout
+        )
     embedding = response.data[0].embedding
     embedding_cache[text_hash] = embedding
     save_embedding_cache()
@@ -47,45 +57,237 @@ def cosine_similarity(vec1, vec2):
 
 
 # --- SCRAPING FUNCTION ---
-def scrape_shopify_page(url):
+SCRAPE_CACHE_PATH = "scrape_cache.json"
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", "3600"))  # Seconds before we revalidate with the store
+
+IRRELEVANT_TAGS = ["script", "style", "noscript", "header", "footer", "svg", "nav", "form", "button"]
+CLASS_BLACKLIST = ["footer", "header", "menu", "wishlist", "share", "newsletter", "toolbar", "account", "breadcrumb"]
+
+try:
+    import lxml.html
+    PARSER_BACKEND = "lxml"
+except ImportError:
+    PARSER_BACKEND = "html.parser"
+
+# One XPath that selects every subtree we throw away, so lxml prunes them in a single pass
+_PRUNE_XPATH = " | ".join(
+    [f"//{tag}" for tag in IRRELEVANT_TAGS]
+    + [
+        "//*[@class and ("
+        + " or ".join(
+            f"contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{word}')"
+            for word in CLASS_BLACKLIST
+        )
+        + ")]"
+    ]
+)
+
+scrape_cache = {}
+scrape_cache_lock = threading.Lock()
+
+if os.path.exists(SCRAPE_CACHE_PATH):
     try:
-        print(f"🕸️ Scraping content from: {url}")
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            print(f"❌ Failed to fetch page. Status code: {response.status_code}")
-            return ""
+        with open(SCRAPE_CACHE_PATH, "r") as f:
+            scrape_cache = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not read {SCRAPE_CACHE_PATH}: {e}")
+
+def save_scrape_cache():
+    with scrape_cache_lock:
+        data = json.dumps(scrape_cache)
+    # Unique temp file per save: other threads and workers save the cache too
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(SCRAPE_CACHE_PATH) or ".", prefix=os.path.basename(SCRAPE_CACHE_PATH) + ".")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, SCRAPE_CACHE_PATH)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def extract_visible_text_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
 
-        soup = BeautifulSoup(response.text, "html.parser")
+    # Remove irrelevant sections by tag
+    for tag in soup(IRRELEVANT_TAGS):
+        tag.decompose()
 
-        # Remove irrelevant sections by tag
-        for tag in soup(["script", "style", "noscript", "header", "footer", "svg", "nav", "form", "button"]):
-            tag.decompose()
+    # Remove irrelevant sections by classes
+    for div in soup.find_all(True, {"class": lambda c: c and any(x in c.lower() for x in CLASS_BLACKLIST)}):
+        div.decompose()
 
-        # Remove irrelevant sections by classes
-        blacklist = ["footer", "header", "menu", "wishlist", "share", "newsletter", "toolbar", "account", "breadcrumb"]
-        for div in soup.find_all(True, {"class": lambda c: c and any(x in c.lower() for x in blacklist)}):
-            div.decompose()
+    # Extract only visible text
+    visible_text = soup.get_text(separator=" ", strip=True)
 
-        # Extract only visible text
-        visible_text = soup.get_text(separator=" ", strip=True)
+    # Basic cleanup
+    return re.sub(r"\s{2,}", " ", visible_text)
 
-        # Basic cleanup
-        visible_text = re.sub(r"\s{2,}", " ", visible_text)
+def extract_visible_text_lxml(html):
+    root = lxml.html.document_fromstring(html)
 
-        return visible_text
+    # Drop blacklisted subtrees before walking any text (keeps their tail text, like decompose())
+    for element in root.xpath(_PRUNE_XPATH):
+        if element.getparent() is not None:
+            element.drop_tree()
+
+    visible_text = " ".join(chunk.strip() for chunk in root.itertext() if chunk.strip())
+    return re.sub(r"\s{2,}", " ", visible_text)
+
+def extract_visible_text(html):
+    if PARSER_BACKEND == "lxml":
+        return extract_visible_text_lxml(html)
+    return extract_visible_text_bs4(html)
+
+def scrape_shopify_page(url):
+    with scrape_cache_lock:
+        cached = dict(scrape_cache.get(url, {}))
+
+    # Fresh enough: no request at all
+    fresh = bool(cached) and time.time() - cached.get("fetched_at", 0) < SCRAPE_CACHE_TTL
+    count_cache("scrape", fresh)
+    if fresh:
+        print(f"🗃️ Using cached text for: {url}")
+        return cached.get("text", "")
+
+    try:
+        print(f"🕸️ Scraping content from: {url}")
+        request_headers = {}
+        if cached.get("etag"):
+            request_headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            request_headers["If-Modified-Since"] = cached["last_modified"]
+
+        count_external("storefront")
+        with span("scrape_fetch"):
+            response = guarded_get("storefront", url, headers=request_headers)
+
+        if response.status_code == 304 and cached:
+            # Unchanged page: no download, no parsing
+            print(f"♻️ Page not modified: {url}")
+            cached["fetched_at"] = time.time()
+        elif response.status_code == 200:
+            with span("scrape_extract"):
+                text = extract_visible_text(response.text)
+            cached = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "text": text,
+                "fetched_at": time.time(),
+            }
+        else:
+            print(f"❌ Failed to fetch page. Status code: {response.status_code}")
+            return cached.get("text", "")
+
+        with scrape_cache_lock:
+            scrape_cache[url] = cached
+        save_scrape_cache()
+        return cached["text"]
 
     except Exception as e:
         print(f"❌ Error during scraping: {e}")
-        return ""
-
+        return cached.get("text", "")
+
+
+# --- UNIFIED CONTENT FETCH AND PAGE PREPROCESSING ---
+PAGE_CHUNK_WORDS = 80
+PAGE_CONTEXT_TOKENS = int(os.getenv("PAGE_CONTEXT_TOKENS", "400"))  # Page text sent to the summarizer
+PAGE_CHUNK_CACHE_SIZE = 256  # Pages whose chunk embeddings stay in memory
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+page_chunk_cache = LRUCache(maxsize=PAGE_CHUNK_CACHE_SIZE)
+
+def dedupe_sentences(*texts):
+    # The storefront page repeats body_html word for word, so keep each sentence once, first seen wins
+    seen = set()
+    sentences = []
+    for text in texts:
+        for sentence in _SENTENCE_SPLIT.split(text or ""):
+            key = re.sub(r"[^a-z0-9]+", " ", sentence.lower()).strip()
+            if key and key not in seen:
+                seen.add(key)
+                sentences.append(sentence.strip())
+    return sentences
+
+def clean_page_sentences(page):
+    body_text = extract_visible_text(page["body_html"]) if (page.get("body_html") or "").strip() else ""
+    storefront_url = current_tenant().storefront_url or shopify_store_url
+    scraped_text = scrape_shopify_page(f"{storefront_url}/pages/{page.get('handle')}")
+    return dedupe_sentences(body_text, scraped_text)
 
-# --- UNIFIED CONTENT FETCH ---
 def get_full_page_text(page):
-    body_html = (page.get("body_html") or "").strip()
-    handle = page.get("handle")
-    scraped_text = scrape_shopify_page(f"{shopify_store_url}/pages/{handle}")
-    combined_text = f"{body_html}\n\n{scraped_text}".strip()
-    return combined_text[:3000]
+    return " ".join(clean_page_sentences(page))[:3000]
+
+def chunk_sentences(sentences, max_words=PAGE_CHUNK_WORDS):
+    pieces = []
+    for sentence in sentences:  # Scraped text without punctuation can be one very long "sentence"
+        words_in = sentence.split()
+        pieces.extend(" ".join(words_in[i:i + max_words]) for i in range(0, len(words_in), max_words))
+
+    chunks, current, words = [], [], 0
+    for sentence in pieces:
+        length = len(sentence.split())
+        if current and words + length > max_words:
+            chunks.append(" ".join(current))
+            current, words = [], 0
+        current.append(sentence)
+        words += length
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+_token_encoder = None
+
+def count_tokens(text):
+    global _token_encoder
+    if _token_encoder is None:
+        try:
+            import tiktoken
+            _token_encoder = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        except Exception as e:
+            print(f"⚠️ Tokenizer unavailable, estimating tokens from length: {e}")
+            _token_encoder = False  # Don't retry the download on every call
+    if _token_encoder is False:
+        return len(text) // 4
+    return len(_token_encoder.encode(text))
+
+def page_chunks(page):
+    """(chunks, normalized embeddings) for a page, cached by content so each page is embedded once."""
+    chunks = chunk_sentences(clean_page_sentences(page))
+    key = hashlib.md5("\n".join(chunks).encode()).hexdigest()
+    cached = page_chunk_cache.get(key)
+    count_cache("page_chunks", cached is not None)
+    if cached is None:
+        from faq_support.faq_search import model  # Local MiniLM, already loaded by the server
+        with span("page_chunk_embedding"):
+            embeddings = model.encode(chunks, normalize_embeddings=True) if chunks else np.zeros((0, 0))
+        cached = page_chunk_cache[key] = (chunks, np.asarray(embeddings, dtype=np.float32))
+    return cached
+
+def select_relevant_chunks(question, chunks, embeddings, max_tokens=PAGE_CONTEXT_TOKENS):
+    """Most relevant chunks first until the token budget is used, returned in page order."""
+    if not chunks:
+        return ""
+    from faq_support.faq_search import model
+    query = np.asarray(model.encode(question, normalize_embeddings=True), dtype=np.float32).ravel()
+    scores = embeddings @ query
+
+    selected, used = [], 0
+    for pos in np.argsort(-scores):
+        tokens = count_tokens(chunks[pos])
+        if selected and used + tokens > max_tokens:
+            continue  # A shorter, less relevant chunk may still fit
+        selected.append(pos)
+        used += tokens
+    return " ".join(chunks[pos] for pos in sorted(selected))
+
+def get_page_context(page, question):
+    """Page text for the summarizer: de-HTMLed, deduplicated, only the parts relevant to the question."""
+    try:
+        chunks, embeddings = page_chunks(page)
+        with span("page_chunk_select"):
+            return select_relevant_chunks(question, chunks, embeddings)
+    except Exception as e:
+        print(f"⚠️ Chunk selection failed, using the page start: {e}")
+        return get_full_page_text(page)
 
 # --- FIND BEST MATCH WITH EMBEDDINGS ---
 def find_best_shopify_pages(query, pages):
@@ -116,32 +318,41 @@ def find_best_shopify_pages(query, pages):
 
 
 # --- SUMMARIZE PAGE CONTENT ---
+# Placeholders for an empty scrape or a failed summary; callers keep them out of their caches
+EMPTY_PAGE_SUMMARY = "This page contains details about your request."
+FAILED_PAGE_SUMMARY = "This page contains useful information about your request."
+PLACEHOLDER_SUMMARIES = (EMPTY_PAGE_SUMMARY, FAILED_PAGE_SUMMARY)
+
 def summarize_page_content(content, title=""):
     try:
         if not content or len(content) < 20:
-            return "This page contains details about your request."
+            return EMPTY_PAGE_SUMMARY
 
         full_prompt = (
             f"The customer is asking about: {title}.\n\n"
             f"Page content:\n{content}"
         )
 
-        client = OpenAI()
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a helpful, friendly assistant. Summarize the page below in 1-2 friendly sentences. "
-                        "Avoid repeating the title, and highlight any useful or unique details customers may appreciate."
-                    )
-                },
-                {"role": "user", "content": full_prompt}
-            ],
-            max_tokens=180,
-            temperature=0.6
-        )
+        client = OpenAI(max_retries=OPENAI_MAX_RETRIES)
+        count_external("openai")
+        with span("openai_summarize"), guarded("openai") as timeout:
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are a helpful, friendly assistant. Summarize the page below in 1-2 friendly sentences. "
+                            "Avoid repeating the title, and highlight any useful or unique details customers may appreciate."
+                        )
+                    },
+                    {"role": "user", "content": full_prompt}
+                ],
+                max_tokens=180,
+                temperature=0.6,
+                timeout=timeout
+            )
+        record_llm_usage(response, "gpt-4o-mini")
 
         summary = response.choices[0].message.content.strip()
         if not summary or len(summary) < 10:
@@ -152,4 +363,4 @@ def summarize_page_content(content, title=""):
 
     except Exception as e:
         print(f"❌ OpenAI summarization failed: {e}")
-        return "This page contains useful information about your request."
+        return FAILED_PAGE_SUMMARY
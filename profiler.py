@@ -0,0 +1,125 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+# ⚙️ PROFILER SETTINGS
+PROFILE_SAMPLE_PERCENT = float(os.getenv("PROFILE_SAMPLE_PERCENT", "0"))  # % of /chat requests profiled, 0 = off
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_INTERVAL_MS = 1000  # Upper bound accepted by /admin/profiling
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_DEPTH = 64
+
+
+def frame_label(frame):
+    # No line numbers: samples of one function merge into one flamegraph box
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse_stack(frame):
+    # Root first, the way flamegraph.pl / speedscope expect collapsed stacks
+    labels = []
+    while frame is not None and len(labels) < PROFILE_MAX_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Statistical profiler for live workers.
+
+    A background thread reads the stacks of the request threads being profiled
+    (sys._current_frames) every interval. Nothing runs while sample_percent is 0:
+    requests only pay one comparison.
+    """
+
+    def __init__(self, sample_percent=PROFILE_SAMPLE_PERCENT, interval_ms=PROFILE_INTERVAL_MS, output_dir=PROFILE_DIR):
+        self.sample_percent = 0.0
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self._active = {}  # thread id -> Counter of collapsed stacks
+        self._by_intent = defaultdict(Counter)
+        self._requests = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.configure(sample_percent)
+
+    def configure(self, sample_percent=None, interval_ms=None):
+        if interval_ms is not None:
+            self.interval = max(float(interval_ms), 1.0) / 1000
+        if sample_percent is not None:
+            self.sample_percent = min(max(float(sample_percent), 0.0), 100.0)
+        if self.sample_percent > 0:
+            self._start()
+        else:
+            self._stop.set()
+        return self.status()
+
+    def _start(self):
+        self._stop.clear()
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def should_profile(self):
+        return self.sample_percent > 0 and random.random() * 100 < self.sample_percent
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def end(self, intent):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+            if samples is None:
+                return
+            self._by_intent[intent or "unknown"].update(samples)
+            self._requests[intent or "unknown"] += 1
+
+    def _sample_loop(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None and ident != own_ident:
+                        samples[collapse_stack(frame)] += 1
+
+    def dump(self, reset=False):
+        """Writes <output_dir>/<intent>-<timestamp>.collapsed files and returns their paths."""
+        with self._lock:
+            snapshot = {intent: Counter(samples) for intent, samples in self._by_intent.items()}
+            if reset:
+                self._by_intent.clear()
+                self._requests.clear()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = []
+        for intent, samples in snapshot.items():
+            path = os.path.join(self.output_dir, f"{intent}-{stamp}.collapsed")
+            with open(path, "w") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(path)
+        print(f"🔥 Wrote {len(paths)} collapsed-stack profile(s) to {self.output_dir}/")
+        return paths
+
+    def status(self):
+        with self._lock:
+            return {
+                "sample_percent": self.sample_percent,
+                "interval_ms": round(self.interval * 1000, 2),
+                "running": bool(self._thread and self._thread.is_alive() and not self._stop.is_set()),
+                "in_flight": len(self._active),
+                "profiled_requests": dict(self._requests),
+                "samples": {intent: sum(samples.values()) for intent, samples in self._by_intent.items()},
+            }
@@ -0,0 +1,148 @@
+import json
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+
+from intent_router import STOPWORDS
+
+# ⚙️ QUERY CANONICALIZATION SETTINGS
+QUERY_VOCABULARY_FILE = "query_vocabulary.json"  # Written by build_knowledge_index.py
+MAX_EDIT_DISTANCE = 2
+SHORT_WORD_EDIT_DISTANCE = 1  # Words shorter than LONG_WORD_LENGTH get fewer edits, or "tile" could become "tide"
+LONG_WORD_LENGTH = 6
+MIN_CORRECTION_LENGTH = 4  # Shorter words are left alone
+PREFIX_LENGTH = 7  # SymSpell prefix: only deletes of the first 7 letters are indexed
+MIN_CANDIDATE_COUNT = 5  # A word the store never uses is only replaced by one it uses at least this often
+INFLECTION_SUFFIXES = ("s", "es", "d", "ed", "ing")  # "glaze" vs "glazed" is a different word, not a typo
+CANONICAL_CACHE_SIZE = int(os.getenv("CANONICAL_CACHE_SIZE", "10000"))
+
+_WORD_RE = re.compile(r"[a-z][a-z']*")
+_TOKEN_RE = re.compile(r"\S+")
+_PROTECTED_TOKEN_RE = re.compile(r"[\d@/_]|\w\.\w")  # Emails, URLs, order numbers, sizes: never spell-corrected
+_DIMENSION_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(?:\"|”|''|in\b|inch(?:es)?\b)?\s*(?:x|×)\s*(\d+(?:\.\d+)?)(?:\s*(?:\"|”|''|in\b|inch(?:es)?\b))?"
+)
+# "by" is also plain English, so only a number standing alone after it counts ("3 by 5pm" stays)
+_BY_DIMENSION_RE = re.compile(
+    r"\b(\d+(?:\.\d+)?)\s*(?:\"|”|''|in\b|inch(?:es)?\b)?\s*by\s+(\d+(?:\.\d+)?)(?:\s*(?:\"|”|''|in\b|inch(?:es)?\b))?(?!\w|\.\d)"
+)
+
+
+def normalize_dimensions(text):
+    # 4" x 4", 4 in x 4 in, 4 by 4 → 4x4 (centimeters keep their unit)
+    return _BY_DIMENSION_RE.sub(r"\1x\2", _DIMENSION_RE.sub(r"\1x\2", text))
+
+
+def clean_title(title): # regex
+    title = title.lower()
+    title = re.sub(r'\|.*$', '', title)
+    title = normalize_dimensions(title)
+    title = re.sub(r'[^a-z0-9\s\.x]', '', title)
+    title = re.sub(r'\s+', ' ', title)
+    return title.strip()
+
+
+def vocabulary_counts(texts):
+    """Word frequencies over store text (titles, descriptions, FAQs, blogs, logged examples)."""
+    counts = Counter()
+    for text in texts:
+        counts.update(word for word in _WORD_RE.findall(clean_title(text or "")) if len(word) > 1)
+    return counts
+
+
+def write_vocabulary(path, counts):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(counts.most_common()), f)
+    os.replace(tmp_path, path)
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (a transposition counts as one edit); limit + 1 once past limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            cost = 0 if char_a == char_b else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def deletes(word, distance):
+    """Every string reachable from the word's prefix by removing up to `distance` letters."""
+    results, frontier = set(), {word[:PREFIX_LENGTH]}
+    for _ in range(distance):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))} - results
+        results.update(frontier)
+    return results
+
+
+def is_inflection(word, candidate):
+    shorter, longer = sorted((word, candidate), key=len)
+    return any(longer == shorter + suffix for suffix in INFLECTION_SUFFIXES)
+
+
+class QueryCanonicalizer:
+    """SymSpell-style spelling correction against the store vocabulary, plus dimension normalization.
+
+    Every vocabulary word's prefix deletes are indexed up front, so a lookup only
+    generates the deletes of the typed word and checks a few candidates. Results
+    are memoized per word and per message.
+    """
+
+    def __init__(self, counts):
+        self.counts = {word: count for word, count in counts.items() if _WORD_RE.fullmatch(word)}
+        self.delete_index = {}
+        for word in self.counts:
+            prefix = word[:PREFIX_LENGTH]
+            for variant in deletes(prefix, MAX_EDIT_DISTANCE) | {prefix}:
+                self.delete_index.setdefault(variant, []).append(word)
+        self.correct_word = lru_cache(maxsize=CANONICAL_CACHE_SIZE)(self._correct_word)
+        self.canonicalize = lru_cache(maxsize=CANONICAL_CACHE_SIZE)(self._canonicalize)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _correct_word(self, word):
+        if word in self.counts or word in STOPWORDS or len(word) < MIN_CORRECTION_LENGTH or "'" in word:
+            return word
+        limit = MAX_EDIT_DISTANCE if len(word) >= LONG_WORD_LENGTH else SHORT_WORD_EDIT_DISTANCE
+        prefix = word[:PREFIX_LENGTH]
+        candidates = set()
+        for variant in deletes(prefix, limit) | {prefix}:
+            candidates.update(self.delete_index.get(variant, ()))
+
+        best, best_key = word, (limit + 1, 0)
+        for candidate in candidates:
+            # Confidence guards: typos rarely hit the first letter, inflections aren't typos,
+            # and a rare store word isn't worth rewriting what the customer typed
+            if candidate[0] != word[0] or self.counts[candidate] < MIN_CANDIDATE_COUNT or is_inflection(word, candidate):
+                continue
+            distance = edit_distance(word, candidate, limit)
+            key = (distance, -self.counts[candidate])  # Closest first, then most frequent
+            if distance <= limit and key < best_key:
+                best, best_key = candidate, key
+        return best
+
+    def _canonical_token(self, match):
+        token = match.group()
+        if _PROTECTED_TOKEN_RE.search(token):
+            return token
+        return _WORD_RE.sub(lambda word: self.correct_word(word.group()), token)
+
+    def _canonicalize(self, message):
+        message = normalize_dimensions(message)
+        return _TOKEN_RE.sub(self._canonical_token, message)
+
+
+def load_query_canonicalizer(path=QUERY_VOCABULARY_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return QueryCanonicalizer(json.load(f))
@@ -1,8 +1,32 @@
-import json
+import os
 import joblib
+from sentence_transformers import SentenceTransformer
 
-with open("collections_described.json", "r", encoding="utf-8") as f:
-    enriched_collections = json.load(f)
+from collection_search import build_collection_index, COLLECTION_INDEX_FILE, EMBEDDING_MODEL
+from compact_catalog import write_compact_catalog, CATALOG_FILE
+from json_stream import load_records
+from tenants import script_tenant
 
-joblib.dump(enriched_collections, "cached_collections.joblib")
+store = script_tenant()  # --store <id> or STORE_ID; files are read and written in its data_dir
+cache_file = store.path("cached_collections.joblib")
+catalog_file = store.path(CATALOG_FILE)
+index_file = store.path(COLLECTION_INDEX_FILE)
+
+enriched_collections = load_records(store.path("collections_described.jsonl"))
+
+# Pickled list kept for older tools; the server serves from the compact catalog below
+joblib.dump(enriched_collections, cache_file + ".tmp")
+os.replace(cache_file + ".tmp", cache_file)
 print(f"✅ Cache regenerated with {len(enriched_collections)} collections.")
+
+# Compact mmap-able catalog with pre-rendered card HTML, also written then renamed so the
+# artifact watcher never sees half a file
+write_compact_catalog(catalog_file, enriched_collections, store_url=store.store_url)
+print(f"✅ Compact catalog saved in {catalog_file}.")
+
+# Hybrid search index: embeddings are computed here, offline, never per request
+print("Calculating collection embeddings... 🚀")
+index = build_collection_index(enriched_collections, SentenceTransformer(EMBEDDING_MODEL))
+joblib.dump(index, index_file + ".tmp")
+os.replace(index_file + ".tmp", index_file)
+print(f"✅ Collection search index saved in {index_file} ({len(index)} collections).")
@@ -0,0 +1,203 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+
+from tenants import DEFAULT_TENANT_ID, current_tenant
+from tracing import Counter, Gauge
+
+# ⚙️ RESILIENCE SETTINGS
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "20"))  # Whole /chat budget
+DEPENDENCY_TIMEOUTS = {  # Upper bound per call; the remaining request budget can make it shorter
+    "openai": float(os.getenv("OPENAI_TIMEOUT_SECONDS", "15")),
+    "shopify": float(os.getenv("SHOPIFY_TIMEOUT_SECONDS", "8")),
+    "storefront": float(os.getenv("STOREFRONT_TIMEOUT_SECONDS", "10")),
+    "google_sheets": float(os.getenv("SHEETS_TIMEOUT_SECONDS", "10")),
+}
+SLOW_CALL_SECONDS = {  # Calls slower than this count as failures for the breaker
+    "openai": 10.0,
+    "shopify": 5.0,
+    "storefront": 5.0,
+    "google_sheets": 5.0,
+}
+TENANT_DEPENDENCIES = ("shopify", "storefront")  # One breaker per store: a store's outage must not cut off the others
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))  # Last N calls considered
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+OPENAI_MAX_RETRIES = 0  # Retries would spend the deadline; the breaker decides instead
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = Gauge("claybot_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ["dependency"])
+BREAKER_REJECTIONS = Counter("claybot_circuit_rejections_total", "Calls refused by an open breaker.", ["dependency"])
+BREAKER_FAILURES = Counter("claybot_circuit_failures_total", "Failed or slow calls seen by a breaker.", ["dependency"])
+DEADLINE_EXCEEDED = Counter("claybot_deadline_exceeded_total", "Calls skipped because the request budget ran out.", ["dependency"])
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+# --- DEADLINE BUDGET ---
+def start_deadline(seconds=REQUEST_DEADLINE_SECONDS):
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def remaining_budget():
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def timeout_for(dependency):
+    timeout = DEPENDENCY_TIMEOUTS[dependency]
+    remaining = remaining_budget()
+    if remaining is not None:
+        if remaining <= 0:
+            DEADLINE_EXCEEDED.inc(dependency=dependency)
+            raise DeadlineExceeded(f"No time left for {dependency}")
+        timeout = min(timeout, remaining)
+    return timeout
+
+
+# --- CIRCUIT BREAKERS ---
+class CircuitBreaker:
+    """Opens when too many recent calls failed or were slow, then lets one probe through
+    every open_seconds. While open, callers fail immediately and use their fallback."""
+
+    def __init__(self, name, failure_rate=BREAKER_FAILURE_RATE, window=BREAKER_WINDOW,
+                 min_calls=BREAKER_MIN_CALLS, open_seconds=BREAKER_OPEN_SECONDS, slow_call_seconds=None):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._results = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, dependency=name)
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            print(f"⚡ Circuit '{self.name}': {self._state} → {state}")
+        self._state = state
+        BREAKER_STATE.set(STATE_VALUES[state], dependency=self.name)
+
+    def before_call(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._set_state(HALF_OPEN)
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True  # Exactly one trial call
+                return
+        BREAKER_REJECTIONS.inc(dependency=self.name)
+        raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+    def record(self, success, elapsed=0.0):
+        if success and self.slow_call_seconds and elapsed > self.slow_call_seconds:
+            success = False
+        if not success:
+            BREAKER_FAILURES.inc(dependency=self.name)
+
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                if success:
+                    self._results.clear()
+                    self._set_state(CLOSED)
+                else:
+                    self._opened_at = time.monotonic()
+                    self._set_state(OPEN)
+                return
+
+            self._results.append(success)
+            failures = self._results.count(False)
+            if len(self._results) >= self.min_calls and failures / len(self._results) >= self.failure_rate:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def status(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "recent_calls": len(self._results),
+                "recent_failures": self._results.count(False),
+            }
+
+
+BREAKERS = {
+    dependency: CircuitBreaker(dependency, slow_call_seconds=SLOW_CALL_SECONDS.get(dependency))
+    for dependency in DEPENDENCY_TIMEOUTS
+}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(dependency):
+    """The dependency's breaker; Shopify and storefront ones are per store ("shopify:<store id>")."""
+    tenant_id = current_tenant().id
+    if dependency not in TENANT_DEPENDENCIES or tenant_id == DEFAULT_TENANT_ID:
+        return BREAKERS[dependency]
+    name = f"{dependency}:{tenant_id}"
+    with _breakers_lock:
+        breaker = BREAKERS.get(name)
+        if breaker is None:
+            breaker = BREAKERS[name] = CircuitBreaker(name, slow_call_seconds=SLOW_CALL_SECONDS.get(dependency))
+    return breaker
+
+
+@contextmanager
+def guarded(dependency):
+    """Deadline + breaker around one external call. Yields the timeout to pass to the client.
+
+    Raises DeadlineExceeded / CircuitOpenError before calling, so the caller's
+    existing except branch serves its fallback answer right away.
+    """
+    breaker = breaker_for(dependency)
+    timeout = timeout_for(dependency)
+    breaker.before_call()
+    start = time.monotonic()
+    try:
+        yield timeout
+    except Exception:
+        breaker.record(False)
+        raise
+    breaker.record(True, time.monotonic() - start)
+
+
+def guarded_get(dependency, url, **kwargs):
+    """requests.get with the dependency's timeout and breaker. 5xx and 429 count as failures."""
+    with guarded(dependency) as timeout:
+        response = requests.get(url, timeout=timeout, **kwargs)
+        if response.status_code >= 500 or response.status_code == 429:
+            raise requests.HTTPError(f"{dependency} returned {response.status_code}", response=response)
+    return response
+
+
+def breaker_status():
+    with _breakers_lock:
+        breakers = list(BREAKERS.items())
+    return {name: breaker.status() for name, breaker in breakers}
@@ -0,0 +1,88 @@
+import os
+import threading
+from cachetools import TTLCache
+
+from intent_router import tokenize
+
+# ⚙️ RESPONSE CACHE SETTINGS
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "900"))  # 0 disables the cache
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_WAIT_SECONDS = 30  # How long a duplicate request waits on the one already computing
+
+
+def normalize_message(message):
+    # "What is your return policy?" and "what is your return policy" share an entry
+    return " ".join(tokenize(message))
+
+
+def response_cache_key(message, intent, artifact_versions):
+    # Any artifact swap (model, FAQ index, catalog...) changes the key, so stale answers are never served
+    return (normalize_message(message), intent, tuple(sorted(artifact_versions.items())))
+
+
+class ResponseCache:
+    """TTL + LRU cache for answers that don't depend on the session.
+
+    Concurrent requests for the same key are coalesced: the first one computes,
+    the others wait for its result instead of repeating the scrape/LLM calls.
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL_SECONDS, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.enabled = ttl > 0
+        self._cache = TTLCache(maxsize=max_entries, ttl=max(ttl, 1))
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """Returns (value, hit). Values rejected by cacheable() are returned but not stored."""
+        if not self.enabled:
+            return compute(), False
+
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                value = self._cache[key]
+                self._cache[key] = value  # Re-insert: LRU order follows reads too
+                return value, True
+            done = self._in_flight.get(key)
+            leader = done is None
+            if leader:
+                done = self._in_flight[key] = threading.Event()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            done.wait(RESPONSE_CACHE_WAIT_SECONDS)
+            with self._lock:
+                if key in self._cache:
+                    return self._cache[key], True
+            # The first request failed or wasn't cacheable: compute on our own
+            return compute(), False
+
+        try:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                with self._lock:
+                    self._cache[key] = value
+            return value, False
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            done.set()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
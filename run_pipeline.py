@@ -4,22 +4,27 @@ import subprocess
 import hashlib
 import datetime
 
+from tenants import script_tenant, STORE_ID_ENV
+
 def hash_file(path):
     hasher = hashlib.md5()
     try:
         with open(path, "rb") as afile:
-            buf = afile.read()
-            hasher.update(buf)
+            for buf in iter(lambda: afile.read(1 << 20), b""):
+                hasher.update(buf)
         return hasher.hexdigest()
     except FileNotFoundError:
         return None
 
-HASH_PATH = "collections_described.hash"
+# --store <id> or STORE_ID: every script below builds that store (the model retraining is shared)
+store = script_tenant()
+os.environ[STORE_ID_ENV] = store.id
+HASH_PATH = store.path("collections_described.hash")
 
 def should_regenerate_cache():
-    current_hash = hash_file("collections_described.json")
+    current_hash = hash_file(store.path("collections_described.jsonl"))
     if not current_hash:
-        print("⚠️ Couldn't find collections_described.json.")
+        print("⚠️ Couldn't find collections_described.jsonl.")
         return False
 
     if not os.path.exists(HASH_PATH):
@@ -35,7 +40,7 @@ def should_regenerate_cache():
             f.write(current_hash)
         return True
 
-    print("💾 No changes to collections_described.json. Skipping cache regeneration.")
+    print("💾 No changes to collections_described.jsonl. Skipping cache regeneration.")
     return False
 
 log_file = f"pipeline_log_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
@@ -56,7 +61,8 @@ pipeline = [
     ("🧼 Duplicate Check", "check_duplicates.py"),
     ("📦 Export Collections + Products", "export_collections_and_products.py"),
     ("🧠 Generate Collection Descriptions", "generate_collection_descriptions.py"),
-    ("📰 Update Blog Articles", "build_articles.py")
+    ("📰 Update Blog Articles", "build_articles.py"),
+    ("🔎 Build Knowledge Index", "build_knowledge_index.py")
 ]
 
 results = []
@@ -66,7 +72,7 @@ for label, script in pipeline:
     result = run_script(label, script)
     results.append(result)
 
-# Regenerate cache only if collections_described.json changed
+# Regenerate cache only if collections_described.jsonl changed
 if should_regenerate_cache():
     result = run_script("💾 Regenerate Cache", "regenerate_cache.py")
     results.append(result)
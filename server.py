@@ -1,26 +1,54 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 import openai
-import requests
 import os
 import random
 import gspread
 import joblib
 import re
 import json
+import time
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import make_pipeline
 from difflib import SequenceMatcher
-from cachetools import TTLCache
-from page_scraper import find_best_shopify_pages, get_full_page_text, summarize_page_content
+from session_store import create_session_store
+from page_scraper import find_best_shopify_pages, get_full_page_text, summarize_page_content, PLACEHOLDER_SUMMARIES
 from smart_page_router import search_shopify_pages
 from utils import get_shopify_pages
-from faq_support.faq_search import get_best_faq_answer
+from faq_support.faq_search import get_best_faq_answer, load_faq_index, FAQ_PATH, EMBEDDINGS_PATH, model as embedding_model
+from collection_search import COLLECTION_INDEX_FILE, is_valid_collection_index
+from compact_catalog import CATALOG_FILE, load_compact_catalog, write_compact_catalog
+from collection_cards import render_card, render_carousel
+from compression import compress_response
+from knowledge_index import KNOWLEDGE_INDEX_FILE, is_valid_knowledge_index, format_context
+from query_canonicalizer import QUERY_VOCABULARY_FILE, load_query_canonicalizer, normalize_dimensions
+from artifacts import ArtifactManager, file_md5
+from intent_router import IntentRouter, load_intent_router, is_irrelevant_question, TRAINING_FILE
+from response_cache import ResponseCache, response_cache_key
+from tenants import (
+    TenantRegistry, TenantState, TenantArtifacts, current_tenant, use_tenant, reset_tenant,
+    TENANT_HEADER, TENANT_KEY_HEADER, DEFAULT_TENANT_ID,
+)
+from profiler import SamplingProfiler, PROFILE_MAX_INTERVAL_MS
+from admission import (
+    AdmissionController, RateLimiter, REJECTED, SESSION_RATE_PER_MINUTE, SESSION_BURST, IP_RATE_PER_MINUTE, IP_BURST,
+    TRUSTED_PROXY_COUNT
+)
+from resilience import guarded, guarded_get, start_deadline, reset_deadline, breaker_status, OPENAI_MAX_RETRIES
+from tracing import (
+    span, count_external, count_cache, record_llm_usage, start_request, finish_request,
+    server_timing_header, render_prometheus, REQUEST_SECONDS
+)
+import hmac
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 app = Flask(__name__)
+if TRUSTED_PROXY_COUNT:
+    # remote_addr becomes the hop our own proxies saw; anything a client adds to X-Forwarded-For is ignored
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
 CORS(app)
 
 @app.route("/")
@@ -28,29 +56,35 @@ def home():
     return "Hello! The server is running correctly."
 
 api_key = os.getenv("OPENAI_API_KEY")
-shopify_access_token = os.getenv("SHOPIFY_API_KEY")
-shopify_store_url = os.getenv("SHOPIFY_STORE_URL")
-headers = {"X-Shopify-Access-Token": shopify_access_token}
+admin_token = os.getenv("ADMIN_TOKEN")  # Admin endpoints are disabled when unset
 
-client = openai.OpenAI(api_key=api_key)
+client = openai.OpenAI(api_key=api_key, max_retries=OPENAI_MAX_RETRIES)
 
-COLLECTIONS_CACHE_FILE = "cached_collections.joblib"
+COLLECTIONS_CACHE_FILE = "cached_collections.joblib"  # Pre-catalog format, only read to build catalog.compact
+ARTICLES_FILE = "articles.json"
+STORE_FAQ_FILES = (os.path.basename(FAQ_PATH), os.path.basename(EMBEDDINGS_PATH))  # In each store's data_dir
 
 def get_cached_collections(force_refresh=False):
     if not force_refresh:
-        try:
-            return joblib.load(COLLECTIONS_CACHE_FILE)
-        except:
-            pass
+        collections = artifacts.get("collections")
+        if collections:
+            return collections
 
     print("💾 Cache not found or forced. Loading collections from Shopify...")
+    store = current_tenant()
     collections = []
     endpoints = ["custom_collections", "smart_collections"]
 
     for endpoint in endpoints:
-        url = f"{shopify_store_url}/admin/api/2024-01/{endpoint}.json?limit=250"
+        url = f"{store.store_url}/admin/api/2024-01/{endpoint}.json?limit=250"
         while url:
-            response = requests.get(url, headers=headers)
+            count_external("shopify")
+            try:
+                with span("shopify_collections"):
+                    response = guarded_get("shopify", url, headers=store.admin_headers)
+            except Exception as e:
+                print(f"❌ Error fetching {endpoint}: {e}")
+                break
             if response.status_code == 200:
                 data = response.json().get(endpoint, [])
                 collections.extend(data)
@@ -67,8 +101,9 @@ def get_cached_collections(force_refresh=False):
                 break
 
     print(f"✅ Total collections fetched: {len(collections)}")
-    joblib.dump(collections, COLLECTIONS_CACHE_FILE)
-    return collections
+    write_compact_catalog(store.path(CATALOG_FILE), collections, store_url=store.store_url)
+    artifacts.refresh(["collections"])
+    return artifacts.get("collections") or collections
 
 
 def should_refresh_collections():
@@ -89,38 +124,138 @@ def should_refresh_collections():
         print(f"❌ Error checking cache age: {e}")
         return True
 
-# Memory per session (1 hour)
-session_memory = TTLCache(maxsize=1000, ttl=3600)  # 1000 sessions, expire in one hour
+# Memory per session (1 hour). SESSION_BACKEND=sqlite/redis shares it across workers
+sessions = create_session_store()
 
 
 # 🔤 Training dataset for intent classification
 MODEL_FILE = "intent_model.joblib"
+MODEL_META_FILE = "intent_model.meta.json"
 
-try:
-    intent_model = joblib.load(MODEL_FILE)
-    print("✅ Intent model loaded successfully.")
-except Exception as e:
-    print(f"❌ The trained model could not be loaded: {e}")
-    # Fallback to simple empty model
-    from sklearn.pipeline import make_pipeline
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.naive_bayes import MultinomialNB
-    intent_model = make_pipeline(TfidfVectorizer(), MultinomialNB())
-
-
-try:
-    with open("articles.json", "r") as f:
-        blog_articles = json.load(f)
-    print(f"✅ Blog articles loaded: {len(blog_articles)}")
-except Exception as e:
-    print(f"❌ Error loading articles.json: {e}")
-    blog_articles = []
+def get_intent_model_version(path):
+    # weekly_learning.py writes the version next to the model
+    try:
+        with open(MODEL_META_FILE, "r") as f:
+            return json.load(f)["version"]
+    except Exception:
+        return file_md5(path)
+
+def is_valid_intent_model(model):
+    return hasattr(model, "predict") and len(model.predict(["hello"])) == 1
+
+def load_json_file(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+# 📦 Generated artifacts, hot-reloaded by a background watcher (no restart needed).
+# The intent model is shared by every store; the rest is loaded per store (see load_store).
+shared_artifacts = ArtifactManager()
+shared_artifacts.register(
+    "intent_model", MODEL_FILE, joblib.load,
+    validator=is_valid_intent_model,
+    version=get_intent_model_version,
+    default=make_pipeline(TfidfVectorizer(), MultinomialNB())  # Fallback to simple empty model
+)
+shared_artifacts.register(
+    "intent_router", TRAINING_FILE, load_intent_router,
+    default=IntentRouter([])
+)
+shared_artifacts.refresh()
+shared_artifacts.start()
+
+# ⚡ Whole-response cache for answers that don't depend on the session (pages, FAQs, fallback).
+# Collections and blogs never go through it: they page through shown_* sets in the session.
+# This one is the default store's; every other store gets its own, dropped with its artifacts.
+response_cache = ResponseCache()
+
+def load_store(tenant):
+    """A store's catalog, indexes, articles and FAQ, read from its data_dir (stores/<id>/ by default)."""
+    store_artifacts = ArtifactManager()
+    catalog_file = tenant.path(CATALOG_FILE)
+    # Workers mmap the same read-only catalog file (see compact_catalog.py) instead of unpickling a private copy
+    if not os.path.exists(catalog_file) and os.path.exists(tenant.path(COLLECTIONS_CACHE_FILE)):
+        print(f"🗂️ Building {catalog_file} from {tenant.path(COLLECTIONS_CACHE_FILE)}...")
+        write_compact_catalog(catalog_file, joblib.load(tenant.path(COLLECTIONS_CACHE_FILE)), store_url=tenant.store_url)
+    store_artifacts.register(
+        "collections", catalog_file, lambda path: load_compact_catalog(path, store_url=tenant.store_url),
+        validator=lambda catalog: len(catalog) > 0
+    )
+    store_artifacts.register(
+        "collection_index", tenant.path(COLLECTION_INDEX_FILE), joblib.load,  # Built by regenerate_cache.py
+        validator=is_valid_collection_index
+    )
+    store_artifacts.register(
+        "knowledge_index", tenant.path(KNOWLEDGE_INDEX_FILE), joblib.load,  # Built by build_knowledge_index.py
+        validator=is_valid_knowledge_index
+    )
+    store_artifacts.register(
+        "query_canonicalizer", tenant.path(QUERY_VOCABULARY_FILE), load_query_canonicalizer,  # Built by build_knowledge_index.py
+        validator=lambda canonicalizer: len(canonicalizer) > 0
+    )
+    store_artifacts.register(
+        "articles", tenant.path(ARTICLES_FILE), load_json_file,
+        validator=lambda a: isinstance(a, list) and all("url" in art for art in a),
+        default=[]
+    )
+    # The default store keeps the FAQ where faq_support/ writes it; other stores keep theirs in data_dir
+    faq_paths = (FAQ_PATH, EMBEDDINGS_PATH) if tenant.id == DEFAULT_TENANT_ID else tuple(map(tenant.path, STORE_FAQ_FILES))
+    store_artifacts.register(
+        "faq", faq_paths, load_faq_index,
+        validator=lambda index: len(index["faqs"]) > 0
+    )
+    store_artifacts.refresh()
+    store_artifacts.start()
+    cache = response_cache if tenant.id == DEFAULT_TENANT_ID else ResponseCache()
+    return TenantState(tenant, store_artifacts, cache)
+
+# 🏬 Stores from tenants.json, loaded on their first request and unloaded past TENANT_MEMORY_BUDGET_MB.
+# `artifacts` reads the shared ones or the current request's store, so callers don't need to know which.
+tenant_registry = TenantRegistry(load_store)
+artifacts = TenantArtifacts(shared_artifacts, tenant_registry)
+artifacts.state()  # The default store is loaded at startup, as before
+
+# 🔤 Typos and dimension spellings fixed once, before intents, indexes and caches see the message
+def canonicalize_query(message):
+    canonicalizer = artifacts.get("query_canonicalizer")
+    with span("canonicalize_query"):
+        canonical = canonicalizer.canonicalize(message) if canonicalizer else normalize_dimensions(message)
+    if canonical != message:
+        print(f"🔤 Canonical query: {canonical}")
+    return canonical
 
 # 🔍 Función para detectar intención
 def classify_intent(message):
-    if is_irrelevant_question(message):
-        return "not_supported"
-    return intent_model.predict([message])[0]
+    # Keyword/rule fast path first; the sklearn model only sees what the rules can't settle
+    with span("classify_intent"):
+        model = artifacts.get("intent_model")
+        prediction = artifacts.get("intent_router").route(
+            message,
+            model,
+            calibration=getattr(model, "calibration_", None)  # Saved in the model file by weekly_learning.py
+        )
+    print(f"🧭 Intent routed by {prediction['source']} (confidence {prediction['confidence']:.2f}, top2: {prediction['top2']})")
+    return prediction
+
+# Short descriptions used when asking the customer to clarify
+INTENT_DESCRIPTIONS = {
+    "search_collection": "browsing our tile collections",
+    "search_blog": "reading our blog articles",
+    "faqs": "a question about orders, shipping, samples or installation",
+    "contact": "getting in touch with our team",
+    "studio": "visiting our studio or booking a design consultation",
+    "book": "booking a design consultation",
+    "search_pages": "information about Clay Imports",
+    "returns_info": "our return and cancellation policy",
+    "shipping": "our shipping policy",
+    "trade": "our trade program",
+    "our_story": "our story",
+}
+
+def build_clarification(top2):
+    options = [INTENT_DESCRIPTIONS[intent] for intent, _ in top2 if intent in INTENT_DESCRIPTIONS]
+    if not options:
+        return "Could you tell me a bit more about what you're looking for? 😊"
+    return f"Just to make sure I help with the right thing 😊 — are you asking about {' or '.join(options)}?"
 
 def is_close_match(title, message, threshold=0.85):
     return SequenceMatcher(None, title.lower(), message.lower()).ratio() > threshold
@@ -130,41 +265,59 @@ def log_user_interaction(user_message, bot_response, intent=""):
         # Authentication with Google Sheets
         scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
         creds = ServiceAccountCredentials.from_json_keyfile_name("google_credentials.json", scope)
-        client = gspread.authorize(creds)
+        count_external("google_sheets")
+        with span("sheets_log"), guarded("google_sheets") as timeout:
+            client = gspread.authorize(creds)
+            client.set_timeout(timeout)
 
-        # Access to the page
-        sheet = client.open("Chatbot logs").sheet1  # Usamos la primer hoja
+            # Access to the page
+            sheet = client.open("Chatbot logs").sheet1  # Usamos la primer hoja
 
-        # Add conversation as a new row
-        sheet.append_row([
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            user_message,
-            intent,
-            bot_response
-        ])
+            # Add conversation as a new row
+            sheet.append_row([
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                user_message,
+                intent,
+                bot_response
+            ])
 
         print("✅ Conversation recorded in Google Sheets.")
     except Exception as e:
         print(f"❌ Error saving in Google Sheets: {e}")
 
 def get_shop_info():
-    url = f"{shopify_store_url}/admin/api/2024-01/shop.json"
-    headers = {"X-Shopify-Access-Token": shopify_access_token}
-    response = requests.get(url, headers=headers)
+    store = current_tenant()
+    url = f"{store.store_url}/admin/api/2024-01/shop.json"
+    count_external("shopify")
+    try:
+        with span("shopify_shop_info"):
+            response = guarded_get("shopify", url, headers=store.admin_headers)
+    except Exception as e:
+        print(f"⚠️ Could not fetch shop info: {e}")
+        return {}
     return response.json().get("shop", {}) if response.status_code == 200 else {}
 
 
 def get_shopify_blogs():
-    url = f"{shopify_store_url}/admin/api/2024-01/blogs.json"
-    headers = {"X-Shopify-Access-Token": shopify_access_token}
-    response = requests.get(url, headers=headers)
+    store = current_tenant()
+    url = f"{store.store_url}/admin/api/2024-01/blogs.json"
+    headers = store.admin_headers
+    try:
+        response = guarded_get("shopify", url, headers=headers)
+    except Exception as e:
+        print(f"⚠️ Could not fetch blogs: {e}")
+        return []
     if response.status_code != 200:
         return []
     blogs = response.json().get("blogs", [])
     all_articles = []
     for blog in blogs:
-        articles_url = f"{shopify_store_url}/admin/api/2024-01/blogs/{blog['id']}/articles.json"
-        articles_response = requests.get(articles_url, headers=headers)
+        articles_url = f"{store.store_url}/admin/api/2024-01/blogs/{blog['id']}/articles.json"
+        try:
+            articles_response = guarded_get("shopify", articles_url, headers=headers)
+        except Exception as e:
+            print(f"⚠️ Could not fetch articles for blog {blog['handle']}: {e}")
+            continue
         if articles_response.status_code == 200:
             articles = articles_response.json().get("articles", [])
             for article in articles:
@@ -188,27 +341,21 @@ def get_blog_pages():
 
     return blog_pages
 
-def search_shopify_blogs(user_message, session_id="default", user_message_count=0):
-    try:
-        with open("articles.json", "r") as f:
-            blogs = json.load(f)
-            print(f"✅ Blog articles loaded: {len(blogs)}")
-    except Exception as e:
-        print(f"❌ Error loading articles.json: {e}")
-        return "Sorry, no blog articles available right now."
-
+def rank_blogs(user_message, blogs, shown_handles):
     query = normalize(user_message)
-    shown_handles = session_memory.get(session_id, {}).get("shown_blogs", set())
+    keywords = query.split()
     scored_blogs = []
 
     for b in blogs:
+        if b["url"] in shown_handles:
+            continue
+
         title = normalize(b.get("title", ""))
         body = normalize(b.get("content", ""))
         content = f"{title} {body}"
 
         # Custom scoring
         match_score = 0
-        keywords = query.split()
         strong_match_found = False
 
         for word in keywords:
@@ -225,28 +372,41 @@ def search_shopify_blogs(user_message, session_id="default", user_message_count=
             match_score += 5
 
         similarity = SequenceMatcher(None, query, content).ratio()
+        title_match = any(word in title for word in keywords)
+        scored_blogs.append((b, match_score, similarity, title_match))
 
-        if b["url"] in shown_handles:
-            continue
+    # Articles with a keyword in the title first; everything else only if none match
+    filtered_blogs = [item for item in scored_blogs if item[3]]
+    blogs_to_show = filtered_blogs if filtered_blogs else scored_blogs
+    return [item[0] for item in sorted(blogs_to_show, key=lambda x: (-x[1], -x[2]))]
+
+def render_blog_results(intro_text, top_blogs):
+    response_text = f"{intro_text}<br><br>"
+    for b in top_blogs:
+        title = b["title"]
+        text = b.get("content", "")
+        summary = summarize_page_content(text, title=title)
+        blog_url = b.get("url")
 
-        b["match_score"] = match_score
-        b["similarity"] = similarity
-        scored_blogs.append(b)
+        response_text += f"📰 <b>{title}</b><br>{summary}<br>"
+        response_text += f"<a href='{blog_url}' target='_blank' style='color: #007bff; text-decoration: underline;'>View article</a><br><br>"
 
-    if not scored_blogs:
-        return "No matching blog articles found at the moment."
+    return response_text
 
-    filtered_blogs = [
-        b for b in scored_blogs
-        if any(word in normalize(b.get("title", "")) for word in keywords)
-    ]
+def search_shopify_blogs(user_message, session=None, user_message_count=0, customer_message=None):
+    blogs = artifacts.get("articles")
+    if not blogs:
+        print("❌ No blog articles loaded from articles.json")
+        return "Sorry, no blog articles available right now."
 
-    blogs_to_show = filtered_blogs if filtered_blogs else scored_blogs
-    top_blogs = sorted(blogs_to_show, key=lambda x: (-x["match_score"], -x["similarity"]))[:3]
+    session = session if session is not None else {}
+    ranked = rank_blogs(user_message, blogs, session.get("shown_blogs", set()))
+    if not ranked:
+        return "No matching blog articles found at the moment."
 
-    session_data = session_memory.setdefault(session_id, {})
-    shown_blogs = session_data.setdefault("shown_blogs", set())
-    shown_blogs.update(b["url"] for b in top_blogs)
+    top_blogs = ranked[:RESULTS_PER_PAGE]
+    save_result_cursor(session, "blog_cursor", user_message, [b["url"] for b in ranked])
+    session.setdefault("shown_blogs", set()).update(b["url"] for b in top_blogs)
 
     # Intro with OpenAI
     try:
@@ -254,33 +414,25 @@ def search_shopify_blogs(user_message, session_id="default", user_message_count=
         prompt = (
             "You are a helpful assistant. Generate a very short, friendly introduction to a list of blog articles.\n"
             "The customer asked:\n"
-            f"{user_message}\n\n"
+            f"{customer_message or user_message}\n\n"
             "Your response must sound natural and be no more than 20 words total. Do not mention blog titles or products."
         )
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "system", "content": prompt}],
-            max_tokens=50,
-            temperature=0.7
-        )
+        count_external("openai")
+        with span("openai_blog_intro"), guarded("openai") as timeout:
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "system", "content": prompt}],
+                max_tokens=50,
+                temperature=0.7,
+                timeout=timeout
+            )
+        record_llm_usage(response, "gpt-4o-mini")
         intro_text = response.choices[0].message.content.strip()
     except Exception as e:
         print(f"⚠️ OpenAI intro failed: {e}")
         intro_text = "Here are some blog articles you might find helpful:"
 
-   # Build final response
-    response_text = f"{intro_text}<br><br>"
-    for b in top_blogs:
-        title = b["title"]
-        text = b.get("content", "")
-        summary = summarize_page_content(text, title=title)
-        blog_url = b.get("url")
-
-        response_text += f"📰 <b>{title}</b><br>{summary}<br>"
-        response_text += f"<a href='{blog_url}' target='_blank' style='color: #007bff; text-decoration: underline;'>View article</a><br><br>"
-
-
-    return response_text
+    return render_blog_results(intro_text, top_blogs)
 
 def normalize(text):
     if not isinstance(text, str):
@@ -290,22 +442,28 @@ def normalize(text):
     return text
 
 
-def clean_title(title): # regex
-    title = title.lower()
-    title = re.sub(r'\|.*$', '', title)
-    title = re.sub(r'(\d+)\s*["’]?\s*[x×]\s*(\d+)', r'\1x\2', title)
-    title = re.sub(r'[^a-z0-9\s\.x]', '', title)
-    title = re.sub(r'\s+', ' ', title)
-    return title.strip()
+def rank_collections(user_message, collections, shown_handles):
+    # Hybrid BM25 + embedding search when the offline index exists, keyword scoring otherwise
+    index = artifacts.get("collection_index")
+    if index is None:
+        return rank_collections_by_keywords(user_message, collections, shown_handles)
 
+    try:
+        with span("collection_query_embedding"):
+            query_embedding = embedding_model.encode(user_message, normalize_embeddings=True)
+    except Exception as e:
+        print(f"⚠️ Query embedding failed, using BM25 only: {e}")
+        query_embedding = None
+
+    with span("collection_search"):
+        handles = index.search(user_message, query_embedding, exclude=shown_handles)
+    by_handle = lookup_by_id(collections, "handle")
+    ranked = [by_handle[h] for h in handles if h in by_handle]
+    return ranked or rank_collections_by_keywords(user_message, collections, shown_handles)
 
-def get_collection_recommendations(user_message, session_id="default", user_message_count=0):
-    collections = get_cached_collections()
-    if not collections:
-        return "Sorry, no collections available."
 
+def rank_collections_by_keywords(user_message, collections, shown_handles):
     user_keywords = normalize(user_message).split()
-    shown_handles = session_memory.get(session_id, {}).get("shown_collections", set())
     scored_collections = []
 
     for coll in collections:
@@ -347,59 +505,111 @@ def get_collection_recommendations(user_message, session_id="default", user_mess
             "similarity": similarity
         })
 
-    top_collections = sorted(scored_collections, key=lambda x: (-x["score"], -x["similarity"]))[:3]
+    ranked = sorted(scored_collections, key=lambda x: (-x["score"], -x["similarity"]))
+    return [item["collection"] for item in ranked]
+
+def render_collection_cards(intro_text, top_collections):
+    # Cards come pre-rendered from the catalog; older catalogs render them here
+    fragments = [coll.get("card_html") or render_card(coll, current_tenant().store_url) for coll in top_collections]
+    return render_carousel(intro_text, fragments)
+
+def get_collection_recommendations(user_message, session=None, user_message_count=0, customer_message=None):
+    collections = get_cached_collections()
+    if not collections:
+        return "Sorry, no collections available."
+
+    session = session if session is not None else {}
+    ranked = rank_collections(user_message, collections, session.get("shown_collections", set()))
+    top_collections = ranked[:RESULTS_PER_PAGE]
 
     if not top_collections:
         return "We couldn't find any matching collections. 😢"
 
-    session_data = session_memory.setdefault(session_id, {})
-    shown_collections = session_data.setdefault("shown_collections", set())
-    shown_collections.update(c["collection"]["handle"] for c in top_collections)
-
+    save_result_cursor(session, "collection_cursor", user_message, [c["handle"] for c in ranked])
+    shown_collections = session.setdefault("shown_collections", set())
+    shown_collections.update(c["handle"] for c in top_collections)
     # OpenAI intro
     try:
         prompt = (
             "You are a friendly tile store assistant. Based on the customer's message, "
             "generate a short intro (under 20 words) presenting tile collections "
             "without listing collection names. Mention style, color or usage if possible.\n\n"
-            f"Customer message:\n{user_message}"
-        )
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "system", "content": prompt}],
-            max_tokens=50,
-            temperature=0.7
+            f"Customer message:\n{customer_message or user_message}"
         )
+        count_external("openai")
+        with span("openai_collection_intro"), guarded("openai") as timeout:
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "system", "content": prompt}],
+                max_tokens=50,
+                temperature=0.7,
+                timeout=timeout
+            )
+        record_llm_usage(response, "gpt-4o-mini")
         intro_text = response.choices[0].message.content.strip()
     except Exception as e:
         print(f"⚠️ OpenAI intro failed: {e}")
         intro_text = "Here are some collections you might love!"
 
-    # Build visual response
-    response_text = f"{intro_text}<br><div class='product-carousel' style='display: flex; gap: 20px; overflow-x: auto; scroll-snap-type: x mandatory; padding: 10px 0;'>"
-
-    for item in top_collections:
-        coll = item["collection"]
-        title = coll.get("title", "Untitled Collection")
-        handle = coll.get("handle", "#")
-        raw_body = coll.get("body_html", "") or ""
-        description = re.sub('<[^<]+?>', '', raw_body)  # Limpia etiquetas HTML
-        description = description.strip()[:100] + "..." if description else "Explore this collection."
-        image_url = coll.get("image", {}).get("src", "") or "https://via.placeholder.com/240x240.png?text=No+Image"
-        collection_url = f"{shopify_store_url}/collections/{handle}"
-
-        response_text += f"""
-        <div class="product-card" style="flex: 0 0 240px; scroll-snap-align: start; border: 1px solid #ccc; border-radius: 12px; padding: 12px; text-align: center; background: #fff;">
-            <img src="{image_url}" alt="{title}" style="max-width: 100%; height: auto; border-radius: 8px; margin-bottom: 10px;" />
-            <h4 style="margin: 10px 0 4px; font-size: 1rem; color: #222;">{title}</h4>
-            <p style="font-size: 0.85rem; color: #555; height: 48px; overflow: hidden;">{description}</p>
-            <a href="{collection_url}" target="_blank" style="display: inline-block; margin-top: 10px; padding: 6px 12px; background-color: #007bff; color: #fff; border-radius: 6px; text-decoration: none; font-weight: bold;">View Collection</a>
-        </div>
-        """
-
-    response_text += "</div>"
-
-    return response_text
+    return render_collection_cards(intro_text, top_collections)
+
+# 📑 Ranked result cursors: "show me more" pages through the stored ranking, no rescoring
+RESULTS_PER_PAGE = 3
+CURSOR_MAX_RESULTS = 30  # Keeps the session small
+MORE_REQUEST_PATTERN = re.compile(
+    r"^(?:(?:can you |could you )?(?:show|give|send)(?: me)? |any |i want |i'd like )?"
+    r"(?:some |a few |the )?(?:more|next|other|others|another|else)"
+    r"(?: ones?| options?| results?| collections?| articles?| blogs?| posts?| please| pls)*[\s.!?]*$"
+)
+
+def is_more_request(user_message):
+    return MORE_REQUEST_PATTERN.match(user_message) is not None
+
+def save_result_cursor(session, key, query, ids):
+    session[key] = {"query": query, "ids": ids[:CURSOR_MAX_RESULTS], "offset": RESULTS_PER_PAGE}
+
+def clear_result_cursors(session):
+    # A "more" after an answer that isn't a list must not page an older search
+    for key in ("last_intent", "collection_cursor", "blog_cursor"):
+        session.pop(key, None)
+
+def next_cursor_page(session, key):
+    cursor = session.get(key)
+    if not cursor:
+        return None, []
+    page = cursor["ids"][cursor["offset"]:cursor["offset"] + RESULTS_PER_PAGE]
+    cursor["offset"] += len(page)
+    return cursor, page
+
+_lookup_indexes = {}
+
+def lookup_by_id(items, key):
+    # {id: item} built once per loaded artifact version, so paging is O(1) per result
+    cached = _lookup_indexes.get(key)
+    if cached is None or cached[0] is not items:
+        cached = (items, {item.get(key): item for item in items})
+        _lookup_indexes[key] = cached
+    return cached[1]
+
+def show_more_results(session):
+    if session.get("last_intent") == "search_collection":
+        cursor, page = next_cursor_page(session, "collection_cursor")
+        by_handle = lookup_by_id(get_cached_collections(), "handle")
+        collections = [by_handle[h] for h in page if h in by_handle]
+        if not collections:
+            query = cursor["query"] if cursor else "that"
+            return f"That's all I found for “{query}”. Try another style, color or space! 😊"
+        session.setdefault("shown_collections", set()).update(page)
+        return render_collection_cards("Here are a few more collections you might love!", collections)
+
+    cursor, page = next_cursor_page(session, "blog_cursor")
+    by_url = lookup_by_id(artifacts.get("articles"), "url")
+    blogs = [by_url[url] for url in page if url in by_url]
+    if not blogs:
+        query = cursor["query"] if cursor else "that"
+        return f"That's all the articles I found for “{query}”. Ask me about another topic! 😊"
+    session.setdefault("shown_blogs", set()).update(page)
+    return render_blog_results("Here are a few more articles you might enjoy:", blogs)
 
 def detect_context(user_message):
     """Detects if the user asks about a specific space (kitchen, bathroom, restaurant, etc.)."""
@@ -415,104 +625,377 @@ def detect_context(user_message):
         return "restaurant"
     return None
 
-def is_irrelevant_question(query):
-    irrelevant_keywords = [
-        "capital", "president", "weather", "history", "who is", "define", "translate",
-        "joke", "fun fact", "news", "sports", "movie", "music", "random fact", "science",
-        "adopt", "dragon", "dog", "pet", "spaceship", "crypto", "rent", "flight", "food", "pizza"
-    ]
-    return any(word in query for word in irrelevant_keywords)
-
 def ask_openai(question, context=""):
     try:
         if is_irrelevant_question(question):
             return "I'm here to help you with information about our store! 😊 Ask me about our collections, policies, blogs, or anything related to our store."
         
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant for an online store. Answer questions in a simple and friendly way, like you are talking to a customer who may not be familiar with technical terms. Do not use Markdown in your responses, only HTML."},
-                {"role": "user", "content": f"{context}\n\n{question}"}
-            ],
-            max_tokens=200,
-            temperature=0.5
-        )
+        count_external("openai")
+        with span("openai_chat"), guarded("openai") as timeout:
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant for an online store. Answer questions in a simple and friendly way, like you are talking to a customer who may not be familiar with technical terms. Do not use Markdown in your responses, only HTML."},
+                    {"role": "user", "content": f"{context}\n\n{question}"}
+                ],
+                max_tokens=200,
+                temperature=0.5,
+                timeout=timeout
+            )
+        record_llm_usage(response, "gpt-4o-mini")
         return response.choices[0].message.content.strip()
     except Exception as e:
         print(f"Error with OpenAI: {e}")
         return "I'm here to help! Let me know what you need assistance with. 😊"
 
 
+# Degraded answers (timeouts, empty Shopify responses...) must not be served for the whole TTL
+UNCACHEABLE_ANSWERS = (
+    "I'm here to help! Let me know what you need assistance with.",
+    "Sorry, I couldn't find a relevant answer.",
+    "Sorry, I couldn’t find any relevant page for your question.",
+    *PLACEHOLDER_SUMMARIES,
+)
+
+def is_cacheable_answer(answer):
+    return bool(answer) and not any(marker in answer for marker in UNCACHEABLE_ANSWERS)
+
+def cached_response(user_message, intent, compute, cacheable=is_cacheable_answer):
+    response, hit = artifacts.state().response_cache.get_or_compute(
+        response_cache_key(user_message, intent, artifacts.versions()),
+        compute,
+        cacheable=cacheable
+    )
+    count_cache("response", hit)
+    if hit:
+        print(f"⚡ Response cache hit for intent {intent}")
+    return response
+
+def knowledge_context(user_message):
+    # Top chunks from pages, blogs, FAQs and collections, so the fallback answer is grounded
+    index = artifacts.get("knowledge_index")
+    if index is None:
+        return ""
+    try:
+        with span("knowledge_search"):
+            query_embedding = embedding_model.encode(user_message, normalize_embeddings=True)
+            hits = index.search(query_embedding)
+    except Exception as e:
+        print(f"⚠️ Knowledge search failed: {e}")
+        return ""
+    print(f"🔎 Knowledge chunks: {[(chunk['source'], chunk['title'], round(score, 2)) for chunk, score in hits]}")
+    return format_context(hits)
+
+def answer_with_openai(user_message, customer_message=None):
+    # Knowledge search uses the canonical query; the model and the log get the message as typed
+    customer_message = customer_message or user_message
+    shop_info = get_shop_info()
+    shop_context = f"Store name: {shop_info.get('name', 'Unknown')}, Currency: {shop_info.get('currency', 'N/A')}"
+    knowledge = knowledge_context(user_message)
+    if knowledge:
+        shop_context += f"\n\n{knowledge}"
+    response_text = ask_openai(customer_message, context=shop_context)
+    log_unanswered_question(customer_message, response_text)  # Once per distinct question, not on every cache hit
+    return response_text
+
+
 def log_unanswered_question(user_message, bot_response):
     try:
         scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
         creds = ServiceAccountCredentials.from_json_keyfile_name("google_credentials.json", scope)
-        client = gspread.authorize(creds)
+        count_external("google_sheets")
+        with span("sheets_log_unanswered"), guarded("google_sheets") as timeout:
+            client = gspread.authorize(creds)
+            client.set_timeout(timeout)
 
-        # Second tab (sheet2)
-        sheet = client.open("Chatbot logs").get_worksheet(1)
+            # Second tab (sheet2)
+            sheet = client.open("Chatbot logs").get_worksheet(1)
 
-        # New row with timestamp, question and generated answer
-        sheet.append_row([
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            user_message,
-            "unknown",  # Failed intent detected
-            bot_response
-        ])
+            # New row with timestamp, question and generated answer
+            sheet.append_row([
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                user_message,
+                "unknown",  # Failed intent detected
+                bot_response
+            ])
 
         print("📄 Question without intention registered into Google Chatbot Sheet 2.")
     except Exception as e:
         print(f"❌ Error saving queestion without intention: {e}")
 
 
+# 🔥 Opt-in sampling profiler (PROFILE_SAMPLE_PERCENT or /admin/profiling). Off by default.
+profiler = SamplingProfiler()
+
+# 📈 Tracing: every request collects its spans; /chat latency is recorded per intent.
+# Send "X-Debug-Timing: 1" to get the stage breakdown back in a Server-Timing header.
+@app.before_request
+def start_tracing():
+    g.trace_token = start_request()
+    g.trace_started = time.perf_counter()
+    if request.path == "/chat":
+        # Every external call in this request takes its timeout from what's left of this budget
+        g.deadline_token = start_deadline()
+    if request.path == "/chat" and profiler.should_profile():
+        g.profiled = True
+        profiler.begin()
+
+
+# 🗜️ Registered before finish_tracing so it runs after it: Flask calls after_request hooks in
+# reverse order, and finish_tracing still reads the uncompressed JSON body
+@app.after_request
+def compress(response):
+    return compress_response(response, request.headers.get("Accept-Encoding", ""))
+
+
+@app.after_request
+def finish_tracing(response):
+    token = g.pop("trace_token", None)
+    if token is None:
+        return response
+    elapsed = time.perf_counter() - g.pop("trace_started")
+    spans = finish_request(token)
+    if "deadline_token" in g:
+        reset_deadline(g.pop("deadline_token"))
+
+    if request.path == "/chat":
+        body = response.get_json(silent=True) or {}
+        intent = body.get("intent", "error" if response.status_code >= 400 else "unknown")
+        REQUEST_SECONDS.observe(elapsed, intent=intent)
+        g.profile_intent = intent
+    if request.headers.get("X-Debug-Timing") == "1":
+        response.headers["Server-Timing"] = server_timing_header(spans, elapsed)
+    return response
+
+
+# In teardown, so the samples are released even when the request raised before after_request
+@app.teardown_request
+def finish_profiling(exc=None):
+    if g.pop("profiled", False):
+        profiler.end(g.pop("profile_intent", "error"))
+
+
+# 🚦 Admission control: bounded /chat concurrency, a short wait queue and per-session/IP rate limits.
+# Runs after start_tracing, so time spent queued counts against the request deadline.
+admission = AdmissionController()
+session_limiter = RateLimiter(SESSION_RATE_PER_MINUTE, SESSION_BURST)
+ip_limiter = RateLimiter(IP_RATE_PER_MINUTE, IP_BURST)
+
+BUSY_ANSWER = "We're helping a lot of customers right now 🙏 Please try again in a few seconds!"
+RATE_LIMITED_ANSWER = "You're sending messages a little too fast 😊 Give me a moment and try again."
+
+def client_ip():
+    return request.remote_addr or "unknown"
+
+def request_options():
+    # JSON bodies that aren't objects (lists, strings) count as empty
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
+def request_tenant():
+    # X-Store-Key (required by stores that list keys), else X-Store-Id or "store_id" in the body, else default
+    store_id = request.headers.get(TENANT_HEADER) or request_options().get("store_id")
+    return tenant_registry.resolve(store_id, request.headers.get(TENANT_KEY_HEADER))
+
+def rejected_response(reason, answer, intent, status, retry_after):
+    REJECTED.inc(reason=reason)
+    print(f"🚦 /chat rejected ({reason})")
+    response = jsonify({"answer": answer, "intent": intent})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, round(retry_after)))
+    return response
+
+
+@app.before_request
+def admit_chat_request():
+    if request.path != "/chat" or request.method != "POST":
+        return None
+
+    session_id = request_options().get("session_id", "default")
+    if not isinstance(session_id, str):
+        return jsonify({"error": "session_id must be a string"}), 400
+    checks = [("ip", ip_limiter, client_ip())]
+    tenant = request_tenant()
+    if session_id != "default" and tenant is not None:  # Clients without a session id all share "default"
+        # Same key as the session itself, so equal ids in two stores don't share a bucket
+        checks.append(("session", session_limiter, tenant.session_key(session_id)))
+    for reason, limiter, key in checks:
+        allowed, retry_after = limiter.allow(key)
+        if not allowed:
+            return rejected_response(f"rate_limit_{reason}", RATE_LIMITED_ANSWER, "rate_limited", 429, retry_after)
+
+    refused = admission.acquire()
+    if refused:
+        return rejected_response(refused, BUSY_ANSWER, "busy", 503, admission.queue_timeout)
+    g.admitted = True
+    return None
+
+
+@app.teardown_request
+def release_chat_slot(exc=None):
+    if g.pop("admitted", False):
+        admission.release()
+
+
+# 🏬 Store of the request (see request_tenant). Runs after admission, so a store's first
+# load only happens for requests that got a slot.
+@app.before_request
+def select_store():
+    if request.path != "/chat" and not request.path.startswith("/admin/"):
+        return None
+    tenant = request_tenant()
+    if tenant is None:
+        return jsonify({"error": "Unknown store"}), 404
+    with span("select_store"):
+        g.tenant_token = use_tenant(tenant_registry.activate(tenant))
+    return None
+
+
+@app.teardown_request
+def release_store(exc=None):
+    token = g.pop("tenant_token", None)
+    if token is not None:
+        reset_tenant(token)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return render_prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+def is_admin_request():
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(admin_token) and hmac.compare_digest(token, admin_token)
+
+
+@app.route("/admin/artifacts", methods=["GET"])
+def admin_artifacts():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(artifacts.status())
+
+
+@app.route("/admin/artifacts/reload", methods=["POST"])
+def admin_reload_artifacts():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    options = request_options()
+    reloaded = artifacts.refresh(force=bool(options.get("force")))
+    if options.get("clear_response_cache"):
+        artifacts.state().response_cache.clear()
+    return jsonify({"reloaded": reloaded, "artifacts": artifacts.status()})
+
+
+@app.route("/admin/stores", methods=["GET"])
+def admin_stores():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(tenant_registry.status())
+
+
+@app.route("/admin/breakers", methods=["GET"])
+def admin_breakers():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(breaker_status())
+
+
+@app.route("/admin/profiling", methods=["GET", "POST"])
+def admin_profiling():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    if request.method == "GET":
+        return jsonify(profiler.status())
+
+    options = request_options()
+    for name, low, high in (("percent", 0, 100), ("interval_ms", 1, PROFILE_MAX_INTERVAL_MS)):
+        value = options.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high):
+            return jsonify({"error": f"{name} must be a number between {low} and {high}"}), 400
+    paths = profiler.dump(reset=bool(options.get("reset"))) if options.get("dump") else []
+    status = profiler.configure(options.get("percent"), options.get("interval_ms"))
+    return jsonify({**status, "dumped": paths})
+
+
 @app.route("/chat", methods=["POST"])
 def chat():
     print("🚀 /chat endpoint called")
 
     try:
-        data = request.json
+        data = request_options()
         user_message_count = data.get("user_message_count", 0)
         print("📩 Raw request data:", data)
 
         user_message = data.get("message", "").strip().lower()
         user_message = re.sub(r'[\"“”]', '', user_message)
         user_message = re.sub(r'\s+', ' ', user_message)
+        # Routing, search and cache keys use the canonical query; logs and LLM prompts keep what was typed
+        query = canonicalize_query(user_message)
         
-        session_id = data.get("session_id", "default")
+        session_id = current_tenant().session_key(data.get("session_id", "default"))
         
         print("🧠 User message:", user_message)
 
         if not user_message:
             return jsonify({"error": "Message is required"}), 400
 
-        intent = classify_intent(user_message)
+        session = sessions.load(session_id)
+
+        # "Show me more" after collections/blogs pages through the stored ranking: no rescoring, no intro LLM call
+        if is_more_request(user_message) and session.get("last_intent") in ("search_collection", "search_blog"):
+            print(f"📑 Follow-up for {session['last_intent']}: next page from cursor")
+            response_text = show_more_results(session)
+            sessions.save(session_id, session)
+            log_user_interaction(user_message, response_text, "")  # Not a training example for any intent
+            return jsonify({"answer": response_text, "intent": session["last_intent"]})
+
+        prediction = classify_intent(query)
+        intent = prediction["intent"]
 
         print("🎯 Detected intent:", intent)
 
-        context_tag = detect_context(user_message)
+        context_tag = detect_context(query)
         print("🏠 Detected context:", context_tag)
 
-
-        shop_context = f"Store name: {get_shop_info().get('name', 'Unknown')}, Currency: {get_shop_info().get('currency', 'N/A')}"
+        # Low confidence: ask instead of paying for a probably wrong scrape/LLM branch
+        if not prediction["confident"] and intent != "not_supported":
+            print(f"🤷 Low confidence ({prediction['confidence']:.2f}). Asking for clarification.")
+            response_text = build_clarification(prediction["top2"])
+            log_user_interaction(user_message, response_text, "")  # No intent, so it isn't learned as a label
+            return jsonify({
+                "answer": response_text,
+                "intent": "clarify",
+                "candidates": [candidate for candidate, _ in prediction["top2"]]
+            })
 
         # Logic according to intention
-        if intent in "search_collection":
+        if intent == "search_collection":
             print(f"🪴 Intent: {intent}")
-            session_memory.setdefault(session_id, {})["last_collection_query"] = user_message
-            session_memory[session_id]["last_intent"] = "search_collection"
+            session["last_collection_query"] = query
+            session["last_intent"] = "search_collection"
             response_text = get_collection_recommendations(
-                user_message,
-                session_id=session_id,
-                user_message_count=user_message_count
+                query,
+                session=session,
+                user_message_count=user_message_count,
+                customer_message=user_message
             )
 
         elif intent == "search_blog":
             print("📰 Intent: search_blog (from articles.json)")
-            response_text = search_shopify_blogs(user_message, session_id=session_id, user_message_count=user_message_count)
+            session["last_intent"] = "search_blog"
+            response_text = search_shopify_blogs(
+                query, session=session, user_message_count=user_message_count, customer_message=user_message
+            )
         
         elif intent == "faqs":
+            clear_result_cursors(session)
+            sessions.save(session_id, session)
             try:
-                faq_response = get_best_faq_answer(user_message)
+                faq_response = cached_response(
+                    query, intent,
+                    lambda: get_best_faq_answer(query, index=artifacts.get("faq"), customer_message=user_message),
+                    cacheable=lambda response: is_cacheable_answer(response["answer"])
+                )
                 return jsonify({
                     "answer": faq_response["answer"],
                     "source": faq_response.get("source", "unknown"),
@@ -527,17 +1010,25 @@ def chat():
 
         elif intent in ["contact", "studio", "book", "returns_info", "shipping", "trade", "our_story", "search_pages"]:
             print(f"📄 Intent: {intent}")
-            session_memory.setdefault(session_id, {})["last_pages_query"] = user_message
-            session_memory[session_id]["last_intent"] = "search_pages"
-            response_text = search_shopify_pages(user_message, intent=intent)
+            session["last_pages_query"] = query
+            session["last_intent"] = "search_pages"
+            response_text = cached_response(
+                query, intent,
+                lambda: search_shopify_pages(query, intent=intent)
+            )
 
         elif intent == "not_supported":
+            clear_result_cursors(session)
             response_text = "Sorry, we don’t offer that kind of product. We specialize in handcrafted tiles 🧱! Let me know if you need help with something else."
 
         else:
             print("🤖 Intent fallback: OpenAI")
-            response_text = ask_openai(user_message, context=shop_context)
-            log_unanswered_question(user_message, response_text)
+            clear_result_cursors(session)
+            response_text = cached_response(
+                query, intent, lambda: answer_with_openai(query, customer_message=user_message)
+            )
+
+        sessions.save(session_id, session)
 
         print("✅ Final response:", response_text)
         log_user_interaction(user_message, response_text, intent)
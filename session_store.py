@@ -0,0 +1,141 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from cachetools import TTLCache
+
+# ⚙️ SESSION SETTINGS
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # "memory", "sqlite" or "redis"
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+
+
+# 🗜️ Compact encoding: sets (shown_collections, shown_blogs) become {"$s": [...]}
+def _encode_default(value):
+    if isinstance(value, set):
+        return {"$s": sorted(value)}
+    raise TypeError(f"Can't store {type(value).__name__} in a session")
+
+def _decode_hook(obj):
+    if len(obj) == 1 and "$s" in obj:
+        return set(obj["$s"])
+    return obj
+
+def encode_session(session):
+    return json.dumps(session, default=_encode_default, separators=(",", ":"))
+
+def decode_session(data):
+    return json.loads(data, object_hook=_decode_hook)
+
+
+class MemorySessionStore:
+    """Process-local TTLCache. Fine for a single worker; sessions don't survive a restart."""
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS, max_entries=SESSION_MAX_ENTRIES):
+        self._cache = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            session = self._cache.get(session_id, {})
+            if session:
+                self._cache[session_id] = session  # Re-insert refreshes the TTL
+            return session
+
+    def save(self, session_id, session):
+        with self._lock:
+            self._cache[session_id] = session
+
+
+class SQLiteSessionStore:
+    """Shared across workers on one host through a WAL-mode SQLite file."""
+
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL_SECONDS, max_entries=SESSION_MAX_ENTRIES * 10):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, avoids an fsync per turn
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at > ?", (session_id, now)
+        ).fetchone()
+        if not row:
+            return {}
+        with conn:
+            conn.execute("UPDATE sessions SET expires_at = ? WHERE id = ?", (now + self.ttl, session_id))
+        return decode_session(row[0])
+
+    def save(self, session_id, session):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+                (session_id, encode_session(session), time.time() + self.ttl)
+            )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.prune()
+
+    def prune(self):
+        # Drop expired sessions, then the ones closest to expiring if we're over the cap
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM sessions WHERE id IN ("
+                "SELECT id FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+class RedisSessionStore:
+    """Shared across hosts. Bound memory on the Redis side (maxmemory + volatile-lru)."""
+
+    def __init__(self, url=SESSION_REDIS_URL, ttl=SESSION_TTL_SECONDS):
+        import redis  # Optional dependency, only needed for this backend
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+
+    def _key(self, session_id):
+        return f"claybot:session:{session_id}"
+
+    def load(self, session_id):
+        pipe = self._redis.pipeline()
+        pipe.get(self._key(session_id))
+        pipe.expire(self._key(session_id), self.ttl)
+        data, _ = pipe.execute()
+        return decode_session(data) if data else {}
+
+    def save(self, session_id, session):
+        self._redis.set(self._key(session_id), encode_session(session), ex=self.ttl)
+
+
+def create_session_store(backend=SESSION_BACKEND):
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    return MemorySessionStore()
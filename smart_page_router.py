@@ -1,7 +1,9 @@
-from page_scraper import find_best_shopify_pages, get_full_page_text, summarize_page_content
+from page_scraper import find_best_shopify_pages, get_page_context, summarize_page_content
 import os
 from utils import get_shopify_pages
 from difflib import SequenceMatcher
+from tracing import span
+from tenants import current_tenant
 
 # For intents with a specific page
 DIRECT_PAGE_HANDLES = {
@@ -14,6 +16,14 @@ DIRECT_PAGE_HANDLES = {
     "our_story": "who-we-are",
 }
 
+# Unambiguous phrases for the intents above, matched by intent_router before the ML model
+PAGE_INTENT_KEYWORDS = {
+    "returns_info": ["return policy", "refund policy", "cancellation policy", "returns policy"],
+    "shipping": ["shipping policy", "delivery policy"],
+    "trade": ["trade program", "trade account", "trade pricing", "trade discount"],
+    "our_story": ["who we are", "your story", "brand story"],
+}
+
 irrelevant_handles = {
     "wishlist",
     "accessibility-disclaimer",
@@ -28,13 +38,29 @@ irrelevant_handles = {
 }
 
 
-shopify_store_url = "https://clayimports.myshopify.com"  # public version
+shopify_store_url = "https://clayimports.myshopify.com"  # public version, default store only
 
 TOP_SCORE_MARGIN = 0.025
 
+def rank_pages(query, pages):
+    """Returns (best_page, score) by string similarity, or (None, 0.0)."""
+    best_page = None
+    best_score = 0.0
+    for page in pages:
+        handle = page.get("handle", "")
+        if handle in irrelevant_handles:
+            continue
+        text = f"{page.get('title', '')} {page.get('body_html', '')}".lower()
+        score = SequenceMatcher(None, query, text).ratio()
+        if score > best_score:
+            best_score = score
+            best_page = page
+    return best_page, best_score
+
 def search_shopify_pages(query, intent=None):
     pages = get_shopify_pages()
     print(f"📄 Total Shopify pages loaded: {len(pages)}")
+    store_url = current_tenant().storefront_url or shopify_store_url
     query = query.lower().strip()
 
     # For intent-specific pages (contact, shipping, etc.)
@@ -43,27 +69,17 @@ def search_shopify_pages(query, intent=None):
         forced_page = next((p for p in pages if p["handle"] == forced_handle), None)
         if forced_page:
             print(f"🎯 Forced match by intent: {intent} → {forced_handle}")
-            summary = summarize_page_content(get_full_page_text(forced_page), title=forced_page["title"])
-            url = f"{shopify_store_url}/pages/{forced_handle}"
+            summary = summarize_page_content(get_page_context(forced_page, query), title=forced_page["title"])
+            url = f"{store_url}/pages/{forced_handle}"
             return f"{summary}<br><br><a href='{url}' target='_blank'>Read more</a>"
 
     # General semantic search (basic string similarity for now)
-    best_page = None
-    best_score = 0.0
-
-    for page in pages:
-        handle = page.get("handle", "")
-        if handle in irrelevant_handles:
-            continue
-        text = f"{page.get('title', '')} {page.get('body_html', '')}".lower()
-        score = SequenceMatcher(None, query, text).ratio()
-        if score > best_score:
-            best_score = score
-            best_page = page
+    with span("page_match"):
+        best_page, best_score = rank_pages(query, pages)
 
     if best_page:
-        summary = summarize_page_content(get_full_page_text(best_page), title=best_page["title"])
-        url = f"{shopify_store_url}/pages/{best_page['handle']}"
+        summary = summarize_page_content(get_page_context(best_page, query), title=best_page["title"])
+        url = f"{store_url}/pages/{best_page['handle']}"
         return f"{summary}<br><br><a href='{url}' target='_blank'>Read more</a>"
     else:
         return "Sorry, I couldn’t find any relevant page for your question."
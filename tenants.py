@@ -0,0 +1,264 @@
+import argparse
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# ⚙️ TENANT SETTINGS
+TENANTS_FILE = os.getenv("TENANTS_FILE", "tenants.json")  # Without it the bot serves one store from the env vars
+TENANT_HEADER = "X-Store-Id"
+TENANT_KEY_HEADER = "X-Store-Key"
+STORE_ID_ENV = "STORE_ID"  # Store the build scripts work on, like their --store flag
+TENANT_MEMORY_BUDGET_MB = int(os.getenv("TENANT_MEMORY_BUDGET_MB", "2048"))  # For the loaded stores' artifacts
+DEFAULT_TENANT_ID = "default"
+
+
+class Tenant:
+    """One storefront: Shopify credentials, public URL and the directory its generated files live in."""
+
+    def __init__(self, tenant_id, store_url=None, access_token=None, storefront_url=None, data_dir=".", keys=()):
+        self.id = tenant_id
+        self.store_url = store_url
+        self.access_token = access_token
+        self.storefront_url = storefront_url  # Only the default store may leave it None (each module's own URL)
+        self.data_dir = data_dir
+        self.keys = tuple(keys)
+
+    @classmethod
+    def from_env(cls):
+        return cls(DEFAULT_TENANT_ID, store_url=os.getenv("SHOPIFY_STORE_URL"), access_token=os.getenv("SHOPIFY_API_KEY"))
+
+    @classmethod
+    def from_config(cls, tenant_id, config):
+        # Tokens can stay out of the file: "access_token_env" names the variable that holds it
+        access_token = config.get("access_token") or os.getenv(config.get("access_token_env", ""), None)
+        store_url = config.get("store_url")
+        storefront_url = config.get("storefront_url")
+        if tenant_id != DEFAULT_TENANT_ID:
+            if not store_url:
+                raise ValueError(f"Store '{tenant_id}' in {TENANTS_FILE} needs a store_url")
+            # Never fall back to the default store's storefront: pages and links would be another store's
+            storefront_url = storefront_url or store_url
+        return cls(
+            tenant_id,
+            store_url=store_url,
+            access_token=access_token,
+            storefront_url=storefront_url,
+            data_dir=config.get("data_dir", "." if tenant_id == DEFAULT_TENANT_ID else os.path.join("stores", tenant_id)),
+            keys=config.get("keys", ()),
+        )
+
+    @property
+    def admin_headers(self):
+        return {"X-Shopify-Access-Token": self.access_token}
+
+    def path(self, name):
+        return name if self.data_dir == "." else os.path.join(self.data_dir, name)
+
+    def session_key(self, session_id):
+        # The default store keeps its existing session ids
+        return session_id if self.id == DEFAULT_TENANT_ID else f"{self.id}:{session_id}"
+
+
+class TenantState:
+    """What a loaded store holds in memory: its artifacts and its response cache."""
+
+    def __init__(self, tenant, artifacts, response_cache):
+        self.tenant = tenant
+        self.artifacts = artifacts
+        self.response_cache = response_cache
+        self.loaded_at = time.time()
+
+    def footprint_bytes(self):
+        return self.artifacts.disk_bytes()
+
+
+# 🧵 The store of the request being handled; modules read it instead of module-level URLs
+_current = contextvars.ContextVar("tenant_state", default=None)
+_fallback_tenant = None
+
+def current_state():
+    return _current.get()
+
+def current_tenant():
+    state = _current.get()
+    if state is not None:
+        return state.tenant
+    global _fallback_tenant
+    if _fallback_tenant is None:
+        _fallback_tenant = Tenant.from_env()  # Scripts and startup code outside a request
+    return _fallback_tenant
+
+def use_tenant(state):
+    return _current.set(state)
+
+def reset_tenant(token):
+    _current.reset(token)
+
+
+class TenantArtifacts:
+    """ArtifactManager-like view: shared artifacts plus the current store's own ones."""
+
+    def __init__(self, shared, registry):
+        self.shared = shared
+        self.registry = registry
+
+    def state(self):
+        # Outside a request (startup, benchmarks) this is the default store
+        return current_state() or self.registry.activate(self.registry.tenants[DEFAULT_TENANT_ID])
+
+    def _manager(self, name):
+        return self.shared if name in self.shared else self.state().artifacts
+
+    def register(self, name, *args, **kwargs):
+        self._manager(name).register(name, *args, **kwargs)
+
+    def get(self, name):
+        return self._manager(name).get(name)
+
+    def version(self, name):
+        return self._manager(name).version(name)
+
+    def versions(self):
+        state = self.state()
+        return {**self.shared.versions(), **state.artifacts.versions(), "store": state.tenant.id}
+
+    def refresh(self, names=None, force=False):
+        store = self.state().artifacts
+        if names is None:
+            return self.shared.refresh(force=force) + store.refresh(force=force)
+        shared_names = [name for name in names if name in self.shared]
+        store_names = [name for name in names if name not in self.shared]
+        return ((self.shared.refresh(shared_names, force) if shared_names else [])
+                + (store.refresh(store_names, force) if store_names else []))
+
+    def status(self):
+        return {**self.shared.status(), **self.state().artifacts.status()}
+
+    def stop(self):
+        self.shared.stop()
+        for state in self.registry.loaded():
+            state.artifacts.stop()
+
+
+def load_tenant_configs(path=TENANTS_FILE):
+    tenants = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for tenant_id, config in json.load(f).items():
+                tenants[tenant_id] = Tenant.from_config(tenant_id, config)
+    if DEFAULT_TENANT_ID not in tenants:
+        tenants[DEFAULT_TENANT_ID] = Tenant.from_env()
+    return tenants
+
+
+def script_tenant(argv=None):
+    """Store picked by a build script's --store flag or STORE_ID (default: "default").
+
+    Its files go to the store's data_dir and current_tenant() returns it for the rest
+    of the script, so Shopify calls use its URL and token.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--store", default=os.getenv(STORE_ID_ENV, DEFAULT_TENANT_ID))
+    store_id = parser.parse_known_args(argv)[0].store
+    tenants = load_tenant_configs()
+    if store_id not in tenants:
+        raise SystemExit(f"❌ Unknown store '{store_id}': not in {TENANTS_FILE}")
+    tenant = tenants[store_id]
+    if tenant.id != DEFAULT_TENANT_ID:
+        os.makedirs(tenant.data_dir, exist_ok=True)
+        print(f"🏬 Store '{tenant.id}': {tenant.store_url}, files in {tenant.data_dir}/")
+
+    global _fallback_tenant
+    _fallback_tenant = tenant
+    return tenant
+
+
+class TenantRegistry:
+    """Resolves the store of a request and keeps its artifacts loaded, least recently used first out.
+
+    `load(tenant)` returns a TenantState; it runs on a store's first request. When the
+    loaded stores' footprint goes over the budget, the least recently used ones are
+    dropped (their watchers stopped); requests already holding their state finish with it.
+    """
+
+    def __init__(self, load, tenants=None, budget_mb=TENANT_MEMORY_BUDGET_MB):
+        self.tenants = tenants if tenants is not None else load_tenant_configs()
+        self.keys = {key: tenant for tenant in self.tenants.values() for key in tenant.keys}
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self._load = load
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._tenant_locks = {tenant_id: threading.Lock() for tenant_id in self.tenants}
+        self.evictions = 0
+        global _fallback_tenant
+        _fallback_tenant = self.tenants[DEFAULT_TENANT_ID]
+
+    def resolve(self, store_id=None, key=None):
+        """Tenant for a request, or None when the id/key doesn't match a store it may use."""
+        if key:
+            return self.keys.get(key)
+        if store_id is not None and not isinstance(store_id, str):
+            return None  # A JSON list/object/number as "store_id" is no store
+        if store_id:
+            tenant = self.tenants.get(store_id)
+            return tenant if tenant is not None and not tenant.keys else None  # Keyed stores need their key
+        return self.tenants[DEFAULT_TENANT_ID]
+
+    def activate(self, tenant):
+        """The store's loaded state, loading it on first use."""
+        with self._lock:
+            state = self._loaded.get(tenant.id)
+            if state is not None:
+                self._loaded.move_to_end(tenant.id)
+                return state
+
+        # One loader per store; other stores keep being served meanwhile
+        with self._tenant_locks[tenant.id]:
+            with self._lock:
+                state = self._loaded.get(tenant.id)
+            if state is None:
+                started = time.perf_counter()
+                state = self._load(tenant)
+                print(f"🏬 Store '{tenant.id}' loaded in {time.perf_counter() - started:.2f}s "
+                      f"({state.footprint_bytes() / 1e6:.1f} MB of artifacts)")
+                with self._lock:
+                    self._loaded[tenant.id] = state
+                    self._evict_over_budget(keep=tenant.id)
+        return state
+
+    def _evict_over_budget(self, keep):
+        total = sum(state.footprint_bytes() for state in self._loaded.values())
+        for tenant_id in list(self._loaded):
+            if total <= self.budget_bytes:
+                break
+            if tenant_id == keep:
+                continue
+            state = self._loaded.pop(tenant_id)
+            state.artifacts.stop()
+            total -= state.footprint_bytes()
+            self.evictions += 1
+            print(f"🧹 Store '{tenant_id}' unloaded to stay under {self.budget_bytes / 1e6:.0f} MB")
+
+    def loaded(self):
+        with self._lock:
+            return list(self._loaded.values())
+
+    def status(self):
+        with self._lock:
+            loaded = dict(self._loaded)
+        return {
+            "budget_mb": round(self.budget_bytes / 1024 / 1024),
+            "evictions": self.evictions,
+            "stores": {
+                tenant_id: {
+                    "store_url": tenant.store_url,
+                    "data_dir": tenant.data_dir,
+                    "loaded": tenant_id in loaded,
+                    "footprint_mb": round(loaded[tenant_id].footprint_bytes() / 1e6, 1) if tenant_id in loaded else 0,
+                }
+                for tenant_id, tenant in self.tenants.items()
+            },
+        }
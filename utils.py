@@ -1,17 +1,25 @@
 # utils.py
-import os
-import requests
+from tracing import span, count_external
+from resilience import guarded_get
+from tenants import current_tenant
 
 def get_shopify_pages():
-    shopify_store_url = os.getenv("SHOPIFY_STORE_URL")
-    shopify_access_token = os.getenv("SHOPIFY_API_KEY")
+    store = current_tenant()  # The request's store, or the SHOPIFY_* env vars outside a request
+    shopify_store_url = store.store_url
+    shopify_access_token = store.access_token
 
     pages = []
     url = f"{shopify_store_url}/admin/api/2024-01/pages.json?limit=250"
     headers = {"X-Shopify-Access-Token": shopify_access_token}
 
     while url:
-        response = requests.get(url, headers=headers)
+        count_external("shopify")
+        try:
+            with span("shopify_pages"):
+                response = guarded_get("shopify", url, headers=headers)
+        except Exception as e:
+            print(f"⚠️ Error fetching pages: {e}")
+            return pages
         if response.status_code != 200:
             print(f"⚠️ Error fetching pages: {response.status_code}")
             return pages
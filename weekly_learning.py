@@ -1,27 +1,44 @@
 import json
+import os
+import hashlib
+from datetime import datetime
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from sklearn.pipeline import make_pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.metrics import classification_report
+from sklearn.metrics import classification_report, accuracy_score
 import joblib
+import numpy as np
+from intent_router import apply_temperature
+from conversation_store import ConversationStore, ingest_new_rows
 
 # 📁 DATA FILES
 TRAINING_FILE = "training_data.json"
 MODEL_FILE = "intent_model.joblib"
+MODEL_META_FILE = "intent_model.meta.json"
+MODEL_VERSIONS_DIR = "models"
 GOOGLE_SHEET_NAME = "Chatbot logs"
 
+# ⚙️ TRAINING SETTINGS
+TRAINING_MODE = os.getenv("INTENT_TRAINING_MODE", "incremental")  # "incremental" or "full"
+HOLDOUT_PERCENT = 20  # Stable share of examples never trained on, used for evaluation
+TARGET_PRECISION = 0.8  # Per-intent confidence thresholds aim for this precision on held-out data
+MIN_HOLDOUT_PER_INTENT = 5  # Fewer held-out predictions than this keep the default threshold
+LOG_INGEST_MODE = os.getenv("LOG_INGEST_MODE", "incremental")  # "incremental" (conversations.db) or "full" (whole sheet)
+
 # 🔐 GOOGLE SHEETS AUTHENTICATION
-def load_logs():
+def open_log_sheet():
     scope = [
         "https://spreadsheets.google.com/feeds",
         "https://www.googleapis.com/auth/drive"
     ]
     creds = ServiceAccountCredentials.from_json_keyfile_name("google_credentials.json", scope)
     client = gspread.authorize(creds)
-    sheet = client.open(GOOGLE_SHEET_NAME).sheet1
-    return sheet.get_all_records()
+    return client.open(GOOGLE_SHEET_NAME).sheet1
+
+def load_logs():
+    return open_log_sheet().get_all_records()
 
 # 📊 LOAD EXISTING EXAMPLES
 def load_existing_examples():
@@ -32,11 +49,15 @@ def load_existing_examples():
         return []
 
 # 🧠 DETECT NEW EXAMPLES
-def extract_new_training_examples(logs, known_examples):
+def known_phrases_of(known_examples):
     # Collect all known texts from grouped format
     known_phrases = set()
     for group in known_examples:
         known_phrases.update(group["examples"])
+    return known_phrases
+
+def extract_new_training_examples(logs, known_examples):
+    known_phrases = known_phrases_of(known_examples)
 
     new_data = []
     for entry in logs:
@@ -64,45 +85,204 @@ def append_to_training_data(new_examples, existing):
         json.dump(updated_data, f, indent=2)
 
     print(f"✅ {len(new_examples)} new examples added to training_data.json")
+    return updated_data
+
+
+# ✂️ HELD-OUT SPLIT
+def is_holdout(phrase):
+    # Hash-based so an example stays on the same side of the split every week
+    digest = hashlib.md5(phrase.strip().lower().encode("utf-8")).hexdigest()
+    return int(digest, 16) % 100 < HOLDOUT_PERCENT
+
+def split_examples(pairs):
+    train, holdout = [], []
+    for msg, intent in pairs:
+        (holdout if is_holdout(msg) else train).append((msg, intent))
+    return train, holdout
+
+def flatten_training_data(training_data):
+    return [(example, entry["intent"]) for entry in training_data for example in entry["examples"]]
+
+
+# 🧠 MODEL
+def build_intent_pipeline():
+    # Stateless hashing features so new examples can be folded in with partial_fit
+    return make_pipeline(
+        HashingVectorizer(alternate_sign=False, ngram_range=(1, 2), n_features=2 ** 18),
+        MultinomialNB(alpha=0.01)
+    )
+
+def supports_partial_fit(model):
+    steps = getattr(model, "named_steps", {})
+    return "hashingvectorizer" in steps and "multinomialnb" in steps
+
+def evaluate_model(model, holdout):
+    if not holdout:
+        return {"accuracy": None, "report": "⚠️ No held-out examples to evaluate on."}
+    X_test = [msg for msg, _ in holdout]
+    y_test = [intent for _, intent in holdout]
+    predicted = model.predict(X_test)
+    return {
+        "accuracy": round(accuracy_score(y_test, predicted), 4),
+        "report": classification_report(y_test, predicted, zero_division=0),
+    }
+
+# 🎚️ CALIBRATION
+def fit_temperature(log_proba, y_index):
+    # Temperature scaling: one scalar that minimizes held-out negative log-likelihood
+    best_temperature, best_nll = 1.0, float("inf")
+    for temperature in np.geomspace(0.05, 50, 60):
+        probabilities = apply_temperature(log_proba, temperature)
+        nll = -np.mean(np.log(probabilities[np.arange(len(y_index)), y_index] + 1e-12))
+        if nll < best_nll:
+            best_temperature, best_nll = float(temperature), nll
+    return best_temperature
+
+def tune_thresholds(confidences, predicted, correct):
+    thresholds = {}
+    for intent in set(predicted):
+        mask = predicted == intent
+        if mask.sum() < MIN_HOLDOUT_PER_INTENT:
+            continue
+        # Lowest threshold whose accepted predictions reach the target precision.
+        # Candidates are the confidences themselves, so every threshold accepts at least one prediction.
+        best_threshold, best_precision = None, -1.0
+        for threshold in np.unique(confidences[mask]):
+            accepted = mask & (confidences >= threshold)
+            if not accepted.any():
+                continue
+            precision = correct[accepted].mean()
+            if np.isnan(precision):
+                continue
+            if precision >= TARGET_PRECISION:
+                thresholds[str(intent)] = float(threshold)
+                break
+            if precision > best_precision:
+                best_threshold, best_precision = threshold, precision
+        else:
+            if best_threshold is None:
+                continue  # Nothing measurable: the router's default threshold applies
+            # Never reaches the target: keep its most precise gate rather than the lenient default
+            thresholds[str(intent)] = float(best_threshold)
+            print(f"⚠️ Intent '{intent}' reaches only {best_precision:.2f} precision (threshold {best_threshold:.4f})")
+    return thresholds
+
+def calibrate_model(model, holdout):
+    known = [(msg, intent) for msg, intent in holdout if intent in set(model.classes_)]
+    if not known:
+        return {"temperature": 1.0, "thresholds": {}}
+
+    class_index = {intent: i for i, intent in enumerate(model.classes_)}
+    log_proba = model.predict_log_proba([msg for msg, _ in known])
+    y_index = np.array([class_index[intent] for _, intent in known])
+
+    temperature = fit_temperature(log_proba, y_index)
+    probabilities = apply_temperature(log_proba, temperature)
+    predicted = np.array(model.classes_)[probabilities.argmax(axis=1)]
+    confidences = probabilities.max(axis=1)
+    correct = predicted == np.array([intent for _, intent in known])
+
+    thresholds = tune_thresholds(confidences, predicted, correct)
+    print(f"🎚️ Calibration temperature: {temperature:.3f}, thresholds: {thresholds}")
+    return {"temperature": temperature, "thresholds": thresholds}
 
+def save_model(model, mode, trained_count, evaluation, calibration):
+    version = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    os.makedirs(MODEL_VERSIONS_DIR, exist_ok=True)
+    versioned_path = os.path.join(MODEL_VERSIONS_DIR, f"intent_model-{version}.joblib")
+    # Calibration travels inside the model file, so a reload never pairs a model with another one's thresholds
+    model.calibration_ = calibration
+    joblib.dump(model, versioned_path)
+
+    # Atomic replace so a running server never reads a half-written model
+    tmp_path = f"{MODEL_FILE}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, MODEL_FILE)
+
+    meta = {
+        "version": version,
+        "mode": mode,
+        "trained_examples": trained_count,
+        "holdout_accuracy": evaluation["accuracy"],
+        "calibration": calibration,
+        "path": versioned_path,
+    }
+    with open(MODEL_META_FILE, "w") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"🎉 Model {version} saved as {MODEL_FILE} ({versioned_path})")
+    return meta
 
 def retrain_intent_model(training_data):
-    X = []
-    y = []
-    for entry in training_data:
-        intent = entry["intent"]
-        for example in entry["examples"]:
-            X.append(example)
-            y.append(intent)
+    train, holdout = split_examples(flatten_training_data(training_data))
 
-    model = make_pipeline(TfidfVectorizer(), MultinomialNB())
-    model.fit(X, y)
+    model = build_intent_pipeline()
+    model.fit([msg for msg, _ in train], [intent for _, intent in train])
 
-    joblib.dump(model, MODEL_FILE)
-    print(f"🎉 Model retrained and saved as {MODEL_FILE}")
+    evaluation = evaluate_model(model, holdout)
+    save_model(model, "full", len(train), evaluation, calibrate_model(model, holdout))
+    return model, evaluation
 
-    return model, X, y
+def update_intent_model(new_examples, training_data):
+    try:
+        model = joblib.load(MODEL_FILE)
+    except Exception as e:
+        print(f"⚠️ Could not load {MODEL_FILE} ({e}). Falling back to full retrain.")
+        return retrain_intent_model(training_data)
+
+    if not supports_partial_fit(model):
+        print("⚠️ Current model can't be updated incrementally. Falling back to full retrain.")
+        return retrain_intent_model(training_data)
+
+    classifier = model.named_steps["multinomialnb"]
+    unknown_intents = {intent for _, intent in new_examples} - set(classifier.classes_)
+    if unknown_intents:
+        print(f"⚠️ New intents {sorted(unknown_intents)} need a full retrain.")
+        return retrain_intent_model(training_data)
+
+    train, _ = split_examples(new_examples)
+    if train:
+        features = model.named_steps["hashingvectorizer"].transform([msg for msg, _ in train])
+        classifier.partial_fit(features, [intent for _, intent in train])
+        print(f"➕ Folded {len(train)} new examples into the model.")
+
+    _, holdout = split_examples(flatten_training_data(training_data))
+    evaluation = evaluate_model(model, holdout)
+    save_model(model, "incremental", len(train), evaluation, calibrate_model(model, holdout))
+    return model, evaluation
 
 # 🚀 MAIN FLOW
 def main():
     print("🔄 Starting weekly training...")
-    logs = load_logs()
     existing = load_existing_examples()
-    new_examples = extract_new_training_examples(logs, existing)
+    if LOG_INGEST_MODE == "incremental":
+        # Only the rows added since the last run are downloaded; the set difference runs in SQLite
+        store = ConversationStore()
+        ingest_new_rows(open_log_sheet(), store)
+        new_examples = store.new_training_examples(known_phrases_of(existing))
+        store.close()
+    else:
+        new_examples = extract_new_training_examples(load_logs(), existing)
     print(f"🆕 New examples added: {len(new_examples)}")
     for msg, intent in new_examples:
         print(f"➕ {msg} → {intent}")
 
-
     if new_examples:
-        append_to_training_data(new_examples, existing)
-        model, X, y = retrain_intent_model(existing + new_examples)
+        training_data = append_to_training_data(new_examples, existing)
     else:
         print("📭 No new examples were found to add.")
-        model, X, y = retrain_intent_model(existing)
+        training_data = existing
+
+    if TRAINING_MODE == "incremental" and os.path.exists(MODEL_FILE):
+        if not new_examples:
+            print("💤 Incremental mode with nothing new. Keeping the current model.")
+            return
+        model, evaluation = update_intent_model(new_examples, training_data)
+    else:
+        model, evaluation = retrain_intent_model(training_data)
 
-    print("\n📊 Trained intent model:")
-    print(classification_report(y, model.predict(X)))
+    print("\n📊 Held-out evaluation:")
+    print(evaluation["report"])
 
 if __name__ == "__main__":
     main()